@@ -7,6 +7,8 @@ from .checkins import router as checkins_router
 from .messages import router as messages_router
 from .progress import router as progress_router
 from .notifications import router as notifications_router
+from .dashboard import router as dashboard_router
+from .realtime import router as realtime_router
 
 router = APIRouter()
 
@@ -18,4 +20,6 @@ router.include_router(goals_router)
 router.include_router(checkins_router)
 router.include_router(messages_router)
 router.include_router(progress_router)
-router.include_router(notifications_router) 
\ No newline at end of file
+router.include_router(notifications_router)
+router.include_router(dashboard_router)
+router.include_router(realtime_router) 
\ No newline at end of file
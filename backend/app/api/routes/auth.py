@@ -67,27 +67,24 @@ async def validate_invitation(token: str):
     """
     Validate an invitation token and return details about the invitation
     """
-    from ...core.supabase import get_supabase_client
+    from ...repositories import pending_invitations as invitations_repo
+    from ...repositories import users as users_repo
     from datetime import datetime
     
-    supabase = get_supabase_client()
-    
     # Get the invitation
-    response = supabase.table("pending_invitations").select("*").eq("invitation_token", token).eq("status", "pending").execute()
+    invitation = await invitations_repo.get_pending_by_token(token)
     
-    if not response.data:
+    if not invitation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Invalid or expired invitation token"
         )
     
-    invitation = response.data[0]
-    
     # Check if the invitation has expired
     expires_at = datetime.fromisoformat(invitation["expires_at"].replace("Z", "+00:00"))
     if datetime.now() > expires_at:
         # Update invitation status to expired
-        supabase.table("pending_invitations").update({"status": "expired"}).eq("id", invitation["id"]).execute()
+        await invitations_repo.update_status(invitation["id"], "expired")
         
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -95,8 +92,7 @@ async def validate_invitation(token: str):
         )
     
     # Get inviter details
-    inviter_response = supabase.table("users").select("first_name, last_name").eq("id", invitation["inviter_id"]).execute()
-    inviter = inviter_response.data[0] if inviter_response.data else {"first_name": "Someone", "last_name": ""}
+    inviter = await users_repo.get_name(invitation["inviter_id"]) or {"first_name": "Someone", "last_name": ""}
     
     return {
         "valid": True,
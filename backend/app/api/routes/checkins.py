@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from typing import List
 from datetime import datetime
 from ...models.user import User
 from ...models.checkin import CheckIn, CheckInCreate, CheckInUpdate, CheckInComplete
 from ...services.auth import get_current_user
-from ...core.supabase import get_supabase_client
+from ...services.partnerships import get_user_partnership_statuses, is_partnership_member
+from ...repositories import check_ins as checkins_repo
+from ...repositories import partnerships as partnerships_repo
+from ...core.database import DatabaseError
+from ...core.etag import conditional_response, rows_etag
 
 router = APIRouter(prefix="/checkins", tags=["checkins"])
 
@@ -17,14 +21,8 @@ async def create_checkin(
     """
     Schedule a new check-in for a partnership
     """
-    supabase = get_supabase_client()
-    
     # Check if partnership exists and user is a member
-    partnership = supabase.table("partnerships").select("*").eq("id", checkin_data.partnership_id).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
-    
-    if not partnership.data:
+    if not await is_partnership_member(str(current_user.id), checkin_data.partnership_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Partnership not found"
@@ -34,68 +32,63 @@ async def create_checkin(
     new_checkin = checkin_data.model_dump()
     new_checkin["partnership_id"] = str(new_checkin["partnership_id"])  # Convert UUID to string
     
-    response = supabase.table("check_ins").insert(new_checkin).execute()
+    try:
+        checkin = await checkins_repo.create(new_checkin)
+    except DatabaseError as e:
+        # Unique (partnership_id, scheduled_at), see migration 014
+        if e.code == "23505":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The partnership already has a check-in scheduled at that time"
+            )
+        raise
     
-    if not response.data:
+    if not checkin:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create check-in"
         )
     
-    return response.data[0]
+    return checkin
 
 
 @router.get("", response_model=List[CheckIn])
 async def get_checkins(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     partnership_id: str = None,
     completed: bool = None
 ):
     """
     Get all check-ins for the current user or for a specific partnership
-    """
-    supabase = get_supabase_client()
     
+    Supports If-None-Match.
+    """
     if partnership_id:
         # Check if partnership exists and user is a member
-        partnership = supabase.table("partnerships").select("*").eq("id", partnership_id).or_(
-            f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-        ).single().execute()
-        
-        if not partnership.data:
+        if not await is_partnership_member(str(current_user.id), partnership_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Partnership not found"
             )
         
-        # Get check-ins for this partnership
-        query = supabase.table("check_ins").select("*").eq("partnership_id", partnership_id)
+        partnership_ids = [partnership_id]
     else:
         # Get partnerships for the current user
-        partnerships = supabase.table("partnerships").select("id").or_(
-            f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-        ).execute()
+        partnership_ids = list(await get_user_partnership_statuses(str(current_user.id)))
         
-        if not partnerships.data:
+        if not partnership_ids:
             return []
-        
-        # Get check-ins for these partnerships
-        response = supabase.table("check_ins").select(
-            "*",
-            "partnership:partnerships!inner(*)"
-        ).in_("partnership_id", [p["id"] for p in partnerships.data]).execute()
-    
-    # Filter by completion status if provided
-    if completed is not None:
-        if completed:
-            query = query.not_.is_("completed_at", "null")
-        else:
-            query = query.is_("completed_at", "null")
-    
-    # Order by scheduled date
-    query = query.order("scheduled_at", desc=False)
-    
-    return response.data if response.data else []
+    
+    # Get check-ins for these partnerships, filtered by completion status and ordered by scheduled date
+    checkins = await checkins_repo.list_for_partnerships(partnership_ids, completed=completed)
+    
+    not_modified = conditional_response(request, response, rows_etag(checkins))
+    if not_modified:
+        return not_modified
+    
+    return checkins
 
 
 @router.get("/{checkin_id}", response_model=CheckIn)
@@ -106,29 +99,23 @@ async def get_checkin(
     """
     Get a specific check-in
     """
-    supabase = get_supabase_client()
-    
-    # Get the check-in
-    checkin = supabase.table("check_ins").select("*").eq("id", checkin_id).single().execute()
+    # Get the check-in together with its partnership members
+    checkin = await checkins_repo.get_with_partnership(checkin_id)
     
-    if not checkin.data:
+    if not checkin:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Check-in not found"
         )
     
     # Check if user has access to this check-in
-    partnership = supabase.table("partnerships").select("*").eq("id", checkin.data["partnership_id"]).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
-    
-    if not partnership.data:
+    if not partnerships_repo.is_member(checkin.pop("partnership"), current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have access to this check-in"
         )
     
-    return checkin.data
+    return checkin
 
 
 @router.put("/{checkin_id}", response_model=CheckIn)
@@ -140,23 +127,17 @@ async def update_checkin(
     """
     Update a check-in (reschedule or add notes)
     """
-    supabase = get_supabase_client()
+    # Get the check-in together with its partnership members
+    checkin = await checkins_repo.get_with_partnership(checkin_id)
     
-    # Get the check-in
-    checkin = supabase.table("check_ins").select("*").eq("id", checkin_id).single().execute()
-    
-    if not checkin.data:
+    if not checkin:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Check-in not found"
         )
     
     # Check if user has access to this check-in
-    partnership = supabase.table("partnerships").select("*").eq("id", checkin.data["partnership_id"]).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
-    
-    if not partnership.data:
+    if not partnerships_repo.is_member(checkin.pop("partnership"), current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have access to this check-in"
@@ -166,18 +147,27 @@ async def update_checkin(
     update_data = {k: v for k, v in checkin_update.model_dump().items() if v is not None}
     
     if not update_data:
-        return checkin.data
+        return checkin
     
     # Update check-in
-    response = supabase.table("check_ins").update(update_data).eq("id", checkin_id).execute()
+    try:
+        updated_checkin = await checkins_repo.update(checkin_id, update_data)
+    except DatabaseError as e:
+        # Unique (partnership_id, scheduled_at), see migration 014
+        if e.code == "23505":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The partnership already has a check-in scheduled at that time"
+            )
+        raise
     
-    if not response.data:
+    if not updated_checkin:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update check-in"
         )
     
-    return response.data[0]
+    return updated_checkin
 
 
 @router.post("/{checkin_id}/complete", response_model=CheckIn)
@@ -189,30 +179,24 @@ async def complete_checkin(
     """
     Mark a check-in as completed
     """
-    supabase = get_supabase_client()
+    # Get the check-in together with its partnership members
+    checkin = await checkins_repo.get_with_partnership(checkin_id)
     
-    # Get the check-in
-    checkin = supabase.table("check_ins").select("*").eq("id", checkin_id).single().execute()
-    
-    if not checkin.data:
+    if not checkin:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Check-in not found"
         )
     
     # Check if user has access to this check-in
-    partnership = supabase.table("partnerships").select("*").eq("id", checkin.data["partnership_id"]).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
-    
-    if not partnership.data:
+    if not partnerships_repo.is_member(checkin.pop("partnership"), current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have access to this check-in"
         )
     
     # Check if already completed
-    if checkin.data.get("completed_at"):
+    if checkin.get("completed_at"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Check-in is already completed"
@@ -226,12 +210,12 @@ async def complete_checkin(
     if completion_data.notes:
         update_data["notes"] = completion_data.notes
     
-    response = supabase.table("check_ins").update(update_data).eq("id", checkin_id).execute()
+    updated_checkin = await checkins_repo.update(checkin_id, update_data)
     
-    if not response.data:
+    if not updated_checkin:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to complete check-in"
         )
     
-    return response.data[0] 
\ No newline at end of file
+    return updated_checkin
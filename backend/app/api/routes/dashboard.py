@@ -0,0 +1,123 @@
+from fastapi import APIRouter, Depends
+from typing import Any, Awaitable, List
+from datetime import datetime, timezone
+import asyncio
+import logging
+from ...models.user import User
+from ...models.dashboard import Dashboard
+from ...services.auth import get_current_user
+from ...services.partnerships import get_user_partnership_statuses
+from ...services.goals import list_goals_for_user
+from ...repositories import partnerships as partnerships_repo
+from ...repositories import check_ins as checkins_repo
+from ...repositories import notifications as notifications_repo
+from ...repositories import messages as messages_repo
+from ...core.config import get_settings
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+logger = logging.getLogger(__name__)
+
+
+async def _load_section(name: str, loader: Awaitable[Any], default: Any, timeout: float, unavailable: List[str]) -> Any:
+    """
+    Await one dashboard section, falling back to a default if it fails or is too slow
+    
+    Args:
+        name: Section name reported back to the client when it is unavailable
+        loader: Coroutine fetching the section
+        default: Value returned in place of the section
+        timeout: Seconds to wait before giving up on the section
+        unavailable: List collecting the names of sections that fell back
+    
+    Returns:
+        The section data, or the default
+    """
+    try:
+        return await asyncio.wait_for(loader, timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Dashboard section '{name}' timed out after {timeout}s")
+    except Exception as e:
+        logger.error(f"Dashboard section '{name}' failed: {str(e)}")
+    
+    unavailable.append(name)
+    return default
+
+
+async def _upcoming_checkins(user_id: str, limit: int) -> List[dict]:
+    """Next incomplete check-ins across all of the user's partnerships"""
+    partnership_ids = list(await get_user_partnership_statuses(user_id))
+    
+    return await checkins_repo.list_for_partnerships(
+        partnership_ids,
+        completed=False,
+        scheduled_after=datetime.now(timezone.utc).isoformat(),
+        limit=limit
+    )
+
+
+@router.get("", response_model=Dashboard)
+async def get_dashboard(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get partnerships, active goals, upcoming check-ins, recent notifications and unread
+    counts for the current user
+    
+    Sections are fetched concurrently. A section that fails or exceeds its timeout is
+    returned empty and listed in `unavailable_sections` rather than failing the page.
+    """
+    settings = get_settings()
+    user_id = str(current_user.id)
+    timeout = settings.DASHBOARD_SECTION_TIMEOUT_SECONDS
+    unavailable: List[str] = []
+    
+    (
+        partnerships,
+        goals,
+        upcoming_checkins,
+        notifications,
+        unread_notifications,
+        unread_messages
+    ) = await asyncio.gather(
+        _load_section(
+            "partnerships",
+            partnerships_repo.list_for_user(user_id, with_users=True),
+            [], timeout, unavailable
+        ),
+        _load_section(
+            "goals",
+            list_goals_for_user(user_id, status="active"),
+            [], timeout, unavailable
+        ),
+        _load_section(
+            "upcoming_checkins",
+            _upcoming_checkins(user_id, settings.DASHBOARD_CHECKIN_LIMIT),
+            [], timeout, unavailable
+        ),
+        _load_section(
+            "notifications",
+            notifications_repo.list_for_user(user_id, limit=settings.DASHBOARD_NOTIFICATION_LIMIT),
+            [], timeout, unavailable
+        ),
+        _load_section(
+            "unread_notifications",
+            notifications_repo.count_unread(user_id),
+            0, timeout, unavailable
+        ),
+        _load_section(
+            "unread_messages",
+            messages_repo.count_unread_total(user_id),
+            0, timeout, unavailable
+        )
+    )
+    
+    return Dashboard(
+        partnerships=partnerships,
+        goals=goals,
+        upcoming_checkins=upcoming_checkins,
+        notifications=notifications,
+        unread_notifications=unread_notifications,
+        unread_messages=unread_messages,
+        unavailable_sections=unavailable
+    )
@@ -1,14 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import Any, Dict, List, Optional
 from ...models.user import User
-from ...models.goal import Goal, GoalCreate, GoalUpdate, GoalWithProgress
+from ...models.goal import Goal, GoalCreate, GoalStatus, GoalUpdate, GoalWithProgress
 from ...models.progress import ProgressUpdate, ProgressUpdateCreate
 from ...services.auth import get_current_user
-from ...core.supabase import get_supabase_client
+from ...services.notifications import send_goal_update_notification, send_progress_update_notification
+from ...services.partnerships import get_partner_id, is_partnership_member
+from ...services.goals import (
+    calculate_completion_percentage,
+    invalidate_goal_lists,
+    list_goals_for_partnership,
+    list_goals_for_user
+)
+from ...repositories import goals as goals_repo
+from ...repositories import partnerships as partnerships_repo
+from ...repositories import progress_updates as progress_repo
+from ...core.config import get_settings
+from ...core.etag import conditional_response, rows_etag
 
 router = APIRouter(prefix="/goals", tags=["goals"])
 
 
+async def _notify_partner_of_goal(goal: Dict[str, Any], current_user: User, update_type: str) -> None:
+    """Tell the goal owner's partner about a goal change (buffered by the notification writer)"""
+    partner_id = await get_partner_id(goal["partnership_id"], str(current_user.id))
+    if not partner_id:
+        return
+    
+    await send_goal_update_notification(
+        recipient_id=partner_id,
+        user_name=f"{current_user.first_name} {current_user.last_name}",
+        goal_id=goal["id"],
+        goal_title=goal["title"],
+        update_type=update_type
+    )
+
+
 @router.post("", response_model=Goal, status_code=status.HTTP_201_CREATED)
 async def create_goal(
     goal_data: GoalCreate,
@@ -17,14 +44,8 @@ async def create_goal(
     """
     Create a new goal
     """
-    supabase = get_supabase_client()
-    
     # Check if partnership exists and user is a member
-    partnership = supabase.table("partnerships").select("*").eq("id", goal_data.partnership_id).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
-    
-    if not partnership.data:
+    if not await is_partnership_member(str(current_user.id), goal_data.partnership_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Partnership not found"
@@ -42,53 +63,52 @@ async def create_goal(
     new_goal["user_id"] = str(new_goal["user_id"])  # Convert UUID to string
     new_goal["partnership_id"] = str(new_goal["partnership_id"])  # Convert UUID to string
     
-    response = supabase.table("goals").insert(new_goal).execute()
+    goal = await goals_repo.create(new_goal)
     
-    if not response.data:
+    if not goal:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create goal"
         )
     
-    return response.data[0]
+    await invalidate_goal_lists(goal)
+    await _notify_partner_of_goal(goal, current_user, "created")
+    
+    return goal
 
 
 @router.get("", response_model=List[Goal])
 async def get_goals(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     partnership_id: str = None,
-    status: str = None
+    goal_status: Optional[GoalStatus] = Query(None, alias="status")
 ):
     """
     Get all goals for the current user or for a specific partnership
-    """
-    supabase = get_supabase_client()
     
+    Supports If-None-Match.
+    """
     if partnership_id:
         # Check if partnership exists and user is a member
-        partnership = supabase.table("partnerships").select("*").eq("id", partnership_id).or_(
-            f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-        ).single().execute()
-        
-        if not partnership.data:
+        if not await is_partnership_member(str(current_user.id), partnership_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Partnership not found"
             )
         
         # Get goals for this partnership
-        query = supabase.table("goals").select("*").eq("partnership_id", partnership_id)
+        goals = await list_goals_for_partnership(partnership_id, status=goal_status)
     else:
         # Get all user's goals
-        query = supabase.table("goals").select("*").eq("user_id", str(current_user.id))
+        goals = await list_goals_for_user(str(current_user.id), status=goal_status)
     
-    # Filter by status if provided
-    if status:
-        query = query.eq("status", status)
+    not_modified = conditional_response(request, response, rows_etag(goals))
+    if not_modified:
+        return not_modified
     
-    response = query.execute()
-    
-    return response.data if response.data else []
+    return goals
 
 
 @router.get("/{goal_id}", response_model=GoalWithProgress)
@@ -99,42 +119,33 @@ async def get_goal(
     """
     Get a specific goal with its progress updates
     """
-    supabase = get_supabase_client()
-    
-    # Get the goal
-    goal = supabase.table("goals").select("*").eq("id", goal_id).single().execute()
-    
-    if not goal.data:
+    # Get the goal with its partnership members and recent progress updates in a single query
+    goal = await goals_repo.get_with_progress(
+        goal_id,
+        newest_first=True,
+        limit=get_settings().GOAL_RECENT_UPDATES_LIMIT
+    )
+    
+    if not goal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Goal not found"
         )
     
     # Check if user has access (either their goal or partner's goal)
-    partnership = supabase.table("partnerships").select("*").eq("id", goal.data["partnership_id"]).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
-    
-    if not partnership.data:
+    if not partnerships_repo.is_member(goal.pop("partnership"), current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have access to this goal"
         )
     
-    # Get progress updates for this goal
-    progress_updates = supabase.table("progress_updates").select("*").eq("goal_id", goal_id).order("created_at", desc=True).execute()
-    
-    # Calculate completion percentage if there are progress updates
-    completion_percentage = 0
-    if progress_updates.data:
-        # This is a simplified calculation - in a real app you'd need a more sophisticated approach
-        # based on your specific progress tracking method
-        completion_percentage = min(100, len(progress_updates.data) * 10)
+    progress_updates = goal.pop("progress_updates") or []
     
+    # Completion comes from the aggregates maintained on the goal, not the update history
     result = {
-        **goal.data,
-        "progress_updates": progress_updates.data if progress_updates.data else [],
-        "completion_percentage": completion_percentage
+        **goal,
+        "progress_updates": progress_updates,
+        "completion_percentage": calculate_completion_percentage(goal)
     }
     
     return result
@@ -149,12 +160,10 @@ async def update_goal(
     """
     Update a goal
     """
-    supabase = get_supabase_client()
-    
     # Check if goal exists and user is the owner
-    goal = supabase.table("goals").select("*").eq("id", goal_id).eq("user_id", str(current_user.id)).single().execute()
+    goal = await goals_repo.get_owned(goal_id, str(current_user.id))
     
-    if not goal.data:
+    if not goal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Goal not found or you're not the owner"
@@ -164,18 +173,23 @@ async def update_goal(
     update_data = {k: v for k, v in goal_update.model_dump().items() if v is not None}
     
     if not update_data:
-        return goal.data
+        return goal
     
     # Update goal
-    response = supabase.table("goals").update(update_data).eq("id", goal_id).execute()
+    updated_goal = await goals_repo.update(goal_id, update_data)
     
-    if not response.data:
+    if not updated_goal:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update goal"
         )
     
-    return response.data[0]
+    await invalidate_goal_lists(updated_goal)
+    
+    completed = update_data.get("status") == "completed" and goal["status"] != "completed"
+    await _notify_partner_of_goal(updated_goal, current_user, "completed" if completed else "updated")
+    
+    return updated_goal
 
 
 @router.post("/{goal_id}/progress", response_model=ProgressUpdate, status_code=status.HTTP_201_CREATED)
@@ -187,23 +201,17 @@ async def add_progress_update(
     """
     Add a progress update to a goal
     """
-    supabase = get_supabase_client()
-    
-    # Check if goal exists
-    goal = supabase.table("goals").select("*").eq("id", goal_id).single().execute()
+    # Check if goal exists (fetched together with its partnership members)
+    goal = await goals_repo.get_with_partnership(goal_id)
     
-    if not goal.data:
+    if not goal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Goal not found"
         )
     
     # Check if user has access (either their goal or partner's goal)
-    partnership = supabase.table("partnerships").select("*").eq("id", goal.data["partnership_id"]).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
-    
-    if not partnership.data:
+    if not partnerships_repo.is_member(goal["partnership"], current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have access to this goal"
@@ -217,12 +225,27 @@ async def add_progress_update(
         "progress_value": progress_data.progress_value
     }
     
-    response = supabase.table("progress_updates").insert(new_progress).execute()
+    progress_update = await progress_repo.create(new_progress)
     
-    if not response.data:
+    if not progress_update:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to add progress update"
         )
     
-    return response.data[0] 
\ No newline at end of file
+    # The goal's progress aggregates changed
+    await invalidate_goal_lists(goal)
+    
+    # Notify the other member: the partner when posting on your own goal, the owner otherwise
+    recipient_id = partnerships_repo.partner_id(goal["partnership"], current_user.id)
+    if recipient_id:
+        await send_progress_update_notification(
+            recipient_id=recipient_id,
+            user_name=f"{current_user.first_name} {current_user.last_name}",
+            goal_id=goal_id,
+            goal_title=goal["title"],
+            progress_id=progress_update["id"],
+            progress_description=progress_update["description"]
+        )
+    
+    return progress_update
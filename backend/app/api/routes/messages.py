@@ -1,14 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import List, Optional
 from datetime import datetime
+import asyncio
 from ...models.user import User
-from ...models.message import Message, MessageCreate
+from ...models.message import InboxEntry, Message, MessageCreate, MessagePage
+from ...core.etag import conditional_response, rows_etag
+from ...core.pagination import CursorKey, InvalidCursor, decode_cursor, row_cursor
 from ...services.auth import get_current_user
-from ...core.supabase import get_supabase_client
+from ...services.notifications import send_new_message_notification
+from ...services.partnerships import get_partner_id, is_partnership_member, require_partnership_member
+from ...services.realtime import hub, partnership_topic
+from ...repositories import messages as messages_repo
 
 router = APIRouter(prefix="/messages", tags=["messages"])
 
 
+async def _message_key(message_id: str, partnership_id: str) -> Optional[CursorKey]:
+    """The keyset cursor key of a message in the partnership, or None if there is no such message"""
+    message = await messages_repo.get_in_partnership(message_id, partnership_id)
+    return (message["created_at"], message["id"]) if message else None
+
+
 @router.post("", response_model=Message, status_code=status.HTTP_201_CREATED)
 async def create_message(
     message_data: MessageCreate,
@@ -17,14 +29,8 @@ async def create_message(
     """
     Send a new message to a partnership
     """
-    supabase = get_supabase_client()
-    
     # Check if partnership exists and user is a member
-    partnership = supabase.table("partnerships").select("*").eq("id", message_data.partnership_id).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
-    
-    if not partnership.data:
+    if not await is_partnership_member(str(current_user.id), message_data.partnership_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Partnership not found"
@@ -33,69 +39,178 @@ async def create_message(
     # Create the message
     new_message = {
         "partnership_id": str(message_data.partnership_id),
-        "sender_id": current_user.id,
+        "sender_id": str(current_user.id),
         "content": message_data.content,
         "created_at": datetime.now().isoformat(),
     }
     
-    response = supabase.table("messages").insert(new_message).execute()
+    message = await messages_repo.create(new_message)
     
-    if not response.data:
+    if not message:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create message"
         )
     
-    return response.data[0]
+    # Push to partners connected over /ws/partnerships/{id}
+    hub.publish(partnership_topic(message["partnership_id"]), {
+        "type": "message.created",
+        "message": message,
+    })
+    
+    # Buffered by the notification writer; not written before the response
+    partner_id = await get_partner_id(message["partnership_id"], str(current_user.id))
+    if partner_id:
+        await send_new_message_notification(
+            recipient_id=partner_id,
+            sender_name=f"{current_user.first_name} {current_user.last_name}",
+            partnership_id=message["partnership_id"],
+            message_id=message["id"],
+            message_preview=message["content"]
+        )
+    
+    return message
 
 
-@router.get("", response_model=List[Message])
+@router.get("", response_model=List[Message], dependencies=[Depends(require_partnership_member)])
 async def get_messages(
+    request: Request,
+    response: Response,
     partnership_id: str,
     current_user: User = Depends(get_current_user),
-    limit: int = 50,
-    before_id: str = None
+    limit: int = Query(50, ge=1, le=100),
+    before_id: Optional[str] = None
 ):
     """
-    Get messages for a specific partnership with optional pagination
+    Get the newest messages for a specific partnership, oldest first
+    
+    `before_id` takes the ID of the oldest message already loaded to scroll back.
+    This is the original list response; /messages/page returns the same messages
+    with cursors in both directions and whether more messages exist.
+    Supports If-None-Match.
     """
-    supabase = get_supabase_client()
+    # The message's (created_at, id) is the keyset cursor; unknown IDs are ignored
+    # as they always were, returning the newest messages
+    before_key = await _message_key(before_id, partnership_id) if before_id else None
     
-    # Check if partnership exists and user is a member
-    partnership = supabase.table("partnerships").select("*").eq("id", partnership_id).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
+    rows = await messages_repo.list_for_partnership(partnership_id, limit=limit, before=before_key)
+    messages = list(reversed(rows))
+    
+    etag = rows_etag(messages, fields=("id",))
+    not_modified = conditional_response(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    return messages
+
+
+@router.get("/page", response_model=MessagePage, dependencies=[Depends(require_partnership_member)])
+async def get_message_page(
+    request: Request,
+    response: Response,
+    partnership_id: str,
+    current_user: User = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=100),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    around: Optional[str] = None,
+    before_id: Optional[str] = None
+):
+    """
+    Get a page of messages for a specific partnership, oldest first
     
-    if not partnership.data:
+    Without parameters the newest messages are returned. `before` and `after` take
+    the cursors of a previous page to scroll back or forward, and `around` takes a
+    message ID and returns the page centered on that message. `before_id` takes a
+    message ID like GET /messages does and is equivalent to that message's cursor.
+    Supports If-None-Match.
+    """
+    if sum(param is not None for param in (before, after, around, before_id)) > 1:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Partnership not found or you don't have access"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only one of before, after, around or before_id can be used"
         )
     
-    # Base query for messages in this partnership
-    query = supabase.table("messages").select("*").eq("partnership_id", partnership_id)
+    try:
+        before_key = decode_cursor(before) if before else None
+        after_key = decode_cursor(after) if after else None
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
     
-    # Apply pagination if a before_id is provided
     if before_id:
-        # Get created_at of the before_id message
-        before_message = supabase.table("messages").select("created_at").eq("id", before_id).single().execute()
-        if before_message.data:
-            before_timestamp = before_message.data["created_at"]
-            query = query.lt("created_at", before_timestamp)
-    
-    # Order by timestamp (descending) and limit results
-    query = query.order("created_at", desc=True).limit(limit)
-    
-    response = query.execute()
-    
-    if not response.data:
-        return []
-    
-    # Return messages in reverse order to get oldest first
-    return list(reversed(response.data))
+        before_key = await _message_key(before_id, partnership_id)
+        
+        if not before_key:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Message not found"
+            )
+    
+    # Each query fetches one extra row to find out whether more messages exist
+    if around:
+        anchor = await messages_repo.get_in_partnership(around, partnership_id)
+        
+        if not anchor:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Message not found"
+            )
+        
+        anchor_key = (anchor["created_at"], anchor["id"])
+        older_limit = (limit - 1) // 2
+        newer_limit = limit - 1 - older_limit
+        
+        older, newer = await asyncio.gather(
+            messages_repo.list_for_partnership(partnership_id, limit=older_limit + 1, before=anchor_key),
+            messages_repo.list_for_partnership(partnership_id, limit=newer_limit + 1, after=anchor_key)
+        )
+        
+        messages = list(reversed(older[:older_limit])) + [anchor] + newer[:newer_limit]
+        has_older = len(older) > older_limit
+        has_newer = len(newer) > newer_limit
+    elif after_key:
+        rows = await messages_repo.list_for_partnership(partnership_id, limit=limit + 1, after=after_key)
+        
+        messages = rows[:limit]
+        has_older = True
+        has_newer = len(rows) > limit
+    else:
+        rows = await messages_repo.list_for_partnership(partnership_id, limit=limit + 1, before=before_key)
+        
+        # Rows come newest first; return them oldest first
+        messages = list(reversed(rows[:limit]))
+        has_older = len(rows) > limit
+        has_newer = before_key is not None
+    
+    # Messages are never edited, so IDs and the page boundaries identify the page
+    etag = rows_etag(messages, fields=("id",), extra=f"{has_older}:{has_newer}")
+    not_modified = conditional_response(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    return MessagePage(
+        messages=messages,
+        before_cursor=row_cursor(messages[0]) if messages else before,
+        after_cursor=row_cursor(messages[-1]) if messages else after,
+        has_older=has_older,
+        has_newer=has_newer
+    )
 
 
-@router.get("/unread", response_model=int)
+@router.get("/inbox", response_model=List[InboxEntry])
+async def get_inbox(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the last message and unread count of every partnership of the current user
+    """
+    return await messages_repo.get_inbox(str(current_user.id))
+
+
+@router.get("/unread", response_model=int, dependencies=[Depends(require_partnership_member)])
 async def get_unread_count(
     partnership_id: str,
     current_user: User = Depends(get_current_user)
@@ -103,41 +218,14 @@ async def get_unread_count(
     """
     Get the count of unread messages for a partnership
     """
-    supabase = get_supabase_client()
-    
-    # Check if partnership exists and user is a member
-    partnership = supabase.table("partnerships").select("*").eq("id", partnership_id).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
-    
-    if not partnership.data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Partnership not found or you don't have access"
-        )
-    
-    # Get the last read timestamp for this user and partnership
-    last_read = supabase.table("message_reads").select("last_read_at").eq("user_id", current_user.id).eq(
-        "partnership_id", partnership_id
-    ).single().execute()
-    
-    if not last_read.data:
-        # If no read record exists, count all messages not sent by the user
-        count_query = supabase.table("messages").select("id", count="exact").eq("partnership_id", partnership_id).neq(
-            "sender_id", current_user.id
-        )
-    else:
-        # Count messages newer than last read that weren't sent by the user
-        count_query = supabase.table("messages").select("id", count="exact").eq("partnership_id", partnership_id).neq(
-            "sender_id", current_user.id
-        ).gt("created_at", last_read.data["last_read_at"])
-    
-    count_result = count_query.execute()
-    
-    return count_result.count if hasattr(count_result, "count") else 0
+    return await messages_repo.count_unread(partnership_id, str(current_user.id))
 
 
-@router.post("/{partnership_id}/mark-read", status_code=status.HTTP_204_NO_CONTENT)
+@router.post(
+    "/{partnership_id}/mark-read",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(require_partnership_member)]
+)
 async def mark_messages_read(
     partnership_id: str,
     current_user: User = Depends(get_current_user)
@@ -145,38 +233,7 @@ async def mark_messages_read(
     """
     Mark all messages in a partnership as read for the current user
     """
-    supabase = get_supabase_client()
-    
-    # Check if partnership exists and user is a member
-    partnership = supabase.table("partnerships").select("*").eq("id", partnership_id).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
-    
-    if not partnership.data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Partnership not found or you don't have access"
-        )
-    
-    # Upsert read record with current timestamp
-    read_data = {
-        "user_id": current_user.id,
-        "partnership_id": partnership_id,
-        "last_read_at": datetime.now().isoformat()
-    }
-    
-    # Check if read record already exists
-    existing_read = supabase.table("message_reads").select("*").eq("user_id", current_user.id).eq(
-        "partnership_id", partnership_id
-    ).single().execute()
-    
-    if existing_read.data:
-        # Update existing record
-        supabase.table("message_reads").update(read_data).eq("user_id", current_user.id).eq(
-            "partnership_id", partnership_id
-        ).execute()
-    else:
-        # Insert new record
-        supabase.table("message_reads").insert(read_data).execute()
+    # Move the read marker to the current timestamp
+    await messages_repo.mark_read(partnership_id, str(current_user.id), datetime.now().isoformat())
     
-    return None 
\ No newline at end of file
+    return None
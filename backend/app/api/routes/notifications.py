@@ -1,18 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional
+from ...core.etag import conditional_response, rows_etag
 from ...models.user import User
 from ...services.auth import get_current_user
 from ...services.notifications import (
     get_user_notifications,
     mark_notification_read,
-    mark_all_notifications_read
+    mark_all_notifications_read,
+    get_unread_notification_count,
+    refresh_unread_count
 )
+from ...services.notification_stream import TooManyStreams, close_stream, notification_events, open_stream
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
 
 @router.get("", response_model=List[Dict[str, Any]])
 async def get_notifications(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     limit: int = 20,
     unread_only: bool = False
@@ -20,6 +27,8 @@ async def get_notifications(
     """
     Get notifications for the current user
     
+    Supports If-None-Match; the ETag changes when a notification arrives or is read.
+    
     Args:
         limit: Maximum number of notifications to return
         unread_only: Whether to return only unread notifications
@@ -33,6 +42,12 @@ async def get_notifications(
         unread_only=unread_only
     )
     
+    # Notifications have no updated_at; only their read flag ever changes
+    etag = rows_etag(notifications, fields=("id", "read"))
+    not_modified = conditional_response(request, response, etag)
+    if not_modified:
+        return not_modified
+    
     return notifications
 
 
@@ -55,6 +70,8 @@ async def read_notification(
             detail="Failed to mark notification as read"
         )
     
+    await refresh_unread_count(str(current_user.id))
+    
     return None
 
 
@@ -86,9 +103,49 @@ async def get_unread_count(
     Returns:
         The number of unread notifications
     """
-    notifications = await get_user_notifications(
-        user_id=str(current_user.id),
-        unread_only=True
-    )
+    return await get_unread_notification_count(str(current_user.id)) 
+
+
+@router.get("/stream")
+async def stream_notifications(
+    current_user: User = Depends(get_current_user),
+    last_event_id: Optional[str] = Header(None),
+    resume_from: Optional[str] = None
+):
+    """
+    Server-Sent Events stream of new notifications and unread count changes
+    
+    Sends `notification` events (the notification record) and `unread_count`
+    events ({"unread_count": n}). Reconnecting clients resume after the
+    Last-Event-ID header, or the `resume_from` query parameter on a first
+    connection, from the stored notifications.
+    
+    Returns:
+        A text/event-stream response
+    """
+    user_id = str(current_user.id)
+    
+    try:
+        open_stream(user_id)
+    except TooManyStreams:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many open notification streams"
+        )
+    
+    async def events():
+        try:
+            async for frame in notification_events(user_id, last_event_id or resume_from):
+                yield frame
+        finally:
+            close_stream(user_id)
     
-    return len(notifications) 
\ No newline at end of file
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop reverse proxies from buffering the stream
+            "X-Accel-Buffering": "no"
+        }
+    )
\ No newline at end of file
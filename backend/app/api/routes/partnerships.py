@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from typing import List
 import uuid
 import secrets
@@ -7,9 +7,20 @@ from ...models.user import User
 from ...models.partnership import Partnership, PartnershipCreate, PartnershipUpdate, PartnershipRequest, PartnershipSearchQuery, PartnershipAgreement
 from ...models.invitation import PendingInvitation, PendingInvitationCreate
 from ...services.auth import get_current_user
+from ...services.partnerships import (
+    get_agreement,
+    get_partnership_details,
+    invalidate_partnership,
+    invalidate_partnership_details,
+    require_partnership_member
+)
 from ...services.email import send_partnership_invitation_email
-from ...core.supabase import get_supabase_client
+from ...repositories import users as users_repo
+from ...repositories import partnerships as partnerships_repo
+from ...repositories import pending_invitations as invitations_repo
 from ...core.config import get_settings
+from ...core.database import DatabaseError
+from ...core.etag import conditional_response, rows_etag
 
 router = APIRouter(prefix="/partnerships", tags=["partnerships"])
 
@@ -24,8 +35,6 @@ async def create_partnership(
     If is_new_user=True, sends an invitation email to a new user.
     Otherwise, creates a partnership with an existing user.
     """
-    supabase = get_supabase_client()
-    
     # For inviting a new user who doesn't have an account
     if partnership_request.is_new_user:
         # Generate unique token for the invitation
@@ -46,9 +55,9 @@ async def create_partnership(
         }
         
         # Save invitation to database
-        response = supabase.table("pending_invitations").insert(invitation_data).execute()
+        invitation = await invitations_repo.create(invitation_data)
         
-        if not response.data:
+        if not invitation:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to create invitation"
@@ -83,72 +92,38 @@ async def create_partnership(
     
     # For inviting an existing user
     else:
-        # Find the partner by email
-        partner_response = supabase.table("users").select("*").eq("email", partnership_request.partner_email).execute()
-        
-        if not partner_response.data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User with that email not found"
-            )
-        
-        partner = partner_response.data[0]
-        
-        # Check if a partnership already exists between these users
-        existing_partnership = supabase.table("partnerships").select("*").or_(
-            f"user1_id.eq.{current_user.id},user2_id.eq.{partner['id']}",
-            f"user1_id.eq.{partner['id']},user2_id.eq.{current_user.id}"
-        ).execute()
-        
-        if existing_partnership.data:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="A partnership already exists between these users"
+        # Partner lookup, duplicate check, partnership, agreement and invitation
+        # message are all written in a single transaction
+        try:
+            partnership = await partnerships_repo.create_request(
+                str(current_user.id),
+                partnership_request.partner_email,
+                agreement=partnership_request.agreement.model_dump() if partnership_request.agreement else None,
+                message=partnership_request.message
             )
+        except DatabaseError as e:
+            if e.code == "P0002":
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="User with that email not found"
+                )
+            if e.code == "23505":
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="A partnership already exists between these users"
+                )
+            raise
         
-        # Create the partnership
-        new_partnership = {
-            "user1_id": str(current_user.id),
-            "user2_id": partner["id"],
-            "status": "pending",
-            "is_user_exists": True,
-            "trial_end_date": (datetime.now() + timedelta(days=14)).isoformat()
-        }
-        
-        response = supabase.table("partnerships").insert(new_partnership).execute()
-        
-        if not response.data:
+        if not partnership:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to create partnership"
             )
         
-        # Store partnership agreement if provided
-        if partnership_request.agreement:
-            agreement_data = {
-                "partnership_id": response.data[0]["id"],
-                "communication_frequency": partnership_request.agreement.communication_frequency,
-                "check_in_days": partnership_request.agreement.check_in_days,
-                "expectations": partnership_request.agreement.expectations,
-                "commitment_level": partnership_request.agreement.commitment_level,
-                "feedback_style": partnership_request.agreement.feedback_style,
-                "created_by": str(current_user.id)
-            }
-            
-            supabase.table("partnership_agreements").insert(agreement_data).execute()
-        
-        # Store invitation message if provided
-        if partnership_request.message:
-            message_data = {
-                "partnership_id": response.data[0]["id"],
-                "sender_id": str(current_user.id),
-                "content": partnership_request.message,
-                "is_invitation_message": True
-            }
-            
-            supabase.table("messages").insert(message_data).execute()
+        # Both users now belong to a new partnership
+        invalidate_partnership(partnership)
         
-        return response.data[0]
+        return partnership
 
 
 @router.get("/invitations", response_model=List[PendingInvitation])
@@ -158,11 +133,7 @@ async def get_pending_invitations(
     """
     Get all pending invitations sent by the current user
     """
-    supabase = get_supabase_client()
-    
-    response = supabase.table("pending_invitations").select("*").eq("inviter_id", str(current_user.id)).execute()
-    
-    return response.data if response.data else []
+    return await invitations_repo.list_for_inviter(str(current_user.id))
 
 
 # Add route to check if an invitation token is valid
@@ -172,23 +143,19 @@ async def validate_invitation_token(token: str):
     Validate an invitation token
     Returns the invitation details if valid, or a 404 if not
     """
-    supabase = get_supabase_client()
+    invitation = await invitations_repo.get_pending_by_token(token)
     
-    response = supabase.table("pending_invitations").select("*").eq("invitation_token", token).eq("status", "pending").execute()
-    
-    if not response.data:
+    if not invitation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Invalid or expired invitation token"
         )
     
-    invitation = response.data[0]
-    
     # Check if the invitation has expired
     expires_at = datetime.fromisoformat(invitation["expires_at"].replace("Z", "+00:00"))
     if datetime.now() > expires_at:
         # Update invitation status to expired
-        supabase.table("pending_invitations").update({"status": "expired"}).eq("id", invitation["id"]).execute()
+        await invitations_repo.update_status(invitation["id"], "expired")
         
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -196,8 +163,7 @@ async def validate_invitation_token(token: str):
         )
     
     # Get inviter details
-    inviter_response = supabase.table("users").select("first_name, last_name").eq("id", invitation["inviter_id"]).execute()
-    inviter = inviter_response.data[0] if inviter_response.data else {"first_name": "Someone", "last_name": ""}
+    inviter = await users_repo.get_name(invitation["inviter_id"]) or {"first_name": "Someone", "last_name": ""}
     
     return {
         "valid": True,
@@ -210,29 +176,28 @@ async def validate_invitation_token(token: str):
 
 @router.get("", response_model=List[Partnership])
 async def get_partnerships(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     status: str = None
 ):
     """
     Get all partnerships for the current user
+    
+    Supports If-None-Match; the ETag covers the partnerships and their embedded users.
     """
-    supabase = get_supabase_client()
-    
-    # Build the base query with user details
-    query = supabase.table("partnerships").select(
-        "*",
-        "user1:users!partnerships_user1_id_fkey(*)",
-        "user2:users!partnerships_user2_id_fkey(*)"
-    ).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
+    # Fetch partnerships with user details embedded
+    partnerships = await partnerships_repo.list_for_user(
+        str(current_user.id),
+        status=status,
+        with_users=True
     )
     
-    if status:
-        query = query.eq("status", status)
-    
-    response = query.execute()
+    not_modified = conditional_response(request, response, rows_etag(partnerships))
+    if not_modified:
+        return not_modified
     
-    return response.data if response.data else []
+    return partnerships
 
 
 @router.get("/{partnership_id}", response_model=Partnership)
@@ -243,23 +208,15 @@ async def get_partnership(
     """
     Get a specific partnership by ID
     """
-    supabase = get_supabase_client()
-    
-    response = supabase.table("partnerships").select(
-        "*",
-        "user1:users!partnerships_user1_id_fkey(*)",
-        "user2:users!partnerships_user2_id_fkey(*)"
-    ).eq("id", partnership_id).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
+    partnership = await get_partnership_details(partnership_id, str(current_user.id))
     
-    if not response.data:
+    if not partnership:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Partnership not found"
         )
     
-    return response.data
+    return partnership
 
 
 @router.put("/{partnership_id}", response_model=Partnership)
@@ -271,14 +228,10 @@ async def update_partnership(
     """
     Update a partnership (status, trial end date)
     """
-    supabase = get_supabase_client()
-    
     # Check if partnership exists and user is a member
-    partnership = supabase.table("partnerships").select("*").eq("id", partnership_id).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
+    partnership = await partnerships_repo.get_for_member(partnership_id, str(current_user.id))
     
-    if not partnership.data:
+    if not partnership:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Partnership not found"
@@ -288,18 +241,22 @@ async def update_partnership(
     update_data = {k: v for k, v in partnership_update.model_dump().items() if v is not None}
     
     if not update_data:
-        return partnership.data
+        return partnership
     
     # Update partnership
-    response = supabase.table("partnerships").update(update_data).eq("id", partnership_id).execute()
+    updated = await partnerships_repo.update(partnership_id, update_data)
     
-    if not response.data:
+    if not updated:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update partnership"
         )
     
-    return response.data[0]
+    # Membership statuses changed for both partners
+    invalidate_partnership(updated)
+    await invalidate_partnership_details(partnership_id)
+    
+    return updated
 
 
 @router.post("/{partnership_id}/accept", response_model=Partnership)
@@ -310,30 +267,32 @@ async def accept_partnership(
     """
     Accept a pending partnership request
     """
-    supabase = get_supabase_client()
-    
     # Check if partnership exists and user is the recipient (user2_id)
-    partnership = supabase.table("partnerships").select("*").eq("id", partnership_id).eq("user2_id", str(current_user.id)).eq("status", "pending").single().execute()
+    partnership = await partnerships_repo.get_pending_for_recipient(partnership_id, str(current_user.id))
     
-    if not partnership.data:
+    if not partnership:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pending partnership request not found"
         )
     
     # Update partnership status to trial
-    response = supabase.table("partnerships").update({
+    updated = await partnerships_repo.update(partnership_id, {
         "status": "trial",
         "trial_end_date": (datetime.now() + timedelta(days=14)).isoformat()
-    }).eq("id", partnership_id).execute()
+    })
     
-    if not response.data:
+    if not updated:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to accept partnership"
         )
     
-    return response.data[0]
+    # Membership statuses changed for both partners
+    invalidate_partnership(updated)
+    await invalidate_partnership_details(partnership_id)
+    
+    return updated
 
 
 @router.post("/{partnership_id}/decline", response_model=Partnership)
@@ -344,29 +303,31 @@ async def decline_partnership(
     """
     Decline a pending partnership request
     """
-    supabase = get_supabase_client()
-    
     # Check if partnership exists and user is the recipient (user2_id)
-    partnership = supabase.table("partnerships").select("*").eq("id", partnership_id).eq("user2_id", str(current_user.id)).eq("status", "pending").single().execute()
+    partnership = await partnerships_repo.get_pending_for_recipient(partnership_id, str(current_user.id))
     
-    if not partnership.data:
+    if not partnership:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pending partnership request not found"
         )
     
     # Update partnership status to ended
-    response = supabase.table("partnerships").update({
+    updated = await partnerships_repo.update(partnership_id, {
         "status": "ended"
-    }).eq("id", partnership_id).execute()
+    })
     
-    if not response.data:
+    if not updated:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to decline partnership"
         )
     
-    return response.data[0]
+    # Membership statuses changed for both partners
+    invalidate_partnership(updated)
+    await invalidate_partnership_details(partnership_id)
+    
+    return updated
 
 
 @router.post("/{partnership_id}/finalize", response_model=Partnership)
@@ -377,32 +338,36 @@ async def finalize_partnership(
     """
     Finalize a partnership after trial period, converting it to active status
     """
-    supabase = get_supabase_client()
-    
     # Check if partnership exists and user is a member
-    partnership = supabase.table("partnerships").select("*").eq("id", partnership_id).eq("status", "trial").or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
+    partnership = await partnerships_repo.get_for_member(
+        partnership_id,
+        str(current_user.id),
+        status="trial"
+    )
     
-    if not partnership.data:
+    if not partnership:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Trial partnership not found"
         )
     
     # Update partnership status to active
-    response = supabase.table("partnerships").update({
+    updated = await partnerships_repo.update(partnership_id, {
         "status": "active",
         "trial_end_date": None
-    }).eq("id", partnership_id).execute()
+    })
     
-    if not response.data:
+    if not updated:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to finalize partnership"
         )
     
-    return response.data[0]
+    # Membership statuses changed for both partners
+    invalidate_partnership(updated)
+    await invalidate_partnership_details(partnership_id)
+    
+    return updated
 
 
 @router.post("/{partnership_id}/end-trial", response_model=Partnership)
@@ -413,34 +378,42 @@ async def end_trial_partnership(
     """
     End a partnership during the trial period
     """
-    supabase = get_supabase_client()
-    
     # Check if partnership exists and user is a member
-    partnership = supabase.table("partnerships").select("*").eq("id", partnership_id).eq("status", "trial").or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
+    partnership = await partnerships_repo.get_for_member(
+        partnership_id,
+        str(current_user.id),
+        status="trial"
+    )
     
-    if not partnership.data:
+    if not partnership:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Trial partnership not found"
         )
     
     # Update partnership status to ended
-    response = supabase.table("partnerships").update({
+    updated = await partnerships_repo.update(partnership_id, {
         "status": "ended"
-    }).eq("id", partnership_id).execute()
+    })
     
-    if not response.data:
+    if not updated:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to end trial partnership"
         )
     
-    return response.data[0]
+    # Membership statuses changed for both partners
+    invalidate_partnership(updated)
+    await invalidate_partnership_details(partnership_id)
+    
+    return updated
 
 
-@router.post("/{partnership_id}/agreement", response_model=PartnershipAgreement)
+@router.post(
+    "/{partnership_id}/agreement",
+    response_model=PartnershipAgreement,
+    dependencies=[Depends(require_partnership_member)]
+)
 async def create_or_update_agreement(
     partnership_id: str,
     agreement: PartnershipAgreement,
@@ -449,21 +422,8 @@ async def create_or_update_agreement(
     """
     Create or update a partnership agreement
     """
-    supabase = get_supabase_client()
-    
-    # Check if partnership exists and user is a member
-    partnership = supabase.table("partnerships").select("*").eq("id", partnership_id).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
-    
-    if not partnership.data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Partnership not found"
-        )
-    
     # Check if an agreement already exists
-    existing_agreement = supabase.table("partnership_agreements").select("*").eq("partnership_id", partnership_id).single().execute()
+    existing_agreement = await partnerships_repo.get_agreement(partnership_id)
     
     agreement_data = {
         "partnership_id": partnership_id,
@@ -475,24 +435,30 @@ async def create_or_update_agreement(
         "updated_by": str(current_user.id)
     }
     
-    if existing_agreement.data:
+    if existing_agreement:
         # Update existing agreement
-        response = supabase.table("partnership_agreements").update(agreement_data).eq("id", existing_agreement.data["id"]).execute()
+        saved_agreement = await partnerships_repo.update_agreement(existing_agreement["id"], agreement_data)
     else:
         # Create new agreement
         agreement_data["created_by"] = str(current_user.id)
-        response = supabase.table("partnership_agreements").insert(agreement_data).execute()
+        saved_agreement = await partnerships_repo.create_agreement(agreement_data)
     
-    if not response.data:
+    if not saved_agreement:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to save partnership agreement"
         )
     
-    return response.data[0]
+    await invalidate_partnership_details(partnership_id)
+    
+    return saved_agreement
 
 
-@router.get("/{partnership_id}/agreement", response_model=PartnershipAgreement)
+@router.get(
+    "/{partnership_id}/agreement",
+    response_model=PartnershipAgreement,
+    dependencies=[Depends(require_partnership_member)]
+)
 async def get_partnership_agreement(
     partnership_id: str,
     current_user: User = Depends(get_current_user)
@@ -500,28 +466,15 @@ async def get_partnership_agreement(
     """
     Get the agreement for a specific partnership
     """
-    supabase = get_supabase_client()
+    agreement = await get_agreement(partnership_id)
     
-    # Check if partnership exists and user is a member
-    partnership = supabase.table("partnerships").select("*").eq("id", partnership_id).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
-    
-    if not partnership.data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Partnership not found"
-        )
-    
-    agreement = supabase.table("partnership_agreements").select("*").eq("partnership_id", partnership_id).single().execute()
-    
-    if not agreement.data:
+    if not agreement:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Partnership agreement not found"
         )
     
-    return agreement.data
+    return agreement
 
 
 @router.get("/search", response_model=List[User])
@@ -532,27 +485,22 @@ async def search_potential_partners(
     """
     Search for potential partners based on criteria
     """
-    supabase = get_supabase_client()
-    
-    # Start with selecting all users except current user
-    search_query = supabase.table("users").select("*").neq("id", str(current_user.id))
+    # Build filters based on query parameters
+    filters = {}
     
-    # Add filters based on query parameters
     if query.goal_type:
         # This assumes there's a user_goals or user_preferences table with goal types
         # You'd need to adjust this based on your actual schema
-        search_query = search_query.eq("goal_type", query.goal_type)
+        filters["goal_type"] = query.goal_type
     
     if query.commitment_level:
         # This assumes users have a commitment_level preference
-        search_query = search_query.eq("commitment_level", query.commitment_level)
-    
-    # Add pagination
-    search_query = search_query.range(query.offset, query.offset + query.limit - 1)
-    
-    response = search_query.execute()
-    
-    if not response.data:
-        return []
-    
-    return response.data 
\ No newline at end of file
+        filters["commitment_level"] = query.commitment_level
+    
+    # Search all users except current user, with pagination
+    return await users_repo.search(
+        str(current_user.id),
+        filters,
+        offset=query.offset,
+        limit=query.limit
+    ) 
\ No newline at end of file
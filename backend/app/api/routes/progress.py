@@ -3,7 +3,10 @@ from typing import List
 from ...models.user import User
 from ...models.progress import ProgressUpdate, ProgressUpdateCreate
 from ...services.auth import get_current_user
-from ...core.supabase import get_supabase_client
+from ...services.goals import invalidate_goal_lists
+from ...repositories import goals as goals_repo
+from ...repositories import partnerships as partnerships_repo
+from ...repositories import progress_updates as progress_repo
 
 router = APIRouter(prefix="/progress", tags=["progress"])
 
@@ -16,30 +19,24 @@ async def create_progress_update(
     """
     Create a new progress update for a goal
     """
-    supabase = get_supabase_client()
+    # Check if goal exists and user has access to it (goal and partnership members in one query)
+    goal = await goals_repo.get_with_partnership(str(progress_data.goal_id))
     
-    # Check if goal exists and user has access to it
-    goal = supabase.table("goals").select("*").eq("id", progress_data.goal_id).single().execute()
-    
-    if not goal.data:
+    if not goal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Goal not found"
         )
     
-    # Get the partnership associated with the goal
-    partnership = supabase.table("partnerships").select("*").eq("id", goal.data["partnership_id"]).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
-    
-    if not partnership.data:
+    # Check membership of the partnership associated with the goal
+    if not partnerships_repo.is_member(goal["partnership"], current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have access to this goal"
         )
     
     # Check if the user is the goal owner
-    if goal.data["user_id"] != current_user.id:
+    if goal["user_id"] != str(current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only update progress for your own goals"
@@ -48,17 +45,20 @@ async def create_progress_update(
     # Create progress update
     new_progress = progress_data.model_dump()
     new_progress["goal_id"] = str(new_progress["goal_id"])  # Convert UUID to string
-    new_progress["user_id"] = current_user.id
+    new_progress["user_id"] = str(current_user.id)
     
-    response = supabase.table("progress_updates").insert(new_progress).execute()
+    progress_update = await progress_repo.create(new_progress)
     
-    if not response.data:
+    if not progress_update:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create progress update"
         )
     
-    return response.data[0]
+    # The goal's progress aggregates changed
+    await invalidate_goal_lists(goal)
+    
+    return progress_update
 
 
 @router.get("", response_model=List[ProgressUpdate])
@@ -69,32 +69,23 @@ async def get_progress_updates(
     """
     Get all progress updates for a specific goal
     """
-    supabase = get_supabase_client()
+    # Get the goal with its partnership members and progress updates in a single query
+    goal = await goals_repo.get_with_progress(goal_id)
     
-    # Check if goal exists
-    goal = supabase.table("goals").select("*").eq("id", goal_id).single().execute()
-    
-    if not goal.data:
+    if not goal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Goal not found"
         )
     
     # Check if user has access to the goal's partnership
-    partnership = supabase.table("partnerships").select("*").eq("id", goal.data["partnership_id"]).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
-    
-    if not partnership.data:
+    if not partnerships_repo.is_member(goal["partnership"], current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have access to this goal"
         )
     
-    # Get progress updates
-    response = supabase.table("progress_updates").select("*").eq("goal_id", goal_id).order("created_at").execute()
-    
-    return response.data if response.data else []
+    return goal["progress_updates"] or []
 
 
 @router.get("/{update_id}", response_model=ProgressUpdate)
@@ -105,38 +96,31 @@ async def get_progress_update(
     """
     Get a specific progress update
     """
-    supabase = get_supabase_client()
-    
-    # Get the progress update
-    update = supabase.table("progress_updates").select("*, goals(*)").eq("id", update_id).single().execute()
+    # Get the progress update together with its goal's partnership members
+    update = await progress_repo.get_with_partnership(update_id)
     
-    if not update.data:
+    if not update:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Progress update not found"
         )
     
     # Check if user has access to the associated goal's partnership
-    goal_id = update.data["goal_id"]
-    goal = supabase.table("goals").select("*").eq("id", goal_id).single().execute()
+    goal = update.pop("goal")
     
-    if not goal.data:
+    if not goal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Associated goal not found"
         )
     
-    partnership = supabase.table("partnerships").select("*").eq("id", goal.data["partnership_id"]).or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).single().execute()
-    
-    if not partnership.data:
+    if not partnerships_repo.is_member(goal["partnership"], current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have access to this progress update"
         )
     
-    return update.data
+    return update
 
 
 @router.delete("/{update_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -147,24 +131,27 @@ async def delete_progress_update(
     """
     Delete a progress update (only if you created it)
     """
-    supabase = get_supabase_client()
-    
     # Check if progress update exists and belongs to the current user
-    update = supabase.table("progress_updates").select("*").eq("id", update_id).single().execute()
+    update = await progress_repo.get_by_id(update_id)
     
-    if not update.data:
+    if not update:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Progress update not found"
         )
     
-    if update.data["user_id"] != current_user.id:
+    if update["user_id"] != str(current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only delete your own progress updates"
         )
     
     # Delete the progress update
-    supabase.table("progress_updates").delete().eq("id", update_id).execute()
+    await progress_repo.delete(update_id)
+    
+    # The goal's progress aggregates changed
+    goal = await goals_repo.get_by_id(update["goal_id"])
+    if goal:
+        await invalidate_goal_lists(goal)
     
-    return None 
\ No newline at end of file
+    return None
@@ -0,0 +1,107 @@
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+from typing import Optional
+import asyncio
+import json
+import logging
+from ...services.auth import get_user_from_token
+from ...services.partnerships import is_partnership_member
+from ...services.realtime import Subscription, hub, partnership_topic
+
+router = APIRouter(prefix="/ws", tags=["realtime"])
+
+logger = logging.getLogger(__name__)
+
+# WebSocket close code for "try again later" (not defined in fastapi.status)
+WS_1013_TRY_AGAIN_LATER = 1013
+
+# Seconds a client has to send its auth frame after connecting
+AUTH_TIMEOUT_SECONDS = 10.0
+
+
+@router.websocket("/partnerships/{partnership_id}")
+async def partnership_channel(
+    websocket: WebSocket,
+    partnership_id: str
+):
+    """
+    Push new messages in a partnership to its connected members
+    
+    Clients that can set headers authenticate with an Authorization header.
+    Browsers cannot, so they send {"type": "auth", "token": "<access token>"}
+    as their first message instead; the token is never put in the URL, where it
+    would end up in access logs. Once authenticated the server sends
+    {"type": "ready"}, then events as JSON objects:
+    {"type": "message.created", "message": {...}}.
+    Sending "ping" gets "pong" back.
+    """
+    await websocket.accept()
+    
+    authorization = websocket.headers.get("authorization", "")
+    token = authorization[7:] if authorization.lower().startswith("bearer ") else await _read_auth_frame(websocket)
+    
+    try:
+        if not token:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+        current_user = await get_user_from_token(token)
+    except HTTPException:
+        await _close_quietly(websocket, status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    if not await is_partnership_member(str(current_user.id), partnership_id):
+        await _close_quietly(websocket, status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    async with hub.subscribe(partnership_topic(partnership_id)) as subscription:
+        await websocket.send_text(json.dumps({"type": "ready"}))
+        
+        sender = asyncio.create_task(_forward_events(websocket, subscription))
+        receiver = asyncio.create_task(_read_client(websocket))
+        
+        # Whichever side finishes first (client gone, or subscriber dropped) ends the session
+        done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                logger.warning(f"Partnership channel {partnership_id} closed after an error: {error!r}")
+    
+    if subscription.overflowed:
+        # Too far behind; the client should reconnect and catch up via GET /messages
+        await _close_quietly(websocket, WS_1013_TRY_AGAIN_LATER)
+
+
+async def _read_auth_frame(websocket: WebSocket) -> Optional[str]:
+    """The token of the client's first message if it is an auth frame, else None"""
+    try:
+        frame = json.loads(await asyncio.wait_for(websocket.receive_text(), timeout=AUTH_TIMEOUT_SECONDS))
+    except (asyncio.TimeoutError, WebSocketDisconnect, ValueError, KeyError):
+        return None
+
+    if not isinstance(frame, dict) or frame.get("type") != "auth" or not isinstance(frame.get("token"), str):
+        return None
+    return frame["token"]
+
+
+async def _forward_events(websocket: WebSocket, subscription: Subscription) -> None:
+    async for payload in subscription:
+        await websocket.send_text(payload)
+
+
+async def _read_client(websocket: WebSocket) -> None:
+    try:
+        while True:
+            if await websocket.receive_text() == "ping":
+                await websocket.send_text("pong")
+    except WebSocketDisconnect:
+        pass
+
+
+async def _close_quietly(websocket: WebSocket, code: int) -> None:
+    try:
+        await websocket.close(code=code)
+    except RuntimeError:
+        # Already closed by the client
+        pass
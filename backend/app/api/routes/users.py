@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional
 from ...models.user import User, UserUpdate
 from ...models.partnership import Partnership
-from ...models.goal import Goal
-from ...services.auth import get_current_user
-from ...core.supabase import get_supabase_client
+from ...models.goal import Goal, GoalStatus
+from ...services.auth import get_current_user, invalidate_cached_user
+from ...services.goals import list_goals_for_user
+from ...services.partnerships import invalidate_user_partnership_details
+from ...repositories import users as users_repo
+from ...repositories import partnerships as partnerships_repo
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -25,8 +28,6 @@ async def update_user_me(
     """
     Update the current user's profile
     """
-    supabase = get_supabase_client()
-    
     # Build update data from non-None fields
     update_data = {k: v for k, v in user_update.model_dump().items() if v is not None}
     
@@ -34,15 +35,20 @@ async def update_user_me(
         return current_user
     
     # Update user in Supabase
-    response = supabase.table("users").update(update_data).eq("id", str(current_user.id)).execute()
+    updated_user = await users_repo.update(str(current_user.id), update_data)
     
-    if not response.data:
+    if not updated_user:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update user"
         )
     
-    return User(**response.data[0])
+    # Make the next authenticated request see the new profile
+    invalidate_cached_user(str(current_user.id))
+    # Partnership details embed the profile
+    await invalidate_user_partnership_details(str(current_user.id))
+    
+    return User(**updated_user)
 
 
 @router.get("/me/partnerships", response_model=List[Partnership])
@@ -50,33 +56,18 @@ async def get_user_partnerships(current_user: User = Depends(get_current_user)):
     """
     Get all partnerships for the current user
     """
-    supabase = get_supabase_client()
-    
-    response = supabase.table("partnerships").select("*").or_(
-        f"user1_id.eq.{current_user.id},user2_id.eq.{current_user.id}"
-    ).execute()
-    
-    return response.data if response.data else []
+    return await partnerships_repo.list_for_user(str(current_user.id))
 
 
 @router.get("/me/goals", response_model=List[Goal])
 async def get_user_goals(
     current_user: User = Depends(get_current_user),
-    status: str = None
+    goal_status: Optional[GoalStatus] = Query(None, alias="status")
 ):
     """
     Get all goals for the current user
     """
-    supabase = get_supabase_client()
-    
-    query = supabase.table("goals").select("*").eq("user_id", str(current_user.id))
-    
-    if status:
-        query = query.eq("status", status)
-    
-    response = query.execute()
-    
-    return response.data if response.data else []
+    return await list_goals_for_user(str(current_user.id), status=goal_status)
 
 
 @router.get("/search", response_model=List[User])
@@ -94,9 +85,5 @@ async def search_users(
             detail="Search query must be at least 3 characters"
         )
     
-    supabase = get_supabase_client()
-    
     # Search users by email (using ilike for case-insensitive partial match)
-    response = supabase.table("users").select("*").ilike("email", f"%{q}%").neq("id", str(current_user.id)).execute()
-    
-    return response.data if response.data else [] 
\ No newline at end of file
+    return await users_repo.search_by_email(q, str(current_user.id)) 
\ No newline at end of file
@@ -8,12 +8,113 @@ class Settings(BaseSettings):
     # Supabase settings
     SUPABASE_URL: str
     SUPABASE_SERVICE_KEY: str
+
+    # Async database client pool settings
+    DB_POOL_MAX_CONNECTIONS: int = 100
+    DB_POOL_MAX_KEEPALIVE: int = 20
+    DB_REQUEST_TIMEOUT: float = 10.0
+
+    # Auth settings
+    # HS256 secret used by Supabase Auth to sign access tokens. When unset, HS256 tokens
+    # are checked with Supabase Auth on every request (with a warning at startup);
+    # tokens signed with asymmetric keys are always verified against the project's JWKS.
+    SUPABASE_JWT_SECRET: Optional[str] = None
+    SUPABASE_JWT_AUDIENCE: str = "authenticated"
+    JWKS_CACHE_TTL_SECONDS: int = 600
+    # Shortest interval between JWKS refetches triggered by tokens with an unknown key ID
+    JWKS_REFRESH_MIN_INTERVAL_SECONDS: int = 30
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_SIZE: int = 10000
+    MEMBERSHIP_CACHE_TTL_SECONDS: int = 300
+    MEMBERSHIP_CACHE_MAX_SIZE: int = 10000
+
+    # Read-through cache for partnership, agreement and goal list responses: "none",
+    # "memory" (per process, so only for a single worker: other workers never see its
+    # invalidations) or "memcached" (shared by the workers on a host)
+    RESPONSE_CACHE_BACKEND: str = "none"
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+    RESPONSE_CACHE_MAX_SIZE: int = 10000
+    # host:port, or the path of memcached's Unix socket
+    RESPONSE_CACHE_MEMCACHED_ADDRESS: str = "127.0.0.1:11211"
+    RESPONSE_CACHE_MEMCACHED_POOL_SIZE: int = 4
+
+    # Observability
+    # Report each request's Supabase calls to clients in a Server-Timing header
+    SERVER_TIMING_ENABLED: bool = True
+    # Prometheus metrics on GET /metrics (off by default: they list every route and table).
+    # When a token is set, scrapers must send it as a Bearer token; set one outside local runs
+    METRICS_ENABLED: bool = False
+    METRICS_BEARER_TOKEN: Optional[str] = None
+    # Per-request CPU profiles for requests signed with PROFILING_SECRET (see app/core/profiling.py)
+    PROFILING_ENABLED: bool = False
+    PROFILING_SECRET: Optional[str] = None
+    PROFILING_OUTPUT_DIR: str = "profiles"
+    PROFILING_MAX_PER_MINUTE: int = 6
+    PROFILING_SAMPLE_INTERVAL_MS: float = 1.0
+    PROFILING_SIGNATURE_TTL_SECONDS: int = 300
+
+    # Dashboard settings
+    # Each dashboard section that takes longer than this is left empty instead of delaying the page
+    DASHBOARD_SECTION_TIMEOUT_SECONDS: float = 2.0
+    DASHBOARD_CHECKIN_LIMIT: int = 5
+    DASHBOARD_NOTIFICATION_LIMIT: int = 10
+
+    # Number of most recent progress updates embedded in a goal
+    GOAL_RECENT_UPDATES_LIMIT: int = 10
+
+    # Recurring check-in scheduler
+    CHECKIN_SCHEDULE_HORIZON_DAYS: int = 14
+    # Local hour of day (in the partnership creator's time zone) for generated check-ins
+    CHECKIN_SCHEDULE_LOCAL_HOUR: int = 18
+    CHECKIN_SCHEDULER_PAGE_SIZE: int = 200
+    CHECKIN_SCHEDULER_BATCH_SIZE: int = 500
+
+    # Check-in reminder dispatcher, run in the background by every app process
+    CHECKIN_REMINDER_ENABLED: bool = True
+    CHECKIN_REMINDER_INTERVAL_SECONDS: float = 60.0
+    # Check-ins starting within this many minutes get a reminder
+    CHECKIN_REMINDER_LEAD_MINUTES: int = 60
+    CHECKIN_REMINDER_BATCH_SIZE: int = 500
+
+    # Buffered notification writer: flush after this many ms or rows, whichever comes first
+    NOTIFICATION_FLUSH_INTERVAL_MS: int = 200
+    NOTIFICATION_FLUSH_MAX_ROWS: int = 500
+    # Producers wait once this many notifications are buffered
+    NOTIFICATION_BUFFER_MAX_SIZE: int = 10000
+
+    # GET /notifications/stream
+    NOTIFICATION_STREAM_MAX_CONNECTIONS_PER_USER: int = 5
+    NOTIFICATION_STREAM_HEARTBEAT_SECONDS: float = 15.0
+    NOTIFICATION_STREAM_RETRY_MS: int = 3000
+    NOTIFICATION_STREAM_BACKLOG_LIMIT: int = 100
+
+    # Real-time pushes: events buffered per connection before a slow client is dropped
+    REALTIME_SUBSCRIBER_QUEUE_SIZE: int = 100
+    # "memory" for a single worker, "unix" to share events between workers on one host
+    REALTIME_BROKER: str = "memory"
+    REALTIME_BROKER_SOCKET: str = "/tmp/accountable-realtime.sock"
     
     # Email settings
     SMTP_SERVER: str
     SMTP_PORT: int
     SMTP_USERNAME: str
     SMTP_PASSWORD: str
+    # "sendgrid" (SMTP_PASSWORD is the API key), "smtp" or "memory" to only log messages
+    EMAIL_TRANSPORT: str = "sendgrid"
+    EMAIL_SEND_TIMEOUT: float = 10.0
+    # Used by the "smtp" transport, together with the SMTP_* settings above
+    SMTP_USE_TLS: bool = False
+    SMTP_START_TLS: Optional[bool] = None
+    SMTP_POOL_SIZE: int = 4
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100
+
+    # Email outbox workers
+    EMAIL_OUTBOX_ENABLED: bool = True
+    EMAIL_WORKER_CONCURRENCY: int = 10
+    EMAIL_OUTBOX_POLL_INTERVAL_SECONDS: float = 5.0
+    EMAIL_MAX_ATTEMPTS: int = 5
+    EMAIL_RETRY_BASE_SECONDS: float = 30.0
+    EMAIL_RETRY_MAX_SECONDS: float = 3600.0
     
     # Application settings
     APP_NAME: str = "AccounTable"
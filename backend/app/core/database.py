@@ -0,0 +1,337 @@
+"""
+Async access to the Supabase PostgREST API.
+
+All table queries go through a single pooled ``httpx.AsyncClient`` so that
+database round trips never block the event loop and connections are reused
+across requests. The query builder mirrors the subset of the supabase-py
+builder API used by this application (``select``/``eq``/``or_``/``single``...),
+so repository code reads the same as the old synchronous calls.
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+
+from .config import get_settings
+from .instrumentation import is_tracking, record_query, track_queries
+
+logger = logging.getLogger(__name__)
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+@contextmanager
+def count_round_trips():
+    """
+    Count the PostgREST round trips made inside the block, including those of
+    tasks spawned from it. Useful for asserting how many queries an endpoint makes:
+
+        with count_round_trips() as trips:
+            await get_goal(goal_id, current_user)
+        assert trips.count == 1
+
+    The yielded ``instrumentation.QueryLog`` also lists each call.
+    """
+    with track_queries() as log:
+        yield log
+
+
+class DatabaseError(Exception):
+    """Raised when PostgREST returns an error response"""
+
+    def __init__(self, message: str, status_code: int, code: Optional[str] = None, details: Optional[str] = None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.code = code
+        self.details = details
+
+
+class QueryResponse:
+    """Result of a PostgREST query"""
+
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _json_default(value: Any) -> str:
+    """Serialize values that the json module does not handle (UUID, datetime, Decimal)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared async HTTP client used for all Supabase calls.
+    The client is created lazily and keeps a bounded pool of keep-alive connections.
+    """
+    global _http_client
+
+    if _http_client is None or _http_client.is_closed:
+        settings = get_settings()
+        _http_client = httpx.AsyncClient(
+            base_url=settings.SUPABASE_URL,
+            headers={
+                "apikey": settings.SUPABASE_SERVICE_KEY,
+                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
+            },
+            limits=httpx.Limits(
+                max_connections=settings.DB_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.DB_POOL_MAX_KEEPALIVE,
+            ),
+            timeout=settings.DB_REQUEST_TIMEOUT,
+        )
+
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client and release pooled connections"""
+    global _http_client
+
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+class Query:
+    """
+    Chainable PostgREST query against a single table or RPC endpoint.
+    Nothing is sent until ``execute()`` is awaited.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.method = "GET"
+        self.operation = "select"
+        self.params: List[tuple] = []
+        self.headers: Dict[str, str] = {}
+        self.prefer: List[str] = []
+        self.body: Any = None
+        self.is_single = False
+        self._negate_next = False
+
+    # Operations
+
+    def select(self, *columns: str, count: Optional[str] = None, head: bool = False) -> "Query":
+        self.method = "HEAD" if head else "GET"
+        self.operation = "count" if head else "select"
+        self.params.append(("select", ",".join(columns) if columns else "*"))
+        if count:
+            self.prefer.append(f"count={count}")
+        return self
+
+    def insert(self, data: Any, returning: str = "representation") -> "Query":
+        """Insert one row or a list of rows; ``returning="minimal"`` skips echoing them back"""
+        self.method = "POST"
+        self.operation = "insert"
+        self.body = data
+        self.prefer.append(f"return={returning}")
+        return self
+
+    def upsert(self, data: Any, on_conflict: Optional[str] = None, ignore_duplicates: bool = False) -> "Query":
+        """Insert rows, updating (or with ``ignore_duplicates``, skipping) those that conflict"""
+        self.method = "POST"
+        self.operation = "upsert"
+        self.body = data
+        resolution = "ignore-duplicates" if ignore_duplicates else "merge-duplicates"
+        self.prefer.extend(["return=representation", f"resolution={resolution}"])
+        if on_conflict:
+            self.params.append(("on_conflict", on_conflict))
+        return self
+
+    def update(self, data: Dict[str, Any]) -> "Query":
+        self.method = "PATCH"
+        self.operation = "update"
+        self.body = data
+        self.prefer.append("return=representation")
+        return self
+
+    def delete(self) -> "Query":
+        self.method = "DELETE"
+        self.operation = "delete"
+        self.prefer.append("return=representation")
+        return self
+
+    def returning(self, *columns: str) -> "Query":
+        """Limit the columns a mutation returns (the ``select`` of insert/update/delete)"""
+        self.params.append(("select", ",".join(columns)))
+        return self
+
+    # Filters
+
+    @property
+    def not_(self) -> "Query":
+        self._negate_next = True
+        return self
+
+    def filter(self, column: str, operator: str, value: Any) -> "Query":
+        if self._negate_next:
+            operator = f"not.{operator}"
+            self._negate_next = False
+        self.params.append((column, f"{operator}.{value}"))
+        return self
+
+    def eq(self, column: str, value: Any) -> "Query":
+        return self.filter(column, "eq", value)
+
+    def neq(self, column: str, value: Any) -> "Query":
+        return self.filter(column, "neq", value)
+
+    def gt(self, column: str, value: Any) -> "Query":
+        return self.filter(column, "gt", value)
+
+    def gte(self, column: str, value: Any) -> "Query":
+        return self.filter(column, "gte", value)
+
+    def lt(self, column: str, value: Any) -> "Query":
+        return self.filter(column, "lt", value)
+
+    def lte(self, column: str, value: Any) -> "Query":
+        return self.filter(column, "lte", value)
+
+    def is_(self, column: str, value: Any) -> "Query":
+        return self.filter(column, "is", value)
+
+    def ilike(self, column: str, pattern: str) -> "Query":
+        return self.filter(column, "ilike", pattern)
+
+    def in_(self, column: str, values: Iterable[Any]) -> "Query":
+        return self.filter(column, "in", f"({','.join(str(v) for v in values)})")
+
+    def or_(self, filters: str) -> "Query":
+        self.params.append(("or", f"({filters})"))
+        return self
+
+    # Modifiers
+
+    def order(self, column: str, desc: bool = False, foreign_table: Optional[str] = None) -> "Query":
+        """Add a sort column; repeated calls add tie-breakers in call order"""
+        key = f"{foreign_table}.order" if foreign_table else "order"
+        term = f"{column}.{'desc' if desc else 'asc'}"
+        for i, (name, value) in enumerate(self.params):
+            if name == key:
+                self.params[i] = (key, f"{value},{term}")
+                return self
+        self.params.append((key, term))
+        return self
+
+    def limit(self, count: int, foreign_table: Optional[str] = None) -> "Query":
+        key = f"{foreign_table}.limit" if foreign_table else "limit"
+        self.params.append((key, str(count)))
+        return self
+
+    def range(self, start: int, end: int) -> "Query":
+        self.params.append(("offset", str(start)))
+        self.params.append(("limit", str(end - start + 1)))
+        return self
+
+    def single(self) -> "Query":
+        """
+        Return a single object instead of a list.
+        Unlike supabase-py, a query matching no rows yields ``data=None`` instead of raising.
+        """
+        self.is_single = True
+        return self
+
+    def shape(self) -> str:
+        """The query's parameters with filter values left out, e.g. ``select,user_id=eq,order,limit``"""
+        parts = []
+        for name, value in self.params:
+            if name in _MODIFIER_PARAMS or name.endswith((".order", ".limit")):
+                parts.append(name)
+                continue
+            operator, _, rest = value.partition(".")
+            if operator == "not":
+                operator = f"not.{rest.partition('.')[0]}"
+            parts.append(f"{name}={operator}")
+        return ",".join(parts)
+
+    def _record(self, started: float, rows: int, status: Optional[int]) -> None:
+        # The shape is only needed when a request is collecting its calls
+        record_query(self.path, self.operation, self.shape() if is_tracking() else "", started, rows, status)
+
+    async def execute(self) -> QueryResponse:
+        headers = dict(self.headers)
+        if self.prefer:
+            headers["Prefer"] = ",".join(self.prefer)
+
+        content = None
+        if self.body is not None:
+            headers["Content-Type"] = "application/json"
+            content = json.dumps(self.body, default=_json_default)
+
+        started = time.perf_counter()
+
+        try:
+            response = await get_http_client().request(
+                self.method,
+                f"/rest/v1/{self.path}",
+                params=self.params,
+                headers=headers,
+                content=content,
+            )
+        except httpx.HTTPError:
+            self._record(started, 0, None)
+            raise
+
+        count = _parse_count(response.headers.get("content-range"))
+
+        if response.status_code >= 400:
+            self._record(started, 0, response.status_code)
+            try:
+                error = response.json()
+            except ValueError:
+                error = {"message": response.text}
+            raise DatabaseError(
+                error.get("message", "Database request failed"),
+                status_code=response.status_code,
+                code=error.get("code"),
+                details=error.get("details"),
+            )
+
+        data = response.json() if response.content else []
+
+        self._record(started, len(data) if isinstance(data, list) else 1, response.status_code)
+
+        if self.is_single:
+            if len(data) > 1:
+                raise DatabaseError(
+                    "Expected a single row but the query returned multiple",
+                    status_code=406,
+                )
+            data = data[0] if data else None
+
+        return QueryResponse(data, count)
+
+
+# Query parameters that are not column filters
+_MODIFIER_PARAMS = frozenset({"select", "order", "limit", "offset", "or", "on_conflict"})
+
+
+def _parse_count(content_range: Optional[str]) -> Optional[int]:
+    """Extract the total from a Content-Range header such as ``0-24/3573``"""
+    if not content_range or "/" not in content_range:
+        return None
+    total = content_range.split("/")[-1]
+    return int(total) if total.isdigit() else None
+
+
+def table(name: str) -> Query:
+    """Start a query against a table"""
+    return Query(name)
+
+
+def rpc(function: str, params: Optional[Dict[str, Any]] = None) -> Query:
+    """Start a call to a Postgres function exposed through PostgREST"""
+    query = Query(f"rpc/{function}")
+    query.method = "POST"
+    query.operation = "rpc"
+    query.body = params or {}
+    return query
@@ -0,0 +1,183 @@
+"""
+Per-request instrumentation of Supabase (PostgREST) calls.
+
+Every query issued through ``database.Query.execute`` is recorded in the query
+logs active in the current context: the table or RPC, the operation, the
+shape of its filters (column and operator, never values), how long the round
+trip took and how many rows came back. ``RequestMiddleware`` opens a log for
+each HTTP request, reports it in a ``Server-Timing`` header and a debug log
+line, and folds it into per-route totals (``route_stats``).
+
+Logs are held in a context variable, so calls made by tasks spawned during the
+request (e.g. ``asyncio.gather`` in the dashboard) are included.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .metrics import CallbackMetric, registry, supabase_query_duration_seconds, supabase_query_errors_total
+
+
+class QueryCall:
+    """One PostgREST round trip"""
+
+    __slots__ = ("table", "operation", "shape", "duration", "rows", "status")
+
+    def __init__(self, table: str, operation: str, shape: str, duration: float, rows: int, status: Optional[int]):
+        self.table = table
+        self.operation = operation
+        self.shape = shape
+        self.duration = duration
+        self.rows = rows
+        self.status = status
+
+    def describe(self) -> str:
+        status = self.status if self.status is not None else "failed"
+        return f"{self.table} {self.operation} [{self.shape}] {self.duration * 1000:.1f}ms {self.rows} rows ({status})"
+
+
+class QueryLog:
+    """The PostgREST calls made while the log is active"""
+
+    def __init__(self):
+        self.calls: List[QueryCall] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.calls)
+
+    @property
+    def duration(self) -> float:
+        return sum(call.duration for call in self.calls)
+
+    @property
+    def rows(self) -> int:
+        return sum(call.rows for call in self.calls)
+
+
+_query_logs: ContextVar[Tuple[QueryLog, ...]] = ContextVar("query_logs", default=())
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryLog]:
+    """
+    Record the PostgREST calls made inside the block, including those of tasks
+    spawned from it. Blocks may be nested; a call is recorded in every
+    enclosing log:
+
+        with track_queries() as queries:
+            await get_goal(goal_id, current_user)
+        assert queries.count == 1
+    """
+    log = QueryLog()
+    token = _query_logs.set(_query_logs.get() + (log,))
+    try:
+        yield log
+    finally:
+        _query_logs.reset(token)
+
+
+def is_tracking() -> bool:
+    """True if any query log is active in this context"""
+    return bool(_query_logs.get())
+
+
+def record_query(table: str, operation: str, shape: str, started: float, rows: int, status: Optional[int]) -> None:
+    """
+    Record a finished call (started at `started`, a perf_counter value) in the
+    Supabase metrics and in the active logs
+    """
+    duration = time.perf_counter() - started
+    supabase_query_duration_seconds.observe(duration, table, operation)
+    if status is None or status >= 400:
+        supabase_query_errors_total.inc(table, operation)
+
+    logs = _query_logs.get()
+    if not logs:
+        return
+
+    call = QueryCall(table, operation, shape, duration, rows, status)
+    for log in logs:
+        log.calls.append(call)
+
+
+def server_timing(log: QueryLog, max_entries: int = 10) -> str:
+    """
+    Format a query log as a Server-Timing header value
+
+    The first entry is the total (``db;dur=...;desc="N calls"``), followed by
+    up to `max_entries` individual calls in the order they finished. Calls made
+    concurrently overlap, so the total can exceed the request's wall time.
+    """
+    plural = "" if log.count == 1 else "s"
+    entries = [f'db;dur={log.duration * 1000:.1f};desc="{log.count} call{plural}"']
+    for index, call in enumerate(log.calls[:max_entries], start=1):
+        entries.append(f'db{index};dur={call.duration * 1000:.1f};desc="{call.table} {call.operation}"')
+    return ", ".join(entries)
+
+
+class RouteQueryStats:
+    """Totals of the PostgREST calls made by one route"""
+
+    def __init__(self):
+        self.requests = 0
+        self.calls = 0
+        self.duration = 0.0
+        self.rows = 0
+        self.max_calls = 0
+
+    def add(self, log: QueryLog) -> None:
+        self.requests += 1
+        self.calls += log.count
+        self.duration += log.duration
+        self.rows += log.rows
+        self.max_calls = max(self.max_calls, log.count)
+
+
+class RouteStats:
+    """Per-route totals, keyed by "<METHOD> <path template>" (e.g. "GET /api/goals/{goal_id}")"""
+
+    def __init__(self):
+        self._routes: Dict[str, RouteQueryStats] = {}
+
+    def add(self, route: str, log: QueryLog) -> None:
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = self._routes[route] = RouteQueryStats()
+        stats.add(log)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Totals and per-request averages for every route seen so far"""
+        return {
+            route: {
+                "requests": stats.requests,
+                "calls": stats.calls,
+                "duration_seconds": stats.duration,
+                "rows": stats.rows,
+                "max_calls": stats.max_calls,
+                "avg_calls": stats.calls / stats.requests,
+                "avg_duration_seconds": stats.duration / stats.requests,
+            }
+            for route, stats in self._routes.items()
+        }
+
+    def reset(self) -> None:
+        self._routes.clear()
+
+
+route_stats = RouteStats()
+
+
+def _route_totals(key: str) -> Dict[Tuple[str, ...], float]:
+    return {tuple(route.split(" ", 1)): stats[key] for route, stats in route_stats.snapshot().items()}
+
+
+registry.register(CallbackMetric(
+    "supabase_route_calls_total", "Supabase round trips made while handling each route",
+    "counter", lambda: _route_totals("calls"), ("method", "route")
+))
+registry.register(CallbackMetric(
+    "supabase_route_duration_seconds_total", "Time spent in Supabase round trips while handling each route",
+    "counter", lambda: _route_totals("duration_seconds"), ("method", "route")
+))
@@ -0,0 +1,202 @@
+"""
+Prometheus metrics in the text exposition format, without a client library.
+
+Metrics are plain counters updated in place: every update happens on the event
+loop thread, so no locks are needed and recording a sample costs a dictionary
+lookup and an addition (plus a bisect for histograms). Histogram buckets are
+stored non-cumulatively and summed only when ``/metrics`` is scraped.
+
+Values are per process; with several workers, scrape each one or put them
+behind a collector that aggregates by instance.
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+EMAIL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base class for metrics; subclasses render their samples"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.type}\n"
+        return header + "".join(f"{line}\n" for line in self.samples())
+
+
+class Counter(Metric):
+    """A value that only goes up, e.g. requests served"""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """A value that goes up and down, e.g. requests in flight"""
+
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    """Distribution of observed values, e.g. latencies, over fixed buckets"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = HTTP_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: a count per bucket (the last one is +Inf), then the sum
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self) -> Iterable[str]:
+        bucket_labels = self.labelnames + ("le",)
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(bucket_labels, labels + (bound,))} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(series[-1])}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class CallbackMetric(Metric):
+    """A metric whose values are read from elsewhere (e.g. cache statistics) at scrape time"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        type: str,
+        callback: Callable[[], Dict[LabelValues, float]],
+        labelnames: Sequence[str] = ()
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.type = type
+        self.callback = callback
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.callback().items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Registry:
+    """The metrics exposed on /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        return "".join(metric.render() for metric in self._metrics.values())
+
+
+registry = Registry()
+
+# HTTP requests, labelled by route template rather than raw path to keep cardinality bounded
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests completed", ("method", "route", "status")
+))
+http_requests_in_progress = registry.register(Gauge(
+    "http_requests_in_progress", "HTTP requests being handled"
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "Time from receiving a request to finishing its response",
+    ("method", "route", "status"), HTTP_BUCKETS
+))
+
+# Supabase (PostgREST and Auth) round trips
+supabase_query_duration_seconds = registry.register(Histogram(
+    "supabase_query_duration_seconds", "Duration of Supabase round trips",
+    ("table", "operation"), QUERY_BUCKETS
+))
+supabase_query_errors_total = registry.register(Counter(
+    "supabase_query_errors_total", "Supabase round trips that failed or returned an error status",
+    ("table", "operation")
+))
+
+# Outgoing email
+email_send_duration_seconds = registry.register(Histogram(
+    "email_send_duration_seconds", "Time taken to hand one email to the mail provider",
+    ("transport", "outcome"), EMAIL_BUCKETS
+))
+
+# Buffered notification writes
+notification_writer_batch_size = registry.register(Histogram(
+    "notification_writer_batch_size", "Notifications written per bulk insert by the notification writer",
+    buckets=BATCH_SIZE_BUCKETS
+))
+notification_writer_flush_duration_seconds = registry.register(Histogram(
+    "notification_writer_flush_duration_seconds", "Time taken by one bulk insert of the notification writer",
+    buckets=QUERY_BUCKETS
+))
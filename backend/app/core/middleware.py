@@ -1,65 +1,130 @@
-from fastapi import Request, status
+from fastapi import status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import logging
 import time
-from typing import Callable
 import traceback
+from .config import get_settings
+from .instrumentation import QueryLog, route_stats, server_timing, track_queries
+from .metrics import http_request_duration_seconds, http_requests_in_progress, http_requests_total
+from .profiling import RequestProfiler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-class ErrorHandlerMiddleware(BaseHTTPMiddleware):
+def _route_name(scope: Scope, with_method: bool = True) -> str:
+    """"<METHOD> <path template>" (or just the template) of the route that handled a request"""
+    route = scope.get("route")
+    path = route.path if route is not None else "<unmatched>"
+    return f"{scope['method']} {path}" if with_method else path
+
+
+class RequestMiddleware:
     """
-    Middleware for centralized error handling and logging
+    Pure ASGI middleware for request logging, timing and centralized error handling
+
+    Wraps the `send` callable instead of buffering responses, so streaming
+    responses (e.g. the notification stream) pass through untouched and no
+    extra task is spawned per request. WebSocket and lifespan traffic is
+    passed straight to the app.
+
+    The Supabase calls each request makes are tracked (see ``instrumentation``),
+    reported in a Server-Timing header and added to the per-route totals, and
+    every request is counted in the HTTP metrics served on /metrics. Requests
+    signed for profiling run under the sampling profiler (see ``profiling``).
     """
-    
-    async def dispatch(self, request: Request, call_next: Callable):
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.server_timing = get_settings().SERVER_TIMING_ENABLED
+        self.profiler = RequestProfiler()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Record request start time
+        start_time = time.perf_counter()
+        method = scope["method"]
+        path = scope.get("root_path", "") + scope["path"]
+        response_started = False
+        status_code = 500
+        http_requests_in_progress.inc()
+
+        profiling = self.profiler.check(scope) if self.profiler.enabled else None
+        profile = self.profiler.start() if profiling == "profile" else None
+
+        # Log the incoming request
+        logger.info(f"Request started: {method} {path}")
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started, status_code
+
+            if message["type"] == "http.response.start":
+                response_started = True
+                status_code = message["status"]
+
+                # Add processing time header to response
+                process_time = time.perf_counter() - start_time
+                headers = [
+                    *message.get("headers", []),
+                    (b"x-process-time", str(process_time).encode("latin-1"))
+                ]
+                if self.server_timing:
+                    headers.append((b"server-timing", server_timing(queries).encode("latin-1")))
+                if profiling is not None:
+                    headers.append((b"x-profile", (profile.id if profile else profiling).encode("latin-1")))
+                message["headers"] = headers
+
+                # Log the completed request
+                logger.info(f"Request completed: {method} {path} - Status: {message['status']} - Time: {process_time:.3f}s")
+
+            await send(message)
+
         try:
-            # Process the request and get the response
-            response = await call_next(request)
-            return response
-            
+            with track_queries() as queries:
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    self._record_queries(scope, queries)
+
         except Exception as e:
             # Log the exception
             logger.error(f"Unhandled exception: {str(e)}")
             logger.error(traceback.format_exc())
-            
+
+            if response_started:
+                # Too late for an error response; let the server drop the connection
+                raise
+
             # Return a standardized JSON error response
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 content={
                     "error": "Internal Server Error",
                     "detail": str(e),
-                    "path": request.url.path
+                    "path": path
                 }
             )
+            await response(scope, receive, send_wrapper)
 
+        finally:
+            http_requests_in_progress.dec()
+            route = _route_name(scope, with_method=False)
+            status_label = str(status_code)
+            http_requests_total.inc(method, route, status_label)
+            http_request_duration_seconds.observe(time.perf_counter() - start_time, method, route, status_label)
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """
-    Middleware for logging request information and timing
-    """
-    
-    async def dispatch(self, request: Request, call_next: Callable):
-        # Record request start time
-        start_time = time.time()
-        
-        # Log the incoming request
-        logger.info(f"Request started: {request.method} {request.url.path}")
-        
-        # Process the request
-        response = await call_next(request)
-        
-        # Calculate request processing time
-        process_time = time.time() - start_time
-        
-        # Add processing time header to response
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        # Log the completed request
-        logger.info(f"Request completed: {request.method} {request.url.path} - Status: {response.status_code} - Time: {process_time:.3f}s")
-        
-        return response 
\ No newline at end of file
+            if profile is not None:
+                await self.profiler.finish(profile, method, route)
+
+    def _record_queries(self, scope: Scope, queries: QueryLog) -> None:
+        route = _route_name(scope)
+        route_stats.add(route, queries)
+
+        if queries.calls and logger.isEnabledFor(logging.DEBUG):
+            calls = "; ".join(call.describe() for call in queries.calls)
+            logger.debug(f"Supabase calls for {route}: {queries.count} in {queries.duration * 1000:.1f}ms - {calls}")
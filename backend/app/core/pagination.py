@@ -0,0 +1,72 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor identifies a row by its sort key ``(sort_value, id)``, so fetching the
+next page is an index range scan starting at that key rather than an OFFSET or
+an extra lookup of an anchor row. Cursors are opaque to clients.
+
+Sort values are timestamps and row IDs are UUIDs; decoded cursors are checked
+to be exactly that, since their parts end up inside PostgREST filters.
+"""
+import base64
+import binascii
+import json
+from typing import Any, Dict, Tuple
+from uuid import UUID
+
+from .timestamps import parse_timestamp
+
+CursorKey = Tuple[str, str]
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor that was not produced by encode_cursor"""
+
+
+def encode_cursor(sort_value: str, row_id: str) -> str:
+    """Build an opaque cursor from a row's sort value and ID"""
+    raw = json.dumps([str(sort_value), str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> CursorKey:
+    """
+    Turn a cursor back into its ``(sort_value, id)`` key
+
+    Raises:
+        InvalidCursor: If the cursor is malformed, or its sort value is not an
+            ISO-8601 timestamp with a UTC offset or its ID not a UUID
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        timestamp = parse_timestamp(sort_value)
+        row_id = UUID(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, AttributeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+    if timestamp.tzinfo is None:
+        raise InvalidCursor("Invalid cursor")
+
+    # Re-serialize rather than pass the client's strings on: parsing is lenient
+    # (e.g. about the date/time separator)
+    return timestamp.isoformat(), str(row_id)
+
+
+def row_cursor(row: Dict[str, Any], sort_column: str = "created_at") -> str:
+    """Cursor pointing at a row returned by PostgREST"""
+    return encode_cursor(row[sort_column], row["id"])
+
+
+def keyset_filter(sort_column: str, key: CursorKey, operator: str) -> str:
+    """
+    PostgREST ``or`` filter selecting rows strictly past ``key`` in
+    ``(sort_column, id)`` order. ``operator`` is ``lt`` for descending pages and
+    ``gt`` for ascending ones. Values are quoted because timestamps contain
+    reserved characters (``.``, ``:``).
+    """
+    sort_value, row_id = key
+    return (
+        f'{sort_column}.{operator}."{sort_value}",'
+        f'and({sort_column}.eq."{sort_value}",id.{operator}.{row_id})'
+    )
@@ -0,0 +1,325 @@
+"""
+On-demand sampling profiles of individual requests.
+
+When ``PROFILING_ENABLED`` is set, a request carrying a valid
+``X-Profile-Request`` header runs under a sampling profiler and its profile is
+written to ``PROFILING_OUTPUT_DIR`` as a speedscope file
+(``<timestamp>-<METHOD>-<route>-<suffix>.speedscope.json``, open it at
+https://www.speedscope.app) plus a folded-stacks file for flamegraph.pl. The
+response's ``X-Profile`` header carries ``<timestamp>-<suffix>`` to find it by.
+
+The header value is ``<unix timestamp>.<hex HMAC-SHA256>`` of
+``"<timestamp>:<METHOD>:<path>"`` under ``PROFILING_SECRET``, so a signature
+only works for one method and path and expires after
+``PROFILING_SIGNATURE_TTL_SECONDS``. Generate one with:
+
+    python -m app.core.profiling GET /api/dashboard
+
+At most ``PROFILING_MAX_PER_MINUTE`` profiles are captured per worker; signed
+requests over the limit run normally with ``X-Profile: rate-limited``.
+
+The sampler is a thread that looks at the event loop thread every
+``PROFILING_SAMPLE_INTERVAL_MS``. While the request's task is running, the
+sample is the thread's Python stack. While it is suspended, the sample is the
+chain of coroutines it is awaiting, ending in ``[await: idle]`` when the loop
+had nothing else to do (e.g. waiting on Supabase) or ``[await: loop busy]``
+when other requests' tasks were running. Tasks spawned while the request runs
+(e.g. by ``asyncio.gather``) count as the request's own; they are tracked with
+a task factory installed on the event loop the first time a profile is taken.
+Samples are weighted by the time actually elapsed between them.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from types import FrameType
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from weakref import WeakSet
+
+from starlette.types import Scope
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile-request"
+
+# (file, function, first line)
+FrameKey = Tuple[str, str, int]
+
+_IDLE: FrameKey = ("", "[await: idle]", 0)
+_BUSY: FrameKey = ("", "[await: loop busy]", 0)
+
+
+def sign_profile_request(secret: str, method: str, path: str, timestamp: Optional[int] = None) -> str:
+    """Build an X-Profile-Request header value for one request"""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    message = f"{timestamp}:{method.upper()}:{path}".encode()
+    return f"{timestamp}.{hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()}"
+
+
+def verify_profile_request(secret: str, method: str, path: str, value: str, max_age: float) -> bool:
+    """Check an X-Profile-Request header value against the request it came with"""
+    timestamp, _, _signature = value.partition(".")
+    if not timestamp.isdigit() or abs(time.time() - int(timestamp)) > max_age:
+        return False
+    return hmac.compare_digest(sign_profile_request(secret, method, path, int(timestamp)), value)
+
+
+class RateLimiter:
+    """Allows at most `limit` events in any sliding `window` seconds"""
+
+    def __init__(self, limit: int, window: float = 60.0):
+        self.limit = limit
+        self.window = window
+        self._events: Deque[float] = deque()
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        while self._events and now - self._events[0] >= self.window:
+            self._events.popleft()
+        if len(self._events) >= self.limit:
+            return False
+        self._events.append(now)
+        return True
+
+
+def _frame_key(frame: FrameType) -> FrameKey:
+    code = frame.f_code
+    return (code.co_filename, getattr(code, "co_qualname", code.co_name), code.co_firstlineno)
+
+
+def _is_loop_frame(frame: FrameType) -> bool:
+    # asyncio's Handle._run calls into the task; everything below it is the event loop
+    return frame.f_code.co_name == "_run" and frame.f_code.co_filename.endswith(os.path.join("asyncio", "events.py"))
+
+
+def _thread_stack(frame: Optional[FrameType]) -> List[FrameKey]:
+    """Stack of a running thread, root first, without the event loop's own frames"""
+    stack = []
+    while frame is not None and not _is_loop_frame(frame):
+        stack.append(_frame_key(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _awaiting_stack(task: asyncio.Task) -> List[FrameKey]:
+    """Chain of coroutines a suspended task is awaiting, root first"""
+    stack = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            break
+        stack.append(_frame_key(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return stack
+
+
+# The profile of the request whose context is running; inherited by the tasks it spawns
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+
+def _profiling_task_factory(loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> asyncio.Task:
+    """Create tasks as usual, remembering those spawned while a profiled request runs"""
+    task = asyncio.Task(coro, loop=loop, **kwargs)
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.tasks.add(task)
+    return task
+
+
+class RequestProfile:
+    """Samples one request's task from a background thread"""
+
+    def __init__(self, interval: float):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self.suffix = secrets.token_hex(3)
+        self.id = f"{stamp}-{self.suffix}"
+        self.name = self.id
+        self.interval = interval
+        self.samples: List[Tuple[List[FrameKey], float]] = []
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        # Tasks spawned by the request (e.g. asyncio.gather of several queries)
+        self.tasks: WeakSet = WeakSet()
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample_loop, name=f"profiler-{self.id}", daemon=True)
+        self.started_at = time.perf_counter()
+        self.duration = 0.0
+        self.token = None
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _sample_loop(self) -> None:
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            now = time.perf_counter()
+            stack = self._sample()
+            if stack:
+                self.samples.append((stack, now - last))
+            last = now
+
+    def _sample(self) -> List[FrameKey]:
+        running = asyncio.current_task(self._loop)
+        if running is self._task:
+            return _thread_stack(sys._current_frames().get(self._thread_id))
+
+        stack = _awaiting_stack(self._task)
+        if running is not None and running in self.tasks:
+            # One of the request's own tasks; show it under the await that spawned it
+            return stack + _thread_stack(sys._current_frames().get(self._thread_id))
+        return stack + [_IDLE if running is None else _BUSY]
+
+    def speedscope(self) -> Dict:
+        """The profile in speedscope's file format (one sampled profile)"""
+        frames: Dict[FrameKey, int] = {}
+        samples = []
+        for stack, _weight in self.samples:
+            samples.append([frames.setdefault(key, len(frames)) for key in stack])
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "accountable-profiler",
+            "activeProfileIndex": 0,
+            "shared": {
+                "frames": [
+                    {"name": function, "file": file, "line": line} if file else {"name": function}
+                    for file, function, line in frames
+                ]
+            },
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": self.duration,
+                "samples": samples,
+                "weights": [weight for _stack, weight in self.samples],
+            }],
+        }
+
+    def folded(self) -> str:
+        """The profile as folded stacks (flamegraph.pl input), weights in microseconds"""
+        totals: Dict[str, float] = {}
+        for stack, weight in self.samples:
+            folded = ";".join(
+                f"{function} ({os.path.basename(file)}:{lineno})" if file else function
+                for file, function, lineno in stack
+            )
+            totals[folded] = totals.get(folded, 0.0) + weight
+        return "".join(f"{folded} {round(total * 1e6)}\n" for folded, total in totals.items())
+
+
+class RequestProfiler:
+    """Decides which requests to profile and writes their profiles to disk"""
+
+    def __init__(self):
+        settings = get_settings()
+        self.enabled = settings.PROFILING_ENABLED and bool(settings.PROFILING_SECRET)
+        self.secret = settings.PROFILING_SECRET or ""
+        self.output_dir = settings.PROFILING_OUTPUT_DIR
+        self.interval = settings.PROFILING_SAMPLE_INTERVAL_MS / 1000
+        self.signature_ttl = settings.PROFILING_SIGNATURE_TTL_SECONDS
+        self.rate_limiter = RateLimiter(settings.PROFILING_MAX_PER_MINUTE)
+
+        if settings.PROFILING_ENABLED and not settings.PROFILING_SECRET:
+            logger.warning("PROFILING_ENABLED is set without PROFILING_SECRET; request profiling stays off")
+
+    def check(self, scope: Scope) -> Optional[str]:
+        """
+        Decide whether to profile a request
+
+        Returns:
+            None if the request is not (validly) asking for a profile,
+            "rate-limited" if it is but the limit was reached, else "profile"
+        """
+        value = None
+        for name, header_value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                value = header_value.decode("latin-1")
+                break
+        if value is None:
+            return None
+
+        path = scope.get("root_path", "") + scope["path"]
+        if not verify_profile_request(self.secret, scope["method"], path, value, self.signature_ttl):
+            logger.warning(f"Ignoring invalid profile request signature for {scope['method']} {path}")
+            return None
+
+        return "profile" if self.rate_limiter.allow() else "rate-limited"
+
+    def start(self) -> RequestProfile:
+        """Start sampling the current task and the tasks it spawns"""
+        loop = asyncio.get_running_loop()
+        if loop.get_task_factory() is None:
+            loop.set_task_factory(_profiling_task_factory)
+
+        profile = RequestProfile(self.interval)
+        profile.token = _current_profile.set(profile)
+        profile.start()
+        return profile
+
+    async def finish(self, profile: RequestProfile, method: str, route: str) -> Optional[str]:
+        """
+        Stop sampling and write the profile files
+
+        Args:
+            profile: The profile returned by start()
+            method: The request method, used in the file name
+            route: The route template, used in the file name
+
+        Returns:
+            The path of the speedscope file, or None if it could not be written
+        """
+        profile.stop()
+        _current_profile.reset(profile.token)
+        stamp = profile.id.split("-", 1)[0]
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        profile.name = f"{stamp}-{method}-{slug}-{profile.suffix}"
+        base = os.path.join(self.output_dir, profile.name)
+
+        # Serializing and writing can take a while for long requests; keep it off the loop
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, profile, base)
+        except OSError as e:
+            logger.error(f"Could not write profile {base}: {e}")
+            return None
+        logger.info(f"Wrote profile of {method} {route} ({len(profile.samples)} samples) to {base}.speedscope.json")
+        return f"{base}.speedscope.json"
+
+    @staticmethod
+    def _write(profile: RequestProfile, base: str) -> None:
+        os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+        with open(f"{base}.speedscope.json", "w") as f:
+            json.dump(profile.speedscope(), f)
+        with open(f"{base}.folded", "w") as f:
+            f.write(profile.folded())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m app.core.profiling METHOD PATH")
+    secret = get_settings().PROFILING_SECRET
+    if not secret:
+        sys.exit("PROFILING_SECRET is not set")
+    print(f"X-Profile-Request: {sign_profile_request(secret, sys.argv[1], sys.argv[2])}")
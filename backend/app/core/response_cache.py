@@ -0,0 +1,334 @@
+"""
+Read-through cache for rarely changing, frequently read responses.
+
+Entries are keyed by entity (and by user where the loader applies access
+control) and carry one or more invalidation tags, e.g. ``partnership:<id>``.
+Each tag has a version token stored in the backend, and the token is part of
+every entry key, so invalidating a tag is a single write that makes all of its
+entries unreachable, without having to find and delete them. Only processes
+sharing the backend see the write.
+
+``RESPONSE_CACHE_BACKEND`` selects where entries live:
+
+- ``none`` (the default): caching disabled
+- ``memory``: a per-process LRU with TTL. For single-worker deployments only:
+  an invalidation reaches just the worker that made the write, so with several
+  workers or replicas the others keep serving stale entries for up to
+  ``RESPONSE_CACHE_TTL_SECONDS``
+- ``memcached``: a local memcached shared by all workers on the host
+  (``host:port`` or a Unix socket path in ``RESPONSE_CACHE_MEMCACHED_ADDRESS``)
+
+Cached values are shared between requests and must be treated as read-only.
+Backend failures are logged and treated as misses; they never fail a request.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from .cache import TTLCache
+from .config import get_settings
+from .metrics import CallbackMetric, registry
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class CacheBackendError(Exception):
+    """Raised when a cache backend cannot complete an operation"""
+
+
+class CacheBackend:
+    """Base class for response cache storage"""
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Values of the keys that are present"""
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        """Store a value for `ttl` seconds (0 means no expiry)"""
+        raise NotImplementedError
+
+    async def add(self, key: str, value: Any, ttl: int) -> bool:
+        """Store a value only if the key is absent; True if it was stored"""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release any open connections"""
+
+
+class NullCacheBackend(CacheBackend):
+    """Stores nothing; every lookup is a miss"""
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        return {}
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        pass
+
+    async def add(self, key: str, value: Any, ttl: int) -> bool:
+        return True
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process LRU + TTL storage"""
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300.0):
+        self._entries = TTLCache(max_size=max_size, ttl=ttl)
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        found = {}
+        for key in keys:
+            value = self._entries.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        # TTLCache has no "never expires"; a year is long enough for tag tokens
+        self._entries.set(key, value, ttl=ttl or 365 * 24 * 3600)
+
+    async def add(self, key: str, value: Any, ttl: int) -> bool:
+        if key in self._entries:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+
+class MemcachedBackend(CacheBackend):
+    """
+    Storage in a local memcached, shared by every worker on the host
+
+    Speaks the memcached text protocol over a small pool of persistent
+    connections. Values are stored as JSON. Keys are stored as SHA-1 hashes of
+    the logical key, so request data in a key (IDs, filters) can never break
+    out of the protocol line or exceed memcached's 250-byte key limit.
+    """
+
+    def __init__(self, address: str, pool_size: int = 4, timeout: float = 0.5):
+        self.address = address
+        self.timeout = timeout
+        self._idle: List[tuple] = []
+        self._slots = asyncio.Semaphore(pool_size)
+
+    async def _connect(self) -> tuple:
+        if "/" in self.address:
+            return await asyncio.open_unix_connection(self.address)
+        host, _, port = self.address.rpartition(":")
+        return await asyncio.open_connection(host or "127.0.0.1", int(port))
+
+    async def _call(self, operation: Callable[[asyncio.StreamReader, asyncio.StreamWriter], Awaitable[Any]]) -> Any:
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            try:
+                if connection is None:
+                    connection = await asyncio.wait_for(self._connect(), timeout=self.timeout)
+                result = await asyncio.wait_for(operation(*connection), timeout=self.timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                if connection is not None:
+                    connection[1].close()
+                raise CacheBackendError(f"memcached {self.address}: {e!r}") from e
+            self._idle.append(connection)
+            return result
+
+    @staticmethod
+    def _wire_key(key: str) -> str:
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        if not keys:
+            return {}
+        wire_keys = {self._wire_key(key): key for key in keys}
+
+        async def operation(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Dict[str, Any]:
+            writer.write(f"get {' '.join(wire_keys)}\r\n".encode())
+            await writer.drain()
+
+            found = {}
+            while True:
+                line = (await reader.readuntil(b"\r\n"))[:-2]
+                if line == b"END":
+                    return found
+                parts = line.split()
+                if len(parts) < 4 or parts[0] != b"VALUE":
+                    raise ValueError(f"unexpected reply {line[:80]!r}")
+                data = await reader.readexactly(int(parts[3]) + 2)
+                key = wire_keys.get(parts[1].decode())
+                if key is not None:
+                    found[key] = json.loads(data[:-2])
+
+        return await self._call(operation)
+
+    async def _store(self, command: str, key: str, value: Any, ttl: int) -> bool:
+        data = json.dumps(value, default=str, separators=(",", ":")).encode()
+
+        async def operation(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+            header = f"{command} {self._wire_key(key)} 0 {int(ttl)} {len(data)}\r\n"
+            writer.write(header.encode() + data + b"\r\n")
+            await writer.drain()
+            reply = (await reader.readuntil(b"\r\n"))[:-2]
+            if reply not in (b"STORED", b"NOT_STORED"):
+                raise ValueError(f"unexpected reply {reply[:80]!r}")
+            return reply == b"STORED"
+
+        return await self._call(operation)
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        await self._store("set", key, value, ttl)
+
+    async def add(self, key: str, value: Any, ttl: int) -> bool:
+        return await self._store("add", key, value, ttl)
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for _reader, writer in idle:
+            writer.close()
+
+
+class ResponseCache:
+    """
+    Tag-invalidated read-through cache over a CacheBackend
+
+    Hit, miss and error counts are kept per key prefix (the part of the key
+    before the first ":", e.g. "partnership").
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int = 300, prefix: str = "resp"):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.errors = 0
+        self.invalidations = 0
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    async def _tag_versions(self, tags: List[str]) -> List[str]:
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        versions = await self.backend.get_many(tag_keys)
+
+        for tag_key in tag_keys:
+            if tag_key not in versions:
+                # First use, or the token was evicted: start a fresh version so
+                # entries written under an older token can never match again
+                token = str(time.time_ns())
+                if not await self.backend.add(tag_key, token, 0):
+                    token = (await self.backend.get_many([tag_key])).get(tag_key, token)
+                versions[tag_key] = token
+
+        return [str(versions[tag_key]) for tag_key in tag_keys]
+
+    async def get_or_load(
+        self,
+        key: str,
+        tags: Iterable[str],
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None
+    ) -> Any:
+        """
+        Return the cached value for `key`, loading and caching it on a miss
+
+        Args:
+            key: Identifies the entry, e.g. "partnership:<id>:user:<id>"
+            tags: Tags whose invalidation must drop this entry
+            loader: Fetches the value on a miss; None results are not cached
+            ttl: Seconds to keep the entry (defaults to the cache TTL)
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        kind = key.split(":", 1)[0]
+
+        try:
+            versions = await self._tag_versions(list(tags))
+            entry_key = f"{self.prefix}:{key}:{'.'.join(versions)}"
+            cached = await self.backend.get_many([entry_key])
+        except CacheBackendError as e:
+            self.errors += 1
+            logger.warning(f"Response cache unavailable, loading {key} directly: {e}")
+            return await loader()
+
+        if entry_key in cached:
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+            return cached[entry_key]
+
+        self.misses[kind] = self.misses.get(kind, 0) + 1
+        value = await loader()
+
+        if value is not None:
+            try:
+                await self.backend.set(entry_key, value, self.ttl if ttl is None else ttl)
+            except CacheBackendError as e:
+                self.errors += 1
+                logger.warning(f"Could not cache {key}: {e}")
+
+        return value
+
+    async def invalidate(self, *tags: str) -> None:
+        """Make every entry carrying any of the tags unreachable"""
+        for tag in tags:
+            self.invalidations += 1
+            try:
+                await self.backend.set(self._tag_key(tag), str(time.time_ns()), 0)
+            except CacheBackendError as e:
+                # Entries under this tag may be served until their TTL runs out
+                self.errors += 1
+                logger.error(f"Could not invalidate cache tag {tag}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit and miss counts per key prefix"""
+        hits = sum(self.hits.values())
+        misses = sum(self.misses.values())
+        return {
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "errors": self.errors,
+            "invalidations": self.invalidations,
+        }
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+def create_cache_backend() -> CacheBackend:
+    """Build the backend selected by RESPONSE_CACHE_BACKEND"""
+    settings = get_settings()
+
+    if settings.RESPONSE_CACHE_BACKEND == "memory":
+        return MemoryCacheBackend(
+            max_size=settings.RESPONSE_CACHE_MAX_SIZE,
+            ttl=settings.RESPONSE_CACHE_TTL_SECONDS
+        )
+    if settings.RESPONSE_CACHE_BACKEND == "memcached":
+        return MemcachedBackend(
+            settings.RESPONSE_CACHE_MEMCACHED_ADDRESS,
+            pool_size=settings.RESPONSE_CACHE_MEMCACHED_POOL_SIZE
+        )
+    if settings.RESPONSE_CACHE_BACKEND == "none":
+        return NullCacheBackend()
+
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {settings.RESPONSE_CACHE_BACKEND}")
+
+
+response_cache = ResponseCache(
+    create_cache_backend(),
+    ttl=get_settings().RESPONSE_CACHE_TTL_SECONDS
+)
+
+registry.register(CallbackMetric(
+    "response_cache_hits_total", "Response cache lookups served from the cache", "counter",
+    lambda: {(kind,): count for kind, count in response_cache.hits.items()}, ("kind",)
+))
+registry.register(CallbackMetric(
+    "response_cache_misses_total", "Response cache lookups that loaded from the database", "counter",
+    lambda: {(kind,): count for kind, count in response_cache.misses.items()}, ("kind",)
+))
+registry.register(CallbackMetric(
+    "response_cache_errors_total", "Response cache backend failures", "counter",
+    lambda: {(): response_cache.errors}
+))
@@ -3,6 +3,14 @@ from dotenv import load_dotenv
 from supabase import create_client, Client
 from .config import get_settings
 from functools import lru_cache
+from typing import Any, Dict, Optional
+import time
+from .database import get_http_client
+from .instrumentation import record_query
+from ..repositories import users as users_repo
+from ..repositories import partnerships as partnerships_repo
+from ..repositories import goals as goals_repo
+from ..repositories import messages as messages_repo
 
 # Load environment variables
 load_dotenv()
@@ -27,42 +35,43 @@ def get_supabase_client() -> Client:
         settings.SUPABASE_SERVICE_KEY
     )
 
+async def get_auth_user(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Resolve an access token to its Supabase Auth user without blocking the event loop.
+    Returns None if the token is invalid or expired.
+    """
+    started = time.perf_counter()
+    response = await get_http_client().get(
+        "/auth/v1/user",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    record_query("auth/v1/user", "get", "", started, int(response.status_code == 200), response.status_code)
+
+    if response.status_code != 200:
+        return None
+
+    return response.json()
+
 # Helper functions for common Supabase operations
 async def get_user_by_id(user_id: str):
     """Get user details by ID"""
-    supabase = get_supabase_client()
-    response = supabase.table('users').select('*').eq('id', user_id).single().execute()
-    return response.data
+    return await users_repo.get_by_id(user_id)
 
 async def get_user_partnerships(user_id: str):
     """Get all partnerships for a user"""
-    supabase = get_supabase_client()
-    response = supabase.table('partnerships').select(
-        '*',
-        count='exact'
-    ).or_(f'user1_id.eq.{user_id},user2_id.eq.{user_id}').execute()
-    return response.data
+    return await partnerships_repo.list_for_user(user_id)
 
 async def get_user_goals(user_id: str):
     """Get all goals for a user"""
-    supabase = get_supabase_client()
-    response = supabase.table('goals').select('*').eq('user_id', user_id).execute()
-    return response.data
+    return await goals_repo.list_for_user(user_id)
 
 async def get_partnership_messages(partnership_id: str, limit: int = 50):
     """Get messages for a partnership"""
-    supabase = get_supabase_client()
-    response = supabase.table('messages').select(
-        '*',
-        count='exact'
-    ).eq('partnership_id', partnership_id).order('created_at', desc=True).limit(limit).execute()
-    return response.data
+    return await messages_repo.list_for_partnership(partnership_id, limit=limit)
 
 async def verify_token(token: str):
     """Verify a user's JWT token"""
     try:
-        supabase = get_supabase_client()
-        user = supabase.auth.get_user(token)
-        return user.user if user else None
+        return await get_auth_user(token)
     except Exception:
-        return None 
\ No newline at end of file
+        return None
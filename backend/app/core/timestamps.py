@@ -0,0 +1,18 @@
+"""
+Parsing of timestamps returned by PostgREST.
+
+PostgREST drops trailing zeros from fractional seconds (e.g. ``.12``), and before
+Python 3.11 ``datetime.fromisoformat`` only accepts exactly 3 or 6 fractional
+digits and no ``Z`` suffix, so values are normalized before parsing.
+"""
+import re
+from datetime import datetime
+
+# Fractional seconds of a timestamp
+_FRACTION = re.compile(r"\.(\d+)")
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse a timestamp returned by PostgREST into an aware datetime"""
+    value = _FRACTION.sub(lambda match: "." + match.group(1)[:6].ljust(6, "0"), value, count=1)
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
@@ -1,32 +1,88 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
 from fastapi.openapi.utils import get_openapi
 from fastapi.responses import RedirectResponse
 from dotenv import load_dotenv
+import asyncio
+import logging
 import os
+import secrets
 
 # Import API router
 from app.api.routes.api import router as api_router
 # Import custom middleware
-from app.core.middleware import ErrorHandlerMiddleware, RequestLoggingMiddleware
+from app.core.middleware import RequestMiddleware
+from app.core.database import close_http_client
+from app.core.response_cache import response_cache
+from app.core.config import get_settings
+from app.core.metrics import registry as metrics_registry
+from app.services.checkin_reminders import run_reminder_dispatcher
+from app.services.notification_writer import notification_writer
+from app.services.email_outbox import email_outbox_worker
+from app.services.email_transport import close_email_transport
+from app.services.email_templates import compile_templates
+from app.services.realtime import hub
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application startup and shutdown hooks
+    """
+    settings = get_settings()
+    if settings.METRICS_ENABLED and not settings.METRICS_BEARER_TOKEN:
+        logger.warning("METRICS_ENABLED is set without METRICS_BEARER_TOKEN; /metrics is readable by anyone")
+    
+    compile_templates()
+    await hub.start()
+    notification_writer.start()
+    background_tasks = []
+    
+    if settings.EMAIL_OUTBOX_ENABLED:
+        email_outbox_worker.start()
+    
+    if settings.CHECKIN_REMINDER_ENABLED:
+        background_tasks.append(asyncio.create_task(run_reminder_dispatcher()))
+    
+    yield
+    
+    # Stop background workers before their connections go away
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    
+    # Write out buffered notifications and finish sends in flight
+    await notification_writer.stop()
+    await email_outbox_worker.stop()
+    await close_email_transport()
+    await hub.stop()
+    
+    # Release pooled database and cache connections
+    await close_http_client()
+    await response_cache.close()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="AccounTable API",
     description="API for the AccounTable accountability partner application",
     version="1.0.0",
+    lifespan=lifespan,
     # Use default docs instead of custom docs which had issues
     # docs_url=None,
     # redoc_url=None,
 )
 
-# Add middleware
-app.add_middleware(ErrorHandlerMiddleware)
-app.add_middleware(RequestLoggingMiddleware)
+# Add middleware (error handling, timing and request logging in one pure ASGI layer)
+app.add_middleware(RequestMiddleware)
 
 # Configure CORS
 app.add_middleware(
@@ -57,6 +113,26 @@ async def health_check():
     """
     return {"status": "healthy"}
 
+# Prometheus metrics endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """
+    Request, Supabase, email and cache metrics of this worker in the Prometheus text format
+    """
+    settings = get_settings()
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    
+    if settings.METRICS_BEARER_TOKEN:
+        expected = f"Bearer {settings.METRICS_BEARER_TOKEN}"
+        if not secrets.compare_digest(request.headers.get("authorization", ""), expected):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    
+    return Response(
+        content=metrics_registry.render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
 # Let's revert to using the built-in Swagger docs instead of custom ones
 # which were causing problems with the OpenAPI schema
 
@@ -2,14 +2,16 @@ from .user import User, UserCreate, UserUpdate, UserInDB, UserLogin, Token, Toke
 from .partnership import Partnership, PartnershipCreate, PartnershipUpdate, PartnershipWithUsers, PartnershipRequest
 from .goal import Goal, GoalCreate, GoalUpdate, GoalWithProgress
 from .checkin import CheckIn, CheckInCreate, CheckInUpdate, CheckInComplete
-from .message import Message, MessageCreate, MessageWithSender
+from .message import Message, MessageCreate, MessageWithSender, MessagePage, InboxEntry
 from .progress import ProgressUpdate, ProgressUpdateCreate
+from .dashboard import Dashboard
 
 __all__ = [
     "User", "UserCreate", "UserUpdate", "UserInDB", "UserLogin", "Token", "TokenPayload",
     "Partnership", "PartnershipCreate", "PartnershipUpdate", "PartnershipWithUsers", "PartnershipRequest",
     "Goal", "GoalCreate", "GoalUpdate", "GoalWithProgress",
     "CheckIn", "CheckInCreate", "CheckInUpdate", "CheckInComplete",
-    "Message", "MessageCreate", "MessageWithSender",
-    "ProgressUpdate", "ProgressUpdateCreate"
+    "Message", "MessageCreate", "MessageWithSender", "MessagePage", "InboxEntry",
+    "ProgressUpdate", "ProgressUpdateCreate",
+    "Dashboard"
 ] 
\ No newline at end of file
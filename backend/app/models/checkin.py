@@ -23,6 +23,9 @@ class CheckInUpdate(BaseModel):
 class CheckInInDB(CheckInBase):
     id: UUID
     completed_at: Optional[datetime] = None
+    reminder_sent_at: Optional[datetime] = None
+    # Schedule slot the check-in was generated for, if created by the recurring scheduler
+    generated_for: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
     
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List
+from .partnership import PartnershipWithUsers
+from .goal import Goal
+from .checkin import CheckIn
+
+
+class Dashboard(BaseModel):
+    """Everything the dashboard page shows, loaded in a single request"""
+    partnerships: List[PartnershipWithUsers] = []
+    goals: List[Goal] = []
+    upcoming_checkins: List[CheckIn] = []
+    notifications: List[Dict[str, Any]] = []
+    unread_notifications: int = 0
+    unread_messages: int = 0
+    # Sections that failed or timed out and are returned empty
+    unavailable_sections: List[str] = []
@@ -2,6 +2,9 @@ from pydantic import BaseModel, Field
 from typing import Optional, Literal
 from datetime import datetime
 from uuid import UUID
+from decimal import Decimal
+
+GoalStatus = Literal["active", "completed", "abandoned"]
 
 
 class GoalBase(BaseModel):
@@ -13,21 +16,27 @@ class GoalBase(BaseModel):
 
 class GoalCreate(GoalBase):
     target_date: Optional[datetime] = None
-    status: Literal["active", "completed", "abandoned"] = "active"
+    status: GoalStatus = "active"
 
 
 class GoalUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
-    status: Optional[Literal["active", "completed", "abandoned"]] = None
+    status: Optional[GoalStatus] = None
     target_date: Optional[datetime] = None
 
 
 class GoalInDB(GoalBase):
     id: UUID
-    status: Literal["active", "completed", "abandoned"]
+    status: GoalStatus
     start_date: datetime
     target_date: Optional[datetime] = None
+    # Progress aggregates maintained by the database on progress update insert/delete
+    progress_update_count: int = 0
+    latest_progress_value: Optional[Decimal] = None
+    progress_value_sum: Decimal = Decimal(0)
+    max_progress_value: Optional[Decimal] = None
+    last_update_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
     
@@ -41,5 +50,6 @@ class Goal(GoalInDB):
 
 
 class GoalWithProgress(Goal):
+    # Most recent progress updates only; the full history is served by GET /progress
     progress_updates: list = []
     completion_percentage: Optional[float] = 0 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from uuid import UUID
 from .user import User
@@ -30,4 +30,32 @@ class Message(MessageInDB):
 
 
 class MessageWithSender(Message):
-    sender: Optional[User] = None 
\ No newline at end of file
+    sender: Optional[User] = None
+
+
+class MessagePage(BaseModel):
+    """
+    A page of messages in chronological order, as returned by GET /messages/page.
+    Pass `before_cursor` as `before` to load older messages and
+    `after_cursor` as `after` to load newer ones.
+    """
+    messages: List[Message]
+    before_cursor: Optional[str] = None
+    after_cursor: Optional[str] = None
+    has_older: bool = False
+    has_newer: bool = False
+
+
+class InboxEntry(BaseModel):
+    """Summary of one partnership's conversation for the inbox"""
+    partnership_id: UUID
+    status: str
+    partner_id: Optional[UUID] = None
+    partner_first_name: Optional[str] = None
+    partner_last_name: Optional[str] = None
+    partner_avatar_url: Optional[str] = None
+    last_message_id: Optional[UUID] = None
+    last_message_sender_id: Optional[UUID] = None
+    last_message_preview: Optional[str] = None
+    last_message_at: Optional[datetime] = None
+    unread_count: int = 0
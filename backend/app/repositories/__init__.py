@@ -0,0 +1,7 @@
+"""
+Async data access layer, one module per table.
+
+Route handlers and services should go through these functions rather than
+talking to PostgREST directly, so every query is awaited on the shared
+connection pool in ``app.core.database``.
+"""
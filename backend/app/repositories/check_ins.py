@@ -0,0 +1,139 @@
+from typing import Any, Dict, List, Optional
+from ..core.database import table
+
+
+async def get_by_id(checkin_id: str) -> Optional[Dict[str, Any]]:
+    """Get a check-in by ID"""
+    response = await table("check_ins").select("*").eq("id", checkin_id).single().execute()
+    return response.data
+
+
+async def get_with_partnership(checkin_id: str) -> Optional[Dict[str, Any]]:
+    """Get a check-in together with the members of its partnership"""
+    response = await table("check_ins").select(
+        "*",
+        "partnership:partnerships(user1_id,user2_id)"
+    ).eq("id", checkin_id).single().execute()
+    return response.data
+
+
+async def list_for_partnerships(
+    partnership_ids: List[str],
+    completed: Optional[bool] = None,
+    scheduled_after: Optional[str] = None,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """List check-ins for a set of partnerships ordered by scheduled date"""
+    if not partnership_ids:
+        return []
+
+    query = table("check_ins").select("*").in_("partnership_id", partnership_ids)
+
+    if completed is not None:
+        if completed:
+            query = query.not_.is_("completed_at", "null")
+        else:
+            query = query.is_("completed_at", "null")
+
+    if scheduled_after:
+        query = query.gte("scheduled_at", scheduled_after)
+
+    query = query.order("scheduled_at")
+
+    if limit:
+        query = query.limit(limit)
+
+    response = await query.execute()
+    return response.data or []
+
+
+async def list_slots_between(
+    partnership_ids: List[str],
+    start: str,
+    end: str
+) -> List[Dict[str, Any]]:
+    """
+    List (partnership_id, scheduled_at, generated_for) of check-ins scheduled, or generated
+    for a schedule slot, in [start, end) for a set of partnerships.
+    May be cut short by PostgREST's max-rows; callers must not rely on it being complete.
+    """
+    if not partnership_ids:
+        return []
+
+    # Quoted because timestamps contain reserved characters
+    start, end = f'"{start}"', f'"{end}"'
+    response = await table("check_ins").select("partnership_id,scheduled_at,generated_for").in_(
+        "partnership_id", partnership_ids
+    ).or_(
+        f"and(scheduled_at.gte.{start},scheduled_at.lt.{end}),"
+        f"and(generated_for.gte.{start},generated_for.lt.{end})"
+    ).execute()
+    return response.data or []
+
+
+async def create_many(checkins: List[Dict[str, Any]]) -> int:
+    """
+    Insert check-ins in a single request and return how many were written.
+    Check-ins already scheduled for the same partnership and time are skipped.
+    """
+    if not checkins:
+        return 0
+
+    response = await table("check_ins").upsert(
+        checkins,
+        on_conflict="partnership_id,scheduled_at",
+        ignore_duplicates=True
+    ).returning("id").execute()
+    return len(response.data or [])
+
+
+async def list_due_for_reminder(start: str, end: str, limit: int) -> List[Dict[str, Any]]:
+    """
+    List incomplete check-ins scheduled in [start, end) that have not been reminded yet,
+    with both partnership members embedded
+    """
+    response = await table("check_ins").select(
+        "id,scheduled_at",
+        "partnership:partnerships("
+        "user1:users!partnerships_user1_id_fkey(id,first_name,last_name,time_zone),"
+        "user2:users!partnerships_user2_id_fkey(id,first_name,last_name,time_zone))"
+    ).is_("completed_at", "null").is_("reminder_sent_at", "null").gte(
+        "scheduled_at", start
+    ).lt("scheduled_at", end).order("scheduled_at").limit(limit).execute()
+    return response.data or []
+
+
+async def claim_reminders(checkin_ids: List[str], sent_at: str) -> List[str]:
+    """
+    Mark check-ins as reminded and return the IDs this call claimed.
+    Rows already claimed by a concurrent dispatcher are left out.
+    """
+    if not checkin_ids:
+        return []
+
+    response = await table("check_ins").update({"reminder_sent_at": sent_at}).in_(
+        "id", checkin_ids
+    ).is_("reminder_sent_at", "null").returning("id").execute()
+    return [row["id"] for row in response.data or []]
+
+
+async def release_reminders(checkin_ids: List[str]) -> None:
+    """Undo claim_reminders for check-ins whose reminders could not be written"""
+    if not checkin_ids:
+        return
+
+    await table("check_ins").update({"reminder_sent_at": None}).in_(
+        "id", checkin_ids
+    ).returning("id").execute()
+
+
+async def create(checkin_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Insert a new check-in"""
+    response = await table("check_ins").insert(checkin_data).execute()
+    return response.data[0] if response.data else None
+
+
+async def update(checkin_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Update a check-in and return the new row"""
+    response = await table("check_ins").update(update_data).eq("id", checkin_id).execute()
+    return response.data[0] if response.data else None
@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from ..core.database import rpc, table
+
+
+async def create(email_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Queue an email for sending"""
+    response = await table("email_outbox").insert(email_data).execute()
+    return response.data[0] if response.data else None
+
+
+async def claim(limit: int, lease_seconds: int, max_attempts: int) -> List[Dict[str, Any]]:
+    """
+    Claim due emails for sending; expired leases on the last attempt are marked
+    failed instead (see migrations/015_email_outbox_attempt_cap.sql)
+    """
+    response = await rpc("claim_email_outbox", {
+        "p_limit": limit,
+        "p_lease_seconds": lease_seconds,
+        "p_max_attempts": max_attempts,
+    }).execute()
+    return response.data or []
+
+
+async def mark_sent(email_id: str, sent_at: str) -> None:
+    """Record a successful delivery"""
+    await table("email_outbox").update({
+        "status": "sent",
+        "sent_at": sent_at,
+        "locked_until": None,
+        "last_error": None,
+        "updated_at": sent_at,
+    }).eq("id", email_id).returning("id").execute()
+
+
+async def mark_retry(email_id: str, error: str, next_attempt_at: str) -> None:
+    """Put an email back in the queue after a failed attempt"""
+    await table("email_outbox").update({
+        "status": "pending",
+        "last_error": error,
+        "next_attempt_at": next_attempt_at,
+        "locked_until": None,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }).eq("id", email_id).returning("id").execute()
+
+
+async def mark_failed(email_id: str, error: str) -> None:
+    """Give up on an email after its last attempt"""
+    await table("email_outbox").update({
+        "status": "failed",
+        "last_error": error,
+        "locked_until": None,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }).eq("id", email_id).returning("id").execute()
@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, Optional
+from ..core.database import table
+
+
+async def get_by_id(goal_id: str) -> Optional[Dict[str, Any]]:
+    """Get a goal by ID"""
+    response = await table("goals").select("*").eq("id", goal_id).single().execute()
+    return response.data
+
+
+# Embedded partnership members, used to authorize access in the same round trip
+WITH_PARTNERSHIP = "partnership:partnerships(user1_id,user2_id)"
+
+
+async def get_with_partnership(goal_id: str) -> Optional[Dict[str, Any]]:
+    """Get a goal together with the members of its partnership"""
+    response = await table("goals").select("*", WITH_PARTNERSHIP).eq("id", goal_id).single().execute()
+    return response.data
+
+
+async def get_with_progress(
+    goal_id: str,
+    newest_first: bool = False,
+    limit: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Get a goal with its partnership members and its progress updates in one query,
+    optionally only the first `limit` updates in the requested order
+    """
+    query = table("goals").select(
+        "*",
+        WITH_PARTNERSHIP,
+        "progress_updates(*)"
+    ).eq("id", goal_id).order(
+        "created_at", desc=newest_first, foreign_table="progress_updates"
+    )
+
+    if limit:
+        query = query.limit(limit, foreign_table="progress_updates")
+
+    response = await query.single().execute()
+    return response.data
+
+
+async def get_owned(goal_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    """Get a goal only if it belongs to the user"""
+    response = await table("goals").select("*").eq("id", goal_id).eq("user_id", user_id).single().execute()
+    return response.data
+
+
+async def list_for_partnership(partnership_id: str, status: Optional[str] = None) -> List[Dict[str, Any]]:
+    """List goals set within a partnership"""
+    query = table("goals").select("*").eq("partnership_id", partnership_id)
+
+    if status:
+        query = query.eq("status", status)
+
+    response = await query.execute()
+    return response.data or []
+
+
+async def list_for_user(user_id: str, status: Optional[str] = None) -> List[Dict[str, Any]]:
+    """List goals owned by a user"""
+    query = table("goals").select("*").eq("user_id", user_id)
+
+    if status:
+        query = query.eq("status", status)
+
+    response = await query.execute()
+    return response.data or []
+
+
+async def create(goal_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Insert a new goal"""
+    response = await table("goals").insert(goal_data).execute()
+    return response.data[0] if response.data else None
+
+
+async def update(goal_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Update a goal and return the new row"""
+    response = await table("goals").update(update_data).eq("id", goal_id).execute()
+    return response.data[0] if response.data else None
@@ -0,0 +1,81 @@
+from typing import Any, Dict, List, Optional
+from ..core.database import rpc, table
+from ..core.pagination import CursorKey, keyset_filter
+
+
+async def get_by_id(message_id: str) -> Optional[Dict[str, Any]]:
+    """Get a message by ID"""
+    response = await table("messages").select("*").eq("id", message_id).single().execute()
+    return response.data
+
+
+async def get_in_partnership(message_id: str, partnership_id: str) -> Optional[Dict[str, Any]]:
+    """Get a message by ID only if it belongs to the partnership"""
+    response = await table("messages").select("*").eq("id", message_id).eq(
+        "partnership_id", partnership_id
+    ).single().execute()
+    return response.data
+
+
+async def list_for_partnership(
+    partnership_id: str,
+    limit: int = 50,
+    before: Optional[CursorKey] = None,
+    after: Optional[CursorKey] = None
+) -> List[Dict[str, Any]]:
+    """
+    List messages in a partnership using keyset pagination on (created_at, id).
+    By default rows are newest first, optionally starting just before the `before` key.
+    With `after`, rows are oldest first, starting just after that key.
+    """
+    query = table("messages").select("*").eq("partnership_id", partnership_id)
+    descending = after is None
+
+    if before:
+        query = query.or_(keyset_filter("created_at", before, "lt"))
+    if after:
+        query = query.or_(keyset_filter("created_at", after, "gt"))
+
+    response = await query.order("created_at", desc=descending).order(
+        "id", desc=descending
+    ).limit(limit).execute()
+    return response.data or []
+
+
+async def get_inbox(user_id: str) -> List[Dict[str, Any]]:
+    """Every partnership of the user with its last message and unread count, most recent first"""
+    response = await rpc("get_message_inbox", {"p_user_id": user_id}).execute()
+    return response.data or []
+
+
+async def create(message_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Insert a new message"""
+    response = await table("messages").insert(message_data).execute()
+    return response.data[0] if response.data else None
+
+
+async def count_unread(partnership_id: str, user_id: str) -> int:
+    """Unread messages from the partner, kept current by triggers on messages and message_reads"""
+    response = await table("message_reads").select("unread_count").eq("user_id", user_id).eq(
+        "partnership_id", partnership_id
+    ).single().execute()
+    return response.data["unread_count"] if response.data else 0
+
+
+async def count_unread_total(user_id: str) -> int:
+    """Unread messages across all of the user's partnerships"""
+    response = await table("message_reads").select("unread_count").eq("user_id", user_id).gt(
+        "unread_count", 0
+    ).execute()
+    return sum(row["unread_count"] for row in response.data or [])
+
+
+async def mark_read(partnership_id: str, user_id: str, read_at: str) -> None:
+    """
+    Move the user's read marker for a partnership; a trigger recounts unread messages.
+    A marker exists as soon as the partner has sent a message, so without one there
+    is nothing to mark.
+    """
+    await table("message_reads").update({"last_read_at": read_at}).eq("user_id", user_id).eq(
+        "partnership_id", partnership_id
+    ).execute()
@@ -0,0 +1,54 @@
+from typing import Any, Dict, List, Optional
+from ..core.database import table
+from ..core.pagination import CursorKey, keyset_filter
+
+
+async def create(notification_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Insert a new notification"""
+    response = await table("notifications").insert(notification_data).execute()
+    return response.data[0] if response.data else None
+
+
+async def create_many(notifications: List[Dict[str, Any]]) -> int:
+    """Insert notifications in a single request and return how many were written"""
+    if not notifications:
+        return 0
+
+    await table("notifications").insert(notifications, returning="minimal").execute()
+    return len(notifications)
+
+
+async def list_for_user(user_id: str, limit: int = 20, unread_only: bool = False) -> List[Dict[str, Any]]:
+    """List a user's newest notifications"""
+    query = table("notifications").select("*").eq("user_id", user_id)
+
+    if unread_only:
+        query = query.eq("read", False)
+
+    response = await query.order("created_at", desc=True).limit(limit).execute()
+    return response.data or []
+
+
+async def list_after(user_id: str, after: CursorKey, limit: int = 100) -> List[Dict[str, Any]]:
+    """List a user's notifications created after a (created_at, id) key, oldest first"""
+    response = await table("notifications").select("*").eq("user_id", user_id).or_(
+        keyset_filter("created_at", after, "gt")
+    ).order("created_at").order("id").limit(limit).execute()
+    return response.data or []
+
+
+async def count_unread(user_id: str) -> int:
+    """Unread notifications for a user, kept current by triggers on notifications"""
+    response = await table("notification_counters").select("unread_count").eq("user_id", user_id).single().execute()
+    return response.data["unread_count"] if response.data else 0
+
+
+async def mark_read(notification_id: str) -> bool:
+    """Mark a single notification as read"""
+    response = await table("notifications").update({"read": True}).eq("id", notification_id).execute()
+    return bool(response.data)
+
+
+async def mark_all_read(user_id: str) -> None:
+    """Mark every unread notification of a user as read"""
+    await table("notifications").update({"read": True}).eq("user_id", user_id).eq("read", False).execute()
@@ -0,0 +1,144 @@
+from typing import Any, Dict, List, Optional
+from ..core.database import rpc, table
+
+# Embedded select returning both members' profiles alongside the partnership
+WITH_USERS = (
+    "*",
+    "user1:users!partnerships_user1_id_fkey(*)",
+    "user2:users!partnerships_user2_id_fkey(*)",
+)
+
+
+def is_member(partnership: Optional[Dict[str, Any]], user_id: str) -> bool:
+    """Check membership against a partnership row (or embedded resource) already fetched"""
+    if not partnership:
+        return False
+    return str(user_id) in (str(partnership.get("user1_id")), str(partnership.get("user2_id")))
+
+
+def partner_id(partnership: Optional[Dict[str, Any]], user_id: str) -> Optional[str]:
+    """The other member of a partnership row already fetched (None while an invitation is pending)"""
+    if not partnership:
+        return None
+    user1_id, user2_id = partnership.get("user1_id"), partnership.get("user2_id")
+    other = user2_id if str(user1_id) == str(user_id) else user1_id
+    return str(other) if other else None
+
+
+def member_filter(user_id: str) -> str:
+    """PostgREST `or` filter matching partnerships the user belongs to"""
+    return f"user1_id.eq.{user_id},user2_id.eq.{user_id}"
+
+
+async def get_for_member(
+    partnership_id: str,
+    user_id: str,
+    status: Optional[str] = None,
+    with_users: bool = False
+) -> Optional[Dict[str, Any]]:
+    """Get a partnership only if the user is one of its members"""
+    columns = WITH_USERS if with_users else ("*",)
+    query = table("partnerships").select(*columns).eq("id", partnership_id).or_(member_filter(user_id))
+
+    if status:
+        query = query.eq("status", status)
+
+    response = await query.single().execute()
+    return response.data
+
+
+async def get_pending_for_recipient(partnership_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    """Get a pending partnership request addressed to the user (user2)"""
+    response = await table("partnerships").select("*").eq("id", partnership_id).eq(
+        "user2_id", user_id
+    ).eq("status", "pending").single().execute()
+    return response.data
+
+
+async def list_for_user(
+    user_id: str,
+    status: Optional[str] = None,
+    with_users: bool = False,
+    columns: str = "*"
+) -> List[Dict[str, Any]]:
+    """List all partnerships the user is a member of"""
+    select_columns = WITH_USERS if with_users else (columns,)
+    query = table("partnerships").select(*select_columns).or_(member_filter(user_id))
+
+    if status:
+        query = query.eq("status", status)
+
+    response = await query.execute()
+    return response.data or []
+
+
+async def list_with_agreements(
+    statuses: List[str],
+    after_id: Optional[str] = None,
+    limit: int = 200
+) -> List[Dict[str, Any]]:
+    """
+    Page through partnerships in the given statuses that have an agreement, ordered by ID,
+    with the agreement schedule and the first member's time zone embedded
+    """
+    query = table("partnerships").select(
+        "id,created_at",
+        "user1:users!partnerships_user1_id_fkey(time_zone)",
+        "partnership_agreements!inner(communication_frequency,check_in_days)"
+    ).in_("status", statuses)
+
+    if after_id:
+        query = query.gt("id", after_id)
+
+    response = await query.order("id").limit(limit).execute()
+    return response.data or []
+
+
+async def create(partnership_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Insert a new partnership"""
+    response = await table("partnerships").insert(partnership_data).execute()
+    return response.data[0] if response.data else None
+
+
+async def create_request(
+    user_id: str,
+    partner_email: str,
+    agreement: Optional[Dict[str, Any]] = None,
+    message: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Create a pending partnership with an existing user, together with the optional
+    agreement and invitation message, in one transaction.
+    Raises DatabaseError with code P0002 if no user has the email, 23505 if already partnered.
+    """
+    response = await rpc("create_partnership_request", {
+        "p_user_id": user_id,
+        "p_partner_email": partner_email,
+        "p_agreement": agreement,
+        "p_message": message,
+    }).execute()
+    return response.data or None
+
+
+async def update(partnership_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Update a partnership and return the new row"""
+    response = await table("partnerships").update(update_data).eq("id", partnership_id).execute()
+    return response.data[0] if response.data else None
+
+
+async def get_agreement(partnership_id: str) -> Optional[Dict[str, Any]]:
+    """Get the agreement attached to a partnership"""
+    response = await table("partnership_agreements").select("*").eq("partnership_id", partnership_id).single().execute()
+    return response.data
+
+
+async def create_agreement(agreement_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Insert a partnership agreement"""
+    response = await table("partnership_agreements").insert(agreement_data).execute()
+    return response.data[0] if response.data else None
+
+
+async def update_agreement(agreement_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Update a partnership agreement and return the new row"""
+    response = await table("partnership_agreements").update(update_data).eq("id", agreement_id).execute()
+    return response.data[0] if response.data else None
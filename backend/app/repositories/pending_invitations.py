@@ -0,0 +1,27 @@
+from typing import Any, Dict, List, Optional
+from ..core.database import table
+
+
+async def get_pending_by_token(invitation_token: str) -> Optional[Dict[str, Any]]:
+    """Get a still-pending invitation by its token"""
+    response = await table("pending_invitations").select("*").eq("invitation_token", invitation_token).eq(
+        "status", "pending"
+    ).limit(1).execute()
+    return response.data[0] if response.data else None
+
+
+async def list_for_inviter(inviter_id: str) -> List[Dict[str, Any]]:
+    """List invitations sent by a user"""
+    response = await table("pending_invitations").select("*").eq("inviter_id", inviter_id).execute()
+    return response.data or []
+
+
+async def create(invitation_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Insert a new invitation"""
+    response = await table("pending_invitations").insert(invitation_data).execute()
+    return response.data[0] if response.data else None
+
+
+async def update_status(invitation_id: str, status: str) -> None:
+    """Set the status of an invitation"""
+    await table("pending_invitations").update({"status": status}).eq("id", invitation_id).execute()
@@ -0,0 +1,36 @@
+from typing import Any, Dict, List, Optional
+from ..core.database import table
+
+
+async def get_by_id(update_id: str) -> Optional[Dict[str, Any]]:
+    """Get a progress update by ID"""
+    response = await table("progress_updates").select("*").eq("id", update_id).single().execute()
+    return response.data
+
+
+async def get_with_partnership(update_id: str) -> Optional[Dict[str, Any]]:
+    """Get a progress update with its goal and the goal's partnership members embedded"""
+    response = await table("progress_updates").select(
+        "*",
+        "goal:goals(partnership_id,partnership:partnerships(user1_id,user2_id))"
+    ).eq("id", update_id).single().execute()
+    return response.data
+
+
+async def list_for_goal(goal_id: str, newest_first: bool = False) -> List[Dict[str, Any]]:
+    """List all progress updates for a goal ordered by creation time"""
+    response = await table("progress_updates").select("*").eq("goal_id", goal_id).order(
+        "created_at", desc=newest_first
+    ).execute()
+    return response.data or []
+
+
+async def create(progress_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Insert a new progress update"""
+    response = await table("progress_updates").insert(progress_data).execute()
+    return response.data[0] if response.data else None
+
+
+async def delete(update_id: str) -> None:
+    """Delete a progress update"""
+    await table("progress_updates").delete().eq("id", update_id).execute()
@@ -0,0 +1,71 @@
+from typing import Any, Dict, List, Optional
+from ..core.database import rpc, table
+
+
+async def get_by_id(user_id: str) -> Optional[Dict[str, Any]]:
+    """Get a user profile by ID"""
+    response = await table("users").select("*").eq("id", user_id).single().execute()
+    return response.data
+
+
+async def get_by_email(email: str) -> Optional[Dict[str, Any]]:
+    """Get a user profile by email address"""
+    response = await table("users").select("*").eq("email", email).limit(1).execute()
+    return response.data[0] if response.data else None
+
+
+async def get_name(user_id: str) -> Optional[Dict[str, Any]]:
+    """Get only the first and last name of a user"""
+    response = await table("users").select("first_name,last_name").eq("id", user_id).single().execute()
+    return response.data
+
+
+async def create(user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Insert a new user profile"""
+    response = await table("users").insert(user_data).execute()
+    return response.data[0] if response.data else None
+
+
+async def register(profile: Dict[str, Any], invitation_token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Create a user profile and, if an invitation token is given, accept the invitation
+    and join the inviter's pending partnership, all in one transaction
+    """
+    response = await rpc("register_user_profile", {
+        "p_user_id": profile["id"],
+        "p_email": profile["email"],
+        "p_first_name": profile["first_name"],
+        "p_last_name": profile["last_name"],
+        "p_time_zone": profile["time_zone"],
+        "p_avatar_url": profile.get("avatar_url"),
+        "p_invitation_token": invitation_token,
+    }).execute()
+    return response.data or None
+
+
+async def update(user_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Update a user profile and return the new row"""
+    response = await table("users").update(update_data).eq("id", user_id).execute()
+    return response.data[0] if response.data else None
+
+
+async def search_by_email(query: str, exclude_user_id: str) -> List[Dict[str, Any]]:
+    """Case-insensitive partial match on email, excluding the given user"""
+    response = await table("users").select("*").ilike("email", f"%{query}%").neq("id", exclude_user_id).execute()
+    return response.data or []
+
+
+async def search(
+    exclude_user_id: str,
+    filters: Dict[str, Any],
+    offset: int = 0,
+    limit: int = 10
+) -> List[Dict[str, Any]]:
+    """List users matching exact-value filters, excluding the given user"""
+    query = table("users").select("*").neq("id", exclude_user_id)
+
+    for column, value in filters.items():
+        query = query.eq(column, value)
+
+    response = await query.range(offset, offset + limit - 1).execute()
+    return response.data or []
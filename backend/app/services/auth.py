@@ -4,11 +4,16 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+from ..core.cache import TTLCache
 from ..core.config import get_settings
-from ..core.supabase import get_supabase_client
+from ..core.database import get_http_client
+from ..core.supabase import get_auth_user, get_supabase_client
+from ..repositories import users as users_repo
 from ..models.user import TokenPayload, User
 import uuid
 import logging
+import time
 
 settings = get_settings()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -22,8 +27,28 @@ SECRET_KEY = "your-secret-key-here"  # Replace with a real secret key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Signing algorithms accepted for Supabase access tokens
+SUPABASE_JWT_ALGORITHMS = {"HS256", "RS256", "ES256"}
+
 logger = logging.getLogger(__name__)
 
+if not settings.SUPABASE_JWT_SECRET:
+    logger.warning(
+        "SUPABASE_JWT_SECRET is not set; HS256 access tokens will be verified with a "
+        "round trip to Supabase Auth on every request"
+    )
+
+# Public signing keys of the Supabase project, refreshed periodically
+_jwks_cache = TTLCache(max_size=1, ttl=settings.JWKS_CACHE_TTL_SECONDS)
+# When the JWKS was last requested (time.monotonic())
+_jwks_fetched_at = 0.0
+
+# Authenticated user profiles keyed by user ID
+_user_cache = TTLCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
@@ -40,17 +65,17 @@ async def authenticate_user(email: str, password: str) -> Optional[User]:
     supabase = get_supabase_client()
     
     try:
-        # This uses Supabase Auth
-        response = supabase.auth.sign_in_with_password({
-            "email": email,
-            "password": password
-        })
+        # This uses Supabase Auth (the gotrue client is synchronous, so keep it off the event loop)
+        response = await run_in_threadpool(
+            supabase.auth.sign_in_with_password,
+            {"email": email, "password": password}
+        )
         
         if response.user:
             # Get the full user profile from our users table
-            user_data = supabase.table("users").select("*").eq("email", email).single().execute()
-            if user_data.data:
-                return User(**user_data.data)
+            user_data = await users_repo.get_by_email(email)
+            if user_data:
+                return User(**user_data)
     except Exception as e:
         logger.error(f"Authentication error: {e}")
     
@@ -70,6 +95,92 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+async def _fetch_jwks() -> dict:
+    """Fetch the project's public signing keys and cache them"""
+    global _jwks_fetched_at
+    
+    # Stamped before the request, so concurrent and failed fetches count too
+    _jwks_fetched_at = time.monotonic()
+    response = await get_http_client().get("/auth/v1/.well-known/jwks.json")
+    response.raise_for_status()
+    jwks = response.json()
+    _jwks_cache.set("jwks", jwks)
+    return jwks
+
+
+def _find_key(jwks: dict, kid: Optional[str]) -> Optional[dict]:
+    for key in jwks.get("keys", []):
+        if key.get("kid") == kid:
+            return key
+    return None
+
+
+async def _get_signing_key(kid: Optional[str]) -> dict:
+    """
+    Find the project's public key with the given key ID
+    
+    An unknown key ID refetches the JWKS, in case the keys were rotated, at most
+    once per JWKS_REFRESH_MIN_INTERVAL_SECONDS; the cached keys stay in use
+    meanwhile, so tokens with made-up key IDs cannot force a fetch per request.
+    """
+    jwks = _jwks_cache.get("jwks")
+    if jwks is None:
+        jwks = await _fetch_jwks()
+    
+    key = _find_key(jwks, kid)
+    if key is None and time.monotonic() - _jwks_fetched_at >= settings.JWKS_REFRESH_MIN_INTERVAL_SECONDS:
+        jwks = await _fetch_jwks()
+        key = _find_key(jwks, kid)
+    
+    if key is None:
+        raise JWTError("Unknown signing key")
+    
+    return key
+
+
+async def decode_supabase_token(token: str) -> dict:
+    """
+    Verify a Supabase access token locally (signature, expiry and audience)
+    
+    HS256 tokens can only be verified locally with SUPABASE_JWT_SECRET; without
+    it they are checked with Supabase Auth instead, and only the subject is
+    returned.
+    
+    Returns:
+        The token claims
+        
+    Raises:
+        JWTError: If the token is malformed, expired or not signed by the project
+    """
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+    
+    if algorithm not in SUPABASE_JWT_ALGORITHMS:
+        raise JWTError(f"Unsupported signing algorithm: {algorithm}")
+    
+    if algorithm == "HS256":
+        if not settings.SUPABASE_JWT_SECRET:
+            auth_user = await get_auth_user(token)
+            if auth_user is None:
+                raise JWTError("Token rejected by Supabase Auth")
+            return {"sub": auth_user["id"]}
+        key = settings.SUPABASE_JWT_SECRET
+    else:
+        key = await _get_signing_key(header.get("kid"))
+    
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[algorithm],
+        audience=settings.SUPABASE_JWT_AUDIENCE
+    )
+
+
+def invalidate_cached_user(user_id: str) -> None:
+    """Drop a user's cached profile, e.g. after it has been updated"""
+    _user_cache.delete(str(user_id))
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     """Get the current authenticated user"""
     if not token:
@@ -78,23 +189,41 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
             detail="Not authenticated"
         )
     
-    supabase = get_supabase_client()
+    return await get_user_from_token(token)
+
+
+async def get_user_from_token(token: str) -> User:
+    """
+    Resolve a Supabase access token to the user it belongs to
+    
+    Used by get_current_user and by connections that cannot send an
+    Authorization header (e.g. browser WebSockets).
     
+    Raises:
+        HTTPException: 401 if the token is invalid
+    """
     try:
-        # Get user ID from token
-        response = supabase.auth.get_user(token)
-        user_id = response.user.id
+        # Get user ID from token (verified locally, no round trip to Supabase Auth)
+        claims = await decode_supabase_token(token)
+        user_id = claims["sub"]
+        
+        user = _user_cache.get(user_id)
+        if user is not None:
+            return user
         
         # Get user data from database
-        user_data = supabase.table("users").select("*").eq("id", user_id).single().execute()
+        user_data = await users_repo.get_by_id(user_id)
         
-        if not user_data.data:
+        if not user_data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
-        return User(**user_data.data)
+        user = User(**user_data)
+        _user_cache.set(user_id, user)
+        
+        return user
     except Exception as e:
         logger.error(f"Authentication error: {e}")
         raise HTTPException(
@@ -122,10 +251,10 @@ async def register_user(
     
     try:
         # Create user in Supabase Auth
-        auth_response = supabase.auth.sign_up({
-            "email": email,
-            "password": password
-        })
+        auth_response = await run_in_threadpool(
+            supabase.auth.sign_up,
+            {"email": email, "password": password}
+        )
         
         if not auth_response.user:
             raise HTTPException(
@@ -133,7 +262,7 @@ async def register_user(
                 detail="Failed to create user"
             )
             
-        # Create user in our users table
+        # Create the user profile and link any invitation in a single transaction
         user_id = auth_response.user.id
         user_data = {
             "id": user_id,
@@ -144,53 +273,21 @@ async def register_user(
             "avatar_url": avatar_url
         }
         
-        response = supabase.table("users").insert(user_data).execute()
-        if not response.data:
-            # If we failed to create the user record, clean up the auth record
-            # This would be better with a transaction, but Supabase doesn't support it directly
-            supabase.auth.admin.delete_user(user_id)
+        try:
+            user_record = await users_repo.register(user_data, invitation_token)
+        except Exception as e:
+            logger.error(f"Failed to create user profile: {e}")
+            user_record = None
+        
+        if not user_record:
+            # The auth user lives outside the database transaction, so clean it up by hand
+            await run_in_threadpool(supabase.auth.admin.delete_user, user_id)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to create user profile"
             )
         
-        # Handle invitation token if provided
-        if invitation_token:
-            # Find the pending invitation
-            invitation_response = supabase.table("pending_invitations").select("*").eq("invitation_token", invitation_token).eq("status", "pending").execute()
-            
-            if invitation_response.data:
-                invitation = invitation_response.data[0]
-                
-                # Update the invitation status
-                supabase.table("pending_invitations").update({"status": "accepted"}).eq("id", invitation["id"]).execute()
-                
-                # Find the pending partnership
-                partnership_response = supabase.table("partnerships").select("*").eq("user1_id", invitation["inviter_id"]).eq("is_user_exists", False).execute()
-                
-                if partnership_response.data:
-                    partnership = partnership_response.data[0]
-                    supabase.table("partnerships").update({
-                        "user2_id": user_id,
-                        "is_user_exists": True
-                    }).eq("id", partnership["id"]).execute()
-                    
-                    # Create partnership agreement if it was included in the invitation
-                    if invitation["agreement"]:
-                        agreement_data = {
-                            "partnership_id": partnership["id"],
-                            "communication_frequency": invitation["agreement"]["communication_frequency"],
-                            "check_in_days": invitation["agreement"]["check_in_days"],
-                            "expectations": invitation["agreement"]["expectations"],
-                            "commitment_level": invitation["agreement"]["commitment_level"],
-                            "feedback_style": invitation["agreement"]["feedback_style"],
-                            "created_by": invitation["inviter_id"],
-                            "updated_by": user_id
-                        }
-                        
-                        supabase.table("partnership_agreements").insert(agreement_data).execute()
-        
-        return User(**response.data[0])
+        return User(**user_record)
     except Exception as e:
         logger.error(f"Registration error: {e}")
         raise HTTPException(
@@ -205,7 +302,8 @@ async def change_password(user_id: str, new_password: str) -> bool:
     
     try:
         # This requires the service role key
-        response = supabase.auth.admin.update_user_by_id(
+        await run_in_threadpool(
+            supabase.auth.admin.update_user_by_id,
             user_id,
             {"password": new_password}
         )
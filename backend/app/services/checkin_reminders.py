@@ -0,0 +1,113 @@
+"""
+Background dispatcher for check-in reminders.
+
+Every app process runs ``run_reminder_dispatcher`` from the FastAPI lifespan.
+Each tick scans incomplete check-ins starting within the lead window, claims
+them by setting ``reminder_sent_at`` (so concurrent processes never remind the
+same check-in twice) and writes the reminders for both partners with one bulk
+insert per batch. If that insert fails the claims are released, so the next
+tick tries those check-ins again.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from ..core.config import get_settings
+from ..core.timestamps import parse_timestamp
+from ..repositories import check_ins as checkins_repo
+from .checkin_scheduler import user_time_zone
+from .notifications import build_checkin_reminder_notification, create_notifications
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def _reminders_for(checkin: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Build the reminders for both members of a check-in's partnership"""
+    partnership = checkin.get("partnership") or {}
+    members = [partnership.get("user1"), partnership.get("user2")]
+    scheduled_at = parse_timestamp(checkin["scheduled_at"])
+    
+    reminders = []
+    for member, partner in (members, reversed(members)):
+        if not member or not partner:
+            continue
+        
+        reminders.append(build_checkin_reminder_notification(
+            user_id=member["id"],
+            checkin_id=checkin["id"],
+            partner_name=f"{partner['first_name']} {partner['last_name']}",
+            scheduled_time=scheduled_at.astimezone(user_time_zone(member.get("time_zone")))
+        ))
+    
+    return reminders
+
+
+async def dispatch_due_reminders(now: Optional[datetime] = None) -> int:
+    """
+    Send reminders for every check-in starting within the lead window that has not had one
+    
+    Args:
+        now: Start of the window, defaults to the current time
+        
+    Returns:
+        The number of reminder notifications created
+    """
+    settings = get_settings()
+    start = now or datetime.now(timezone.utc)
+    end = start + timedelta(minutes=settings.CHECKIN_REMINDER_LEAD_MINUTES)
+    batch_size = settings.CHECKIN_REMINDER_BATCH_SIZE
+    
+    sent = 0
+    
+    while True:
+        due = await checkins_repo.list_due_for_reminder(start.isoformat(), end.isoformat(), batch_size)
+        
+        if not due:
+            break
+        
+        # Only remind for the check-ins this process managed to claim
+        claimed = set(await checkins_repo.claim_reminders(
+            [checkin["id"] for checkin in due],
+            start.isoformat()
+        ))
+        
+        reminders = []
+        for checkin in due:
+            if checkin["id"] in claimed:
+                reminders.extend(_reminders_for(checkin))
+        
+        created = await create_notifications(reminders)
+        
+        if reminders and not created:
+            # The insert failed (create_notifications logged why); leave the rest for the next tick
+            await checkins_repo.release_reminders(list(claimed))
+            logger.warning(f"Released {len(claimed)} check-in reminder claims after a failed insert")
+            break
+        
+        sent += created
+        
+        if len(due) < batch_size:
+            break
+    
+    return sent
+
+
+async def run_reminder_dispatcher() -> None:
+    """
+    Dispatch due reminders at a fixed interval until the task is cancelled
+    """
+    interval = get_settings().CHECKIN_REMINDER_INTERVAL_SECONDS
+    
+    while True:
+        try:
+            sent = await dispatch_due_reminders()
+            
+            if sent:
+                logger.info(f"Sent {sent} check-in reminders")
+                
+        except Exception as e:
+            logger.error(f"Error dispatching check-in reminders: {str(e)}")
+        
+        await asyncio.sleep(interval)
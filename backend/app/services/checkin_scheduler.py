@@ -0,0 +1,263 @@
+"""
+Recurring check-in scheduler.
+
+Materializes upcoming ``check_ins`` rows from each partnership agreement's
+``communication_frequency`` and ``check_in_days``. Partnerships are read a page
+at a time; within a page, every partnership contributes a lazy stream of
+occurrences and a heap merges the streams in time order up to the horizon, so
+rows come out chronologically and are written in fixed-size bulk inserts.
+
+Generated check-ins record their slot in ``generated_for``. Members may move a
+check-in to another time; the slot stays filled and is not generated again.
+
+Agreements carry no time zone of their own, so check-in days and times follow
+the time zone of the member who requested the partnership (``user1``).
+
+Run nightly with:
+
+    python -m app.services.checkin_scheduler
+"""
+import asyncio
+import heapq
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from ..core.config import get_settings
+from ..core.database import close_http_client
+from ..core.timestamps import parse_timestamp
+from ..repositories import check_ins as checkins_repo
+from ..repositories import partnerships as partnerships_repo
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SCHEDULABLE_STATUSES = ["trial", "active"]
+
+WEEKDAYS = {
+    "monday": 0,
+    "tuesday": 1,
+    "wednesday": 2,
+    "thursday": 3,
+    "friday": 4,
+    "saturday": 5,
+    "sunday": 6,
+}
+
+
+def user_time_zone(name: Optional[str]) -> ZoneInfo:
+    """Resolve a user's time zone, falling back to UTC for unknown names"""
+    try:
+        return ZoneInfo(name) if name else ZoneInfo("UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo("UTC")
+
+
+def is_check_in_day(frequency: str, weekdays: Set[int], day: date, anchor: date) -> bool:
+    """
+    Whether a local calendar day has a check-in under an agreement
+    
+    Args:
+        frequency: The agreement's communication_frequency
+        weekdays: Agreed weekdays (Monday = 0); empty means "no preference"
+        day: The local day to test
+        anchor: Local day the partnership started, used when no weekday is agreed
+            and to pick which weeks a bi-weekly schedule falls on
+    
+    Returns:
+        True if a check-in should be scheduled on that day
+    """
+    if frequency == "daily":
+        return not weekdays or day.weekday() in weekdays
+    
+    if frequency in ("weekly", "bi-weekly"):
+        if day.weekday() not in (weekdays or {anchor.weekday()}):
+            return False
+        if frequency == "bi-weekly":
+            anchor_monday = anchor - timedelta(days=anchor.weekday())
+            return ((day - anchor_monday).days // 7) % 2 == 0
+        return True
+    
+    if frequency == "monthly":
+        # First agreed weekday of each month, or the partnership's day of month
+        if weekdays:
+            return day.day <= 7 and day.weekday() == min(weekdays)
+        return day.day == min(anchor.day, 28)
+    
+    return False
+
+
+def occurrences(
+    partnership: Dict[str, Any],
+    start: datetime,
+    horizon: datetime,
+    local_hour: int
+) -> Iterator[datetime]:
+    """
+    Lazily yield the UTC times of a partnership's check-ins in [start, horizon)
+    
+    Args:
+        partnership: Partnership row with embedded agreement and the requesting member's time zone
+        start: Earliest time (UTC) to yield
+        horizon: Time (UTC) at which to stop
+        local_hour: Hour of the day, in the member's time zone, check-ins are placed at
+    
+    Returns:
+        An iterator of check-in times in increasing order
+    """
+    agreement = partnership["partnership_agreements"][0]
+    frequency = agreement["communication_frequency"]
+    weekdays = {
+        WEEKDAYS[name.lower()]
+        for name in agreement.get("check_in_days") or []
+        if name.lower() in WEEKDAYS
+    }
+    
+    zone = user_time_zone((partnership.get("user1") or {}).get("time_zone"))
+    anchor = parse_timestamp(partnership["created_at"]).astimezone(zone).date()
+    day = start.astimezone(zone).date()
+    last_day = horizon.astimezone(zone).date()
+    at = time(hour=local_hour)
+    
+    while day <= last_day:
+        if is_check_in_day(frequency, weekdays, day, anchor):
+            scheduled_at = datetime.combine(day, at, tzinfo=zone).astimezone(timezone.utc)
+            if start <= scheduled_at < horizon:
+                yield scheduled_at
+        day += timedelta(days=1)
+
+
+def merge_until(
+    partnerships: List[Dict[str, Any]],
+    start: datetime,
+    horizon: datetime,
+    local_hour: int
+) -> Iterator[Tuple[datetime, str]]:
+    """
+    Merge the occurrence streams of many partnerships in time order, stopping at the horizon
+    
+    Returns:
+        (scheduled_at, partnership_id) pairs in chronological order
+    """
+    heap: List[Tuple[datetime, int, str, Iterator[datetime]]] = []
+    
+    for index, partnership in enumerate(partnerships):
+        stream = occurrences(partnership, start, horizon, local_hour)
+        first = next(stream, None)
+        if first is not None:
+            heap.append((first, index, partnership["id"], stream))
+    
+    heapq.heapify(heap)
+    
+    while heap:
+        scheduled_at, index, partnership_id, stream = heap[0]
+        yield scheduled_at, partnership_id
+        
+        following = next(stream, None)
+        if following is not None:
+            heapq.heapreplace(heap, (following, index, partnership_id, stream))
+        else:
+            heapq.heappop(heap)
+
+
+async def _schedule_page(
+    partnerships: List[Dict[str, Any]],
+    start: datetime,
+    horizon: datetime,
+    local_hour: int,
+    batch_size: int
+) -> int:
+    """Insert the missing check-ins of one page of partnerships; returns the number created"""
+    # Skips sending most slots that are already filled, including those whose
+    # check-in was moved; the unique index on (partnership_id, scheduled_at)
+    # catches any this lookup missed
+    existing = await checkins_repo.list_slots_between(
+        [partnership["id"] for partnership in partnerships],
+        start.isoformat(),
+        horizon.isoformat()
+    )
+    taken = set()
+    for row in existing:
+        taken.add((row["partnership_id"], parse_timestamp(row["scheduled_at"])))
+        if row.get("generated_for"):
+            taken.add((row["partnership_id"], parse_timestamp(row["generated_for"])))
+    
+    created = 0
+    batch: List[Dict[str, Any]] = []
+    
+    for scheduled_at, partnership_id in merge_until(partnerships, start, horizon, local_hour):
+        if (partnership_id, scheduled_at) in taken:
+            continue
+        
+        batch.append({
+            "partnership_id": partnership_id,
+            "scheduled_at": scheduled_at.isoformat(),
+            "generated_for": scheduled_at.isoformat()
+        })
+        
+        if len(batch) >= batch_size:
+            created += await checkins_repo.create_many(batch)
+            batch = []
+    
+    created += await checkins_repo.create_many(batch)
+    return created
+
+
+async def schedule_recurring_checkins(now: Optional[datetime] = None) -> int:
+    """
+    Create the check-ins every active or trial partnership is due within the horizon
+    
+    Safe to re-run: check-ins that already exist at the same time are skipped
+    (enforced by a unique index, see migration 014), and so are slots whose
+    generated check-in was moved (see migration 016).
+    
+    Args:
+        now: Start of the scheduling window, defaults to the current time
+    
+    Returns:
+        The number of check-ins created
+    """
+    settings = get_settings()
+    start = now or datetime.now(timezone.utc)
+    horizon = start + timedelta(days=settings.CHECKIN_SCHEDULE_HORIZON_DAYS)
+    
+    created = 0
+    after_id = None
+    
+    while True:
+        page = await partnerships_repo.list_with_agreements(
+            SCHEDULABLE_STATUSES,
+            after_id=after_id,
+            limit=settings.CHECKIN_SCHEDULER_PAGE_SIZE
+        )
+        
+        if not page:
+            break
+        
+        created += await _schedule_page(
+            page,
+            start,
+            horizon,
+            settings.CHECKIN_SCHEDULE_LOCAL_HOUR,
+            settings.CHECKIN_SCHEDULER_BATCH_SIZE
+        )
+        after_id = page[-1]["id"]
+        
+        if len(page) < settings.CHECKIN_SCHEDULER_PAGE_SIZE:
+            break
+    
+    logger.info(f"Scheduled {created} recurring check-ins up to {horizon.isoformat()}")
+    return created
+
+
+async def _main() -> None:
+    try:
+        await schedule_recurring_checkins()
+    finally:
+        await close_http_client()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -1,55 +1,52 @@
-import os
-import sendgrid
-from sendgrid.helpers.mail import Mail, Email, To, Content
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from ..core.config import get_settings
+from .email_outbox import enqueue_email
+from .email_templates import PARTNERSHIP_INVITATION
+from .email_transport import OutgoingEmail, deliver
 import logging
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
-async def send_email(to_email: str, subject: str, html_content: str) -> bool:
+async def send_email(to_email: str, subject: str, html_content: str, text_content: Optional[str] = None) -> bool:
     """
-    Send an email using SendGrid
+    Send an email immediately through the configured transport
+    
+    Prefer queue_email on request paths; this waits for the mail provider.
     
     Args:
         to_email: The recipient's email address
         subject: The email subject
         html_content: The HTML content of the email
+        text_content: Optional plain-text alternative
         
     Returns:
         True if the email was sent successfully, False otherwise
     """
-    settings = get_settings()
-    
     try:
-        # Initialize SendGrid client with API key
-        sg = sendgrid.SendGridAPIClient(api_key=settings.SMTP_PASSWORD)
-        
-        # Create the email
-        message = Mail(
-            from_email=settings.SENDER_EMAIL,
-            to_emails=to_email,
-            subject=subject,
-            html_content=html_content
-        )
-        
-        # Send email and get response
-        response = sg.client.mail.send.post(request_body=message.get())
-        
-        if response.status_code in [200, 201, 202]:
-            logger.info(f"Successfully sent email to {to_email}, status code: {response.status_code}")
-            return True
-        else:
-            logger.error(f"Failed to send email. Status code: {response.status_code}")
-            return False
+        await deliver(OutgoingEmail(to_email, subject, html_content, text_content))
+        logger.info(f"Successfully sent email to {to_email}")
+        return True
             
     except Exception as e:
         logger.error(f"Failed to send email to {to_email}: {str(e)}")
         return False
 
 
+async def queue_email(to_email: str, subject: str, html_content: str, text_content: Optional[str] = None) -> bool:
+    """
+    Queue an email in the outbox for background delivery
+    
+    Args:
+        to_email: The recipient's email address
+        subject: The email subject
+        html_content: The HTML content of the email
+        text_content: Optional plain-text alternative
+        
+    Returns:
+        True if the email was queued, False otherwise
+    """
+    return await enqueue_email(to_email, subject, html_content, text_content) is not None
+
+
 async def send_partnership_invitation_email(
     to_email: str, 
     inviter_name: str, 
@@ -57,7 +54,7 @@ async def send_partnership_invitation_email(
     message: str = ""
 ) -> bool:
     """
-    Send an email inviting a new user to join the app and become an accountability partner
+    Queue an email inviting a new user to join the app and become an accountability partner
     
     Args:
         to_email: The recipient's email address
@@ -66,31 +63,12 @@ async def send_partnership_invitation_email(
         message: An optional message from the inviter
         
     Returns:
-        True if the email was sent successfully, False otherwise
-    """
-    settings = get_settings()
-    invitation_link = f"{settings.FRONTEND_URL}/register?invitation={invitation_token}"
-    
-    subject = f"{inviter_name} wants to be your accountability partner on {settings.APP_NAME}"
-    
-    html_content = f"""
-    <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-        <h2 style="color: #333;">You've been invited to {settings.APP_NAME}!</h2>
-        <p>{inviter_name} wants you to be their accountability partner to help them achieve their goals.</p>
-        
-        {f'<div style="padding: 15px; border-left: 3px solid #ddd; margin: 20px 0;"><p><em>"{message}"</em></p></div>' if message else ''}
-        
-        <p>What is {settings.APP_NAME}?</p>
-        <p>{settings.APP_NAME} helps people achieve their goals by pairing them with accountability partners who can provide support, motivation, and regular check-ins.</p>
-        
-        <div style="text-align: center; margin: 30px 0;">
-            <a href="{invitation_link}" style="background-color: #4f46e5; color: white; padding: 12px 20px; text-decoration: none; border-radius: 4px; font-weight: bold;">
-                Join {settings.APP_NAME}
-            </a>
-        </div>
-        
-        <p style="font-size: 0.9em; color: #666;">If you don't want to join, you can ignore this email. The invitation will expire in 7 days.</p>
-    </div>
+        True if the email was queued successfully, False otherwise
     """
+    email = PARTNERSHIP_INVITATION.render(to_email, {
+        "inviter_name": inviter_name,
+        "invitation_token": invitation_token,
+        "message": message,
+    })
     
-    return await send_email(to_email, subject, html_content) 
\ No newline at end of file
+    return await queue_email(email.to_email, email.subject, email.html_content, email.text_content)
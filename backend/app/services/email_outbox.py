@@ -0,0 +1,224 @@
+"""
+Persistent email outbox.
+
+Request handlers call ``enqueue_email``, which only inserts a row into
+``email_outbox``. A pool of background senders started from the FastAPI lifespan
+claims due rows, delivers them through the shared email transport with bounded
+concurrency, and records the outcome: sent, retried later with exponential
+backoff, or failed after ``EMAIL_MAX_ATTEMPTS``. Claimed rows are handed to the
+transport in batches of the size it asks for (see
+``EmailTransport.batch_size``), e.g. one batch per pooled SMTP session.
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from ..core.config import get_settings
+from ..repositories import email_outbox as outbox_repo
+from .email_transport import EmailDeliveryError, OutgoingEmail, deliver_many, get_email_transport
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class EmailOutboxWorker:
+    """
+    Drains the email outbox with at most `concurrency` emails in flight
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 10,
+        poll_interval: float = 5.0,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 30.0,
+        retry_max_seconds: float = 3600.0,
+        lease_seconds: int = 300
+    ):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.lease_seconds = lease_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        # Delivery task -> number of emails it is sending
+        self._in_flight: Dict[asyncio.Task, int] = {}
+
+        # Metrics
+        self.emails_sent = 0
+        self.emails_retried = 0
+        self.emails_failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start polling the outbox on the running event loop"""
+        if self.running:
+            return
+
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop claiming new emails and wait for the sends in flight"""
+        if not self.running:
+            return
+
+        # Let the loop finish its round instead of cancelling it: wait_for() can
+        # swallow a cancellation that lands as the wakeup fires, and a claim
+        # cancelled mid-request would leave its rows leased until they expire
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def wake(self) -> None:
+        """Check the outbox now instead of at the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def retry_delay(self, attempts: int) -> float:
+        """Exponential backoff with jitter for the given number of attempts made"""
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (attempts - 1))
+        return delay * random.uniform(0.9, 1.1)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            claimed = []
+            free_slots = self.concurrency - sum(self._in_flight.values())
+
+            # Clear before claiming so a wake() during the claim (a new email, a
+            # freed slot) is not lost and triggers another round right away
+            self._wakeup.clear()
+
+            if free_slots > 0:
+                try:
+                    claimed = await outbox_repo.claim(free_slots, self.lease_seconds, self.max_attempts)
+                except Exception as e:
+                    logger.error(f"Error claiming outbox emails: {str(e)}")
+
+            if claimed:
+                batch_size = get_email_transport().batch_size(len(claimed))
+                for start in range(0, len(claimed), batch_size):
+                    batch = claimed[start:start + batch_size]
+                    task = asyncio.create_task(self._deliver(batch))
+                    self._in_flight[task] = len(batch)
+                    task.add_done_callback(self._on_delivered)
+
+            # A full batch suggests more is waiting; otherwise sleep until woken or polled
+            if claimed and len(claimed) == free_slots:
+                await asyncio.sleep(0)
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _on_delivered(self, task: asyncio.Task) -> None:
+        self._in_flight.pop(task, None)
+        # Slots are free again
+        self.wake()
+
+    async def _deliver(self, rows: List[Dict[str, Any]]) -> None:
+        emails = [
+            OutgoingEmail(
+                to_email=row["to_email"],
+                subject=row["subject"],
+                html_content=row["html_content"],
+                text_content=row.get("text_content")
+            )
+            for row in rows
+        ]
+
+        try:
+            results = await deliver_many(emails)
+        except Exception as e:
+            results = [e] * len(rows)
+
+        for row, error in zip(rows, results):
+            if error is None:
+                await self._record_sent(row)
+            else:
+                await self._record_failure(row, error)
+
+    async def _record_sent(self, row: Dict[str, Any]) -> None:
+        try:
+            await outbox_repo.mark_sent(row["id"], datetime.now(timezone.utc).isoformat())
+            self.emails_sent += 1
+            logger.info(f"Successfully sent email to {row['to_email']}")
+        except Exception as e:
+            # The lease will expire and the email may be sent twice; log it loudly
+            logger.error(f"Email {row['id']} was sent but could not be marked as sent: {str(e)}")
+
+    async def _record_failure(self, row: Dict[str, Any], error: Exception) -> None:
+        attempts = row["attempts"]
+        permanent = isinstance(error, EmailDeliveryError) and error.permanent
+
+        try:
+            if permanent or attempts >= self.max_attempts:
+                await outbox_repo.mark_failed(row["id"], str(error))
+                self.emails_failed += 1
+                logger.error(f"Giving up on email to {row['to_email']} after {attempts} attempts: {str(error)}")
+            else:
+                next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=self.retry_delay(attempts))
+                await outbox_repo.mark_retry(row["id"], str(error), next_attempt_at.isoformat())
+                self.emails_retried += 1
+                logger.warning(f"Email to {row['to_email']} failed (attempt {attempts}), retrying: {str(error)}")
+        except Exception as e:
+            logger.error(f"Error recording failure for email {row['id']}: {str(e)}")
+
+
+async def enqueue_email(
+    to_email: str,
+    subject: str,
+    html_content: str,
+    text_content: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Queue an email for background delivery
+
+    Args:
+        to_email: The recipient's email address
+        subject: The email subject
+        html_content: The HTML content of the email
+        text_content: Optional plain-text alternative
+
+    Returns:
+        The outbox record, or None if it could not be queued
+    """
+    try:
+        record = await outbox_repo.create({
+            "to_email": to_email,
+            "subject": subject,
+            "html_content": html_content,
+            "text_content": text_content
+        })
+    except Exception as e:
+        logger.error(f"Failed to queue email to {to_email}: {str(e)}")
+        return None
+
+    email_outbox_worker.wake()
+    return record
+
+
+settings = get_settings()
+
+email_outbox_worker = EmailOutboxWorker(
+    concurrency=settings.EMAIL_WORKER_CONCURRENCY,
+    poll_interval=settings.EMAIL_OUTBOX_POLL_INTERVAL_SECONDS,
+    max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+    retry_base_seconds=settings.EMAIL_RETRY_BASE_SECONDS,
+    retry_max_seconds=settings.EMAIL_RETRY_MAX_SECONDS
+)
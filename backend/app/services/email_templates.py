@@ -0,0 +1,205 @@
+"""
+Precompiled email templates.
+
+Each template has a subject, an HTML body and a plain-text body written with
+``{field}`` placeholders and ``{?field}...{/field}`` sections that are only
+rendered when ``field`` is truthy. ``compile_templates()`` runs once at startup:
+it splits every body into static fragments and placeholders, bakes the
+app-wide values (``app_name``, ``frontend_url``) into the static fragments, so
+rendering an email is a single join over those fragments and the field values.
+Values are HTML-escaped in the HTML body and left as-is in the text body.
+"""
+import html
+import re
+from string import Formatter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..core.config import get_settings
+from .email_transport import OutgoingEmail
+
+_SECTION = re.compile(r"\{\?(\w+)\}(.*?)\{/\1\}", re.DOTALL)
+
+
+class CompiledTemplate:
+    """
+    A template body split into static fragments, fields and optional sections
+
+    Adjacent static text (including substituted constants) is merged into one
+    fragment, so rendering joins as few strings as possible.
+    """
+
+    def __init__(self, source: str, constants: Dict[str, Any], escape: Optional[Callable[[str], str]]):
+        self._escape = escape
+        self._parts: List[Tuple[str, Any]] = []
+        self._compile(source, constants)
+
+    def _compile(self, source: str, constants: Dict[str, Any]) -> None:
+        static: List[str] = []
+
+        def emit_dynamic(kind: str, value: Any) -> None:
+            if static:
+                self._parts.append(("static", "".join(static)))
+                static.clear()
+            self._parts.append((kind, value))
+
+        def compile_fields(text: str) -> None:
+            for literal, field, _spec, _conversion in Formatter().parse(text):
+                if literal:
+                    static.append(literal)
+                if field is None:
+                    continue
+                if field in constants:
+                    static.append(self._apply_escape(str(constants[field])))
+                else:
+                    emit_dynamic("field", field)
+
+        position = 0
+        for match in _SECTION.finditer(source):
+            compile_fields(source[position:match.start()])
+            name, body = match.group(1), match.group(2)
+            if name in constants:
+                if constants[name]:
+                    compile_fields(body)
+            else:
+                emit_dynamic("section", (name, CompiledTemplate(body, constants, self._escape)))
+            position = match.end()
+        compile_fields(source[position:])
+
+        if static:
+            self._parts.append(("static", "".join(static)))
+
+    def _apply_escape(self, value: str) -> str:
+        return self._escape(value) if self._escape else value
+
+    def render(self, context: Dict[str, Any]) -> str:
+        """Render the body with the given field values"""
+        escape = self._escape
+        pieces = []
+        for kind, value in self._parts:
+            if kind == "static":
+                pieces.append(value)
+            elif kind == "field":
+                text = str(context[value])
+                pieces.append(escape(text) if escape else text)
+            elif context.get(value[0]):
+                pieces.append(value[1].render(context))
+        return "".join(pieces)
+
+
+class EmailTemplate:
+    """Subject, HTML and plain-text bodies of one kind of email"""
+
+    def __init__(self, name: str, subject: str, html_body: str, text_body: str):
+        self.name = name
+        self.subject = subject
+        self.html_body = html_body
+        self.text_body = text_body
+        self._compiled: Optional[Tuple[CompiledTemplate, CompiledTemplate, CompiledTemplate]] = None
+
+    def compile(self, constants: Dict[str, Any]) -> None:
+        """Precompile all three parts against the app-wide constants"""
+        self._compiled = (
+            CompiledTemplate(self.subject, constants, None),
+            CompiledTemplate(self.html_body, constants, html.escape),
+            CompiledTemplate(self.text_body, constants, None),
+        )
+
+    def render(self, to_email: str, context: Dict[str, Any]) -> OutgoingEmail:
+        """
+        Render a multipart email for one recipient
+
+        Args:
+            to_email: The recipient's email address
+            context: Values for the template's fields
+
+        Returns:
+            The email ready to hand to a transport or the outbox
+        """
+        if self._compiled is None:
+            self.compile(_constants())
+
+        subject, html_body, text_body = self._compiled
+        return OutgoingEmail(
+            to_email=to_email,
+            subject=subject.render(context),
+            html_content=html_body.render(context),
+            text_content=text_body.render(context)
+        )
+
+    def render_many(self, recipients: Iterable[Tuple[str, Dict[str, Any]]]) -> List[OutgoingEmail]:
+        """
+        Render the template for many recipients
+
+        Args:
+            recipients: (email address, context) pairs
+
+        Returns:
+            One rendered email per recipient, in order
+        """
+        if self._compiled is None:
+            self.compile(_constants())
+
+        render = self.render
+        return [render(to_email, context) for to_email, context in recipients]
+
+
+PARTNERSHIP_INVITATION = EmailTemplate(
+    name="partnership_invitation",
+    subject="{inviter_name} wants to be your accountability partner on {app_name}",
+    html_body="""
+    <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+        <h2 style="color: #333;">You've been invited to {app_name}!</h2>
+        <p>{inviter_name} wants you to be their accountability partner to help them achieve their goals.</p>
+        {?message}
+        <div style="padding: 15px; border-left: 3px solid #ddd; margin: 20px 0;"><p><em>"{message}"</em></p></div>
+        {/message}
+        <p>What is {app_name}?</p>
+        <p>{app_name} helps people achieve their goals by pairing them with accountability partners who can provide support, motivation, and regular check-ins.</p>
+
+        <div style="text-align: center; margin: 30px 0;">
+            <a href="{frontend_url}/register?invitation={invitation_token}" style="background-color: #4f46e5; color: white; padding: 12px 20px; text-decoration: none; border-radius: 4px; font-weight: bold;">
+                Join {app_name}
+            </a>
+        </div>
+
+        <p style="font-size: 0.9em; color: #666;">If you don't want to join, you can ignore this email. The invitation will expire in 7 days.</p>
+    </div>
+    """,
+    text_body="""You've been invited to {app_name}!
+
+{inviter_name} wants you to be their accountability partner to help them achieve their goals.
+{?message}
+"{message}"
+{/message}
+{app_name} helps people achieve their goals by pairing them with accountability partners who can provide support, motivation, and regular check-ins.
+
+Join {app_name}: {frontend_url}/register?invitation={invitation_token}
+
+If you don't want to join, you can ignore this email. The invitation will expire in 7 days.
+"""
+)
+
+TEMPLATES: Dict[str, EmailTemplate] = {
+    template.name: template
+    for template in (PARTNERSHIP_INVITATION,)
+}
+
+
+def _constants() -> Dict[str, Any]:
+    settings = get_settings()
+    return {
+        "app_name": settings.APP_NAME,
+        "frontend_url": settings.FRONTEND_URL,
+    }
+
+
+def compile_templates() -> None:
+    """Compile every registered template; called once at startup"""
+    constants = _constants()
+    for template in TEMPLATES.values():
+        template.compile(constants)
+
+
+def get_template(name: str) -> EmailTemplate:
+    """Look up a registered template by name"""
+    return TEMPLATES[name]
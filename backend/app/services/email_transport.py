@@ -0,0 +1,414 @@
+"""
+Pluggable transports that deliver outgoing email.
+
+Each transport keeps its connections open for the life of the process; call
+``close()`` on shutdown. ``EMAIL_TRANSPORT`` selects the implementation:
+
+- ``sendgrid``: SendGrid v3 HTTP API over one pooled async client
+- ``smtp``: a pool of long-lived, authenticated SMTP sessions (``SMTP_*`` settings)
+- ``memory``: keeps messages in a list instead of sending them (local runs and tests)
+"""
+import abc
+import asyncio
+import logging
+import math
+import time
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+
+import aiosmtplib
+import httpx
+
+from ..core.config import get_settings
+from ..core.metrics import email_send_duration_seconds
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class EmailDeliveryError(Exception):
+    """
+    Raised when a transport could not deliver a message
+
+    `permanent` marks failures that retrying cannot fix (e.g. a rejected address).
+    """
+
+    def __init__(self, message: str, permanent: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+class OutgoingEmail:
+    """A single message to deliver"""
+
+    def __init__(self, to_email: str, subject: str, html_content: str, text_content: Optional[str] = None):
+        self.to_email = to_email
+        self.subject = subject
+        self.html_content = html_content
+        self.text_content = text_content
+
+
+class EmailTransport(abc.ABC):
+    """Base class for email transports"""
+
+    @abc.abstractmethod
+    async def send(self, email: OutgoingEmail) -> None:
+        """Deliver one message or raise EmailDeliveryError"""
+
+    async def send_many(self, emails: List[OutgoingEmail]) -> List[Optional[Exception]]:
+        """
+        Deliver several messages, returning one entry per message:
+        None if it was sent, otherwise the error it failed with
+        """
+        results: List[Optional[Exception]] = []
+        for email in emails:
+            try:
+                await self.send(email)
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def batch_size(self, pending: int) -> int:
+        """
+        How many of `pending` messages to hand to one send_many() call
+
+        1 (the default) means batching gains nothing and messages are better
+        sent individually and concurrently.
+        """
+        return 1
+
+    async def close(self) -> None:
+        """Release any open connections"""
+
+
+class SendGridTransport(EmailTransport):
+    """Sends through the SendGrid v3 API, reusing one keep-alive HTTP client"""
+
+    API_URL = "https://api.sendgrid.com/v3/mail/send"
+
+    def __init__(self, api_key: str, sender_email: str, timeout: float = 10.0):
+        self.api_key = api_key
+        self.sender_email = sender_email
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=self.timeout,
+            )
+        return self._client
+
+    async def send(self, email: OutgoingEmail) -> None:
+        content = []
+        if email.text_content:
+            content.append({"type": "text/plain", "value": email.text_content})
+        content.append({"type": "text/html", "value": email.html_content})
+
+        try:
+            response = await self._get_client().post(self.API_URL, json={
+                "personalizations": [{"to": [{"email": email.to_email}]}],
+                "from": {"email": self.sender_email},
+                "subject": email.subject,
+                "content": content,
+            })
+        except httpx.HTTPError as e:
+            raise EmailDeliveryError(f"SendGrid request failed: {e}")
+
+        if response.status_code in (200, 201, 202):
+            return
+
+        # Rate limiting and server errors are worth retrying, other client errors are not
+        permanent = 400 <= response.status_code < 500 and response.status_code != 429
+        raise EmailDeliveryError(
+            f"SendGrid returned {response.status_code}: {response.text[:200]}",
+            permanent=permanent
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class SMTPTransport(EmailTransport):
+    """
+    Sends over SMTP, reusing up to `pool_size` authenticated sessions
+
+    A session is kept open between messages and recycled after
+    `max_messages_per_connection` sends, so connect, TLS and AUTH are paid
+    once per session instead of once per email. send_many() sends a whole
+    batch over a single session; the email outbox spreads the emails it
+    claims over the pool in such batches (see batch_size()).
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        sender_email: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = False,
+        start_tls: Optional[bool] = None,
+        pool_size: int = 4,
+        max_messages_per_connection: int = 100,
+        timeout: float = 10.0
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.sender_email = sender_email
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.pool_size = pool_size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.timeout = timeout
+        self._idle: List[aiosmtplib.SMTP] = []
+        self._slots = asyncio.Semaphore(pool_size)
+        self._sent_on: Dict[int, int] = {}
+
+        # Metrics
+        self.connections_opened = 0
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        session = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username or None,
+            password=self.password or None,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls,
+            timeout=self.timeout,
+        )
+        try:
+            await session.connect()
+        except (aiosmtplib.SMTPException, OSError) as e:
+            raise EmailDeliveryError(f"Could not connect to SMTP server: {e}")
+
+        self.connections_opened += 1
+        self._sent_on[id(session)] = 0
+        return session
+
+    async def _checkout(self) -> aiosmtplib.SMTP:
+        while self._idle:
+            session = self._idle.pop()
+            if session.is_connected:
+                return session
+            self._sent_on.pop(id(session), None)
+        return await self._connect()
+
+    async def _checkin(self, session: aiosmtplib.SMTP) -> None:
+        if session.is_connected and self._sent_on.get(id(session), 0) < self.max_messages_per_connection:
+            self._idle.append(session)
+            return
+        await self._quit(session)
+
+    async def _quit(self, session: aiosmtplib.SMTP) -> None:
+        self._sent_on.pop(id(session), None)
+        try:
+            if session.is_connected:
+                await session.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            session.close()
+
+    def _build_message(self, email: OutgoingEmail) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = self.sender_email
+        message["To"] = email.to_email
+        message["Subject"] = email.subject
+        if email.text_content:
+            message.set_content(email.text_content)
+            message.add_alternative(email.html_content, subtype="html")
+        else:
+            message.set_content(email.html_content, subtype="html")
+        return message
+
+    async def _send_on(self, session: aiosmtplib.SMTP, email: OutgoingEmail) -> aiosmtplib.SMTP:
+        """Send one message, reconnecting once if the server dropped an idle session"""
+        message = self._build_message(email)
+
+        for attempt in range(2):
+            try:
+                await session.send_message(message)
+                self._sent_on[id(session)] = self._sent_on.get(id(session), 0) + 1
+                return session
+            except aiosmtplib.SMTPServerDisconnected:
+                await self._quit(session)
+                if attempt:
+                    raise EmailDeliveryError("SMTP server disconnected")
+                session = await self._connect()
+            except aiosmtplib.SMTPRecipientsRefused as e:
+                raise EmailDeliveryError(f"Recipient refused: {e}", permanent=_is_permanent(e.recipients[0].code if e.recipients else 0))
+            except aiosmtplib.SMTPResponseException as e:
+                raise EmailDeliveryError(f"SMTP error {e.code}: {e.message}", permanent=_is_permanent(e.code))
+            except (aiosmtplib.SMTPException, OSError) as e:
+                await self._quit(session)
+                raise EmailDeliveryError(f"SMTP send failed: {e}")
+
+        return session
+
+    async def send(self, email: OutgoingEmail) -> None:
+        error = (await self.send_many([email]))[0]
+        if error is not None:
+            raise error
+
+    async def send_many(self, emails: List[OutgoingEmail]) -> List[Optional[Exception]]:
+        results: List[Optional[Exception]] = []
+
+        async with self._slots:
+            session: Optional[aiosmtplib.SMTP] = None
+            try:
+                for email in emails:
+                    try:
+                        if session is None or not session.is_connected:
+                            session = await self._checkout()
+                        elif self._sent_on.get(id(session), 0) >= self.max_messages_per_connection:
+                            await self._quit(session)
+                            session = await self._connect()
+                        session = await self._send_on(session, email)
+                        results.append(None)
+                    except EmailDeliveryError as e:
+                        results.append(e)
+            finally:
+                if session is not None:
+                    await self._checkin(session)
+
+        return results
+
+    def batch_size(self, pending: int) -> int:
+        # One batch per pooled session, each within the per-session message limit
+        return max(1, min(self.max_messages_per_connection, math.ceil(pending / self.pool_size)))
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for session in idle:
+            await self._quit(session)
+
+
+def _is_permanent(code: int) -> bool:
+    """5xx SMTP replies are permanent failures, 4xx are worth retrying"""
+    return 500 <= code < 600
+
+
+class InMemoryTransport(EmailTransport):
+    """
+    Local stand-in that records messages instead of sending them.
+    Queue exceptions in `failures` to make the next sends fail.
+    """
+
+    def __init__(self):
+        self.sent: List[OutgoingEmail] = []
+        self.failures: List[Exception] = []
+
+    async def send(self, email: OutgoingEmail) -> None:
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append(email)
+        logger.info(f"[memory transport] Email to {email.to_email}: {email.subject}")
+
+
+_transport: Optional[EmailTransport] = None
+
+
+def create_email_transport() -> EmailTransport:
+    """Build the transport selected by EMAIL_TRANSPORT"""
+    settings = get_settings()
+
+    if settings.EMAIL_TRANSPORT == "memory":
+        return InMemoryTransport()
+    if settings.EMAIL_TRANSPORT == "sendgrid":
+        return SendGridTransport(
+            api_key=settings.SMTP_PASSWORD,
+            sender_email=settings.SENDER_EMAIL,
+            timeout=settings.EMAIL_SEND_TIMEOUT
+        )
+    if settings.EMAIL_TRANSPORT == "smtp":
+        return SMTPTransport(
+            hostname=settings.SMTP_SERVER,
+            port=settings.SMTP_PORT,
+            sender_email=settings.SENDER_EMAIL,
+            username=settings.SMTP_USERNAME,
+            password=settings.SMTP_PASSWORD,
+            use_tls=settings.SMTP_USE_TLS,
+            start_tls=settings.SMTP_START_TLS,
+            pool_size=settings.SMTP_POOL_SIZE,
+            max_messages_per_connection=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+            timeout=settings.EMAIL_SEND_TIMEOUT
+        )
+
+    raise ValueError(f"Unknown EMAIL_TRANSPORT: {settings.EMAIL_TRANSPORT}")
+
+
+def get_email_transport() -> EmailTransport:
+    """Return the process-wide email transport"""
+    global _transport
+
+    if _transport is None:
+        _transport = create_email_transport()
+
+    return _transport
+
+
+def set_email_transport(transport: Optional[EmailTransport]) -> None:
+    """Replace the process-wide transport, e.g. with an InMemoryTransport in tests"""
+    global _transport
+    _transport = transport
+
+
+async def deliver(email: OutgoingEmail) -> None:
+    """
+    Send one email through the process-wide transport, recording how long it took
+
+    Raises:
+        EmailDeliveryError: If the transport could not deliver the message
+    """
+    started = time.perf_counter()
+    outcome = "failed"
+    try:
+        await get_email_transport().send(email)
+        outcome = "sent"
+    except EmailDeliveryError as e:
+        if e.permanent:
+            outcome = "rejected"
+        raise
+    finally:
+        email_send_duration_seconds.observe(time.perf_counter() - started, get_settings().EMAIL_TRANSPORT, outcome)
+
+
+async def deliver_many(emails: List[OutgoingEmail]) -> List[Optional[Exception]]:
+    """
+    Send several emails with one send_many() call on the process-wide transport
+
+    The batch's duration is recorded split evenly over its emails.
+
+    Returns:
+        One entry per email: None if it was sent, otherwise the error it failed with
+    """
+    started = time.perf_counter()
+    results = await get_email_transport().send_many(emails)
+
+    duration = (time.perf_counter() - started) / max(1, len(emails))
+    transport = get_settings().EMAIL_TRANSPORT
+    for error in results:
+        if error is None:
+            outcome = "sent"
+        elif isinstance(error, EmailDeliveryError) and error.permanent:
+            outcome = "rejected"
+        else:
+            outcome = "failed"
+        email_send_duration_seconds.observe(duration, transport, outcome)
+
+    return results
+
+
+async def close_email_transport() -> None:
+    """Close the process-wide transport"""
+    global _transport
+
+    if _transport is not None:
+        await _transport.close()
+        _transport = None
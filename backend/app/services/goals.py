@@ -0,0 +1,85 @@
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+from ..core.response_cache import response_cache
+from ..repositories import goals as goals_repo
+
+# Fallback weight of a progress update that carries no progress_value
+UPDATE_COUNT_STEP = 10
+
+
+def calculate_completion_percentage(goal: Dict[str, Any]) -> float:
+    """
+    Calculate how complete a goal is from its maintained progress aggregates
+    
+    Progress values are percentages reported by the goal owner, so the latest
+    reported value is the current completion. Goals tracked only with text
+    updates fall back to a fixed step per update.
+    
+    Args:
+        goal: The goal record, including its progress aggregate columns
+    
+    Returns:
+        Completion between 0 and 100
+    """
+    if goal.get("status") == "completed":
+        return 100.0
+    
+    latest_value = goal.get("latest_progress_value")
+    if latest_value is not None:
+        return float(min(Decimal(100), max(Decimal(0), Decimal(str(latest_value)))))
+    
+    update_count = goal.get("progress_update_count") or 0
+    return float(min(100, update_count * UPDATE_COUNT_STEP))
+
+
+async def list_goals_for_user(user_id: str, status: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Get a user's goals, served from the response cache
+    
+    The result is shared and must not be modified.
+    
+    Args:
+        user_id: The ID of the goal owner
+        status: Only return goals with this status
+    
+    Returns:
+        The goal records
+    """
+    return await response_cache.get_or_load(
+        f"goals:user:{user_id}:status:{status}",
+        [f"goals:user:{user_id}"],
+        lambda: goals_repo.list_for_user(str(user_id), status=status)
+    )
+
+
+async def list_goals_for_partnership(partnership_id: str, status: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Get a partnership's goals, served from the response cache; callers must check membership first
+    
+    The result is shared and must not be modified.
+    
+    Args:
+        partnership_id: The ID of the partnership
+        status: Only return goals with this status
+    
+    Returns:
+        The goal records
+    """
+    return await response_cache.get_or_load(
+        f"goals:partnership:{partnership_id}:status:{status}",
+        [f"goals:partnership:{partnership_id}"],
+        lambda: goals_repo.list_for_partnership(str(partnership_id), status=status)
+    )
+
+
+async def invalidate_goal_lists(goal: Dict[str, Any]) -> None:
+    """
+    Drop cached goal lists containing a goal
+    
+    Must be called whenever a goal is created or updated, including through its
+    progress updates, which change the goal's progress aggregates.
+    """
+    await response_cache.invalidate(
+        f"goals:user:{goal['user_id']}",
+        f"goals:partnership:{goal['partnership_id']}"
+    )
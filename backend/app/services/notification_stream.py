@@ -0,0 +1,141 @@
+"""
+Server-Sent Events stream of a user's notifications.
+
+Each connection subscribes to the user's topic on the real-time hub. New
+notifications are published there once they are stored (see
+``realtime.publish_notifications``), so anything sent over the stream can be
+replayed from the ``notifications`` table: event IDs are keyset cursors over
+``(created_at, id)`` and a reconnecting client's ``Last-Event-ID`` resumes right
+after the last notification it saw.
+"""
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Dict, Optional, Set
+
+from ..core.config import get_settings
+from ..core.pagination import InvalidCursor, decode_cursor, row_cursor
+from ..repositories import notifications as notifications_repo
+from .realtime import hub, notification_topic
+
+# Configure logging
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Open streams per user ID in this process
+_open_streams: Dict[str, int] = {}
+
+
+class TooManyStreams(Exception):
+    """Raised when a user already has the maximum number of open streams"""
+
+
+def open_stream(user_id: str) -> None:
+    """
+    Reserve one of the user's stream slots
+
+    Raises:
+        TooManyStreams: If NOTIFICATION_STREAM_MAX_CONNECTIONS_PER_USER are already open
+    """
+    user_id = str(user_id)
+    if _open_streams.get(user_id, 0) >= settings.NOTIFICATION_STREAM_MAX_CONNECTIONS_PER_USER:
+        raise TooManyStreams(user_id)
+    _open_streams[user_id] = _open_streams.get(user_id, 0) + 1
+
+
+def close_stream(user_id: str) -> None:
+    """Release a slot reserved with open_stream"""
+    user_id = str(user_id)
+    remaining = _open_streams.get(user_id, 0) - 1
+    if remaining > 0:
+        _open_streams[user_id] = remaining
+    else:
+        _open_streams.pop(user_id, None)
+
+
+def format_event(data: str, event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    """Encode one SSE frame; `data` must be a single line (e.g. compact JSON)"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _notification_event(notification: Dict) -> str:
+    return format_event(
+        json.dumps(notification, default=str),
+        event="notification",
+        event_id=row_cursor(notification, "created_at")
+    )
+
+
+def _unread_count_event(count: int) -> str:
+    return format_event(json.dumps({"unread_count": count}), event="unread_count")
+
+
+async def notification_events(user_id: str, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Yield SSE frames for a user's notification stream until the client disconnects
+
+    The stream starts with any notifications created after `last_event_id` and
+    the current unread count, then sends each new notification followed by the
+    updated unread count. Unread counts always come from the user's counter row,
+    never from counting events, since a notification published just after the
+    stream subscribed may already be included in the first count. A comment line is sent as a heartbeat whenever the
+    stream has been idle for NOTIFICATION_STREAM_HEARTBEAT_SECONDS.
+
+    Args:
+        user_id: The ID of the user
+        last_event_id: The ID of the last event the client received, if resuming
+
+    Returns:
+        An async iterator of encoded SSE frames
+    """
+    user_id = str(user_id)
+
+    # Subscribe before reading the backlog so nothing created in between is missed
+    async with hub.subscribe(notification_topic(user_id)) as subscription:
+        # Tell EventSource how long to wait before reconnecting
+        yield f"retry: {settings.NOTIFICATION_STREAM_RETRY_MS}\n\n"
+
+        replayed: Set[str] = set()
+        if last_event_id:
+            try:
+                after = decode_cursor(last_event_id)
+            except InvalidCursor:
+                after = None
+                logger.warning(f"Ignoring invalid Last-Event-ID for user {user_id}")
+
+            if after is not None:
+                backlog = await notifications_repo.list_after(
+                    user_id, after, limit=settings.NOTIFICATION_STREAM_BACKLOG_LIMIT
+                )
+                for notification in backlog:
+                    replayed.add(str(notification["id"]))
+                    yield _notification_event(notification)
+
+        yield _unread_count_event(await notifications_repo.count_unread(user_id))
+
+        while True:
+            try:
+                payload = await subscription.receive(settings.NOTIFICATION_STREAM_HEARTBEAT_SECONDS)
+            except StopAsyncIteration:
+                # Dropped for falling behind; the client reconnects with Last-Event-ID
+                return
+
+            if payload is None:
+                yield ": heartbeat\n\n"
+                continue
+
+            event = json.loads(payload)
+            if event["type"] == "notification":
+                notification = event["notification"]
+                if str(notification["id"]) in replayed:
+                    continue
+                yield _notification_event(notification)
+                yield _unread_count_event(await notifications_repo.count_unread(user_id))
+            elif event["type"] == "unread_count":
+                yield _unread_count_event(event["unread_count"])
@@ -0,0 +1,176 @@
+"""
+Buffered bulk writer for notifications.
+
+High-volume events (new messages, progress updates) hand their notifications to
+``notification_writer`` instead of inserting them one by one on the request path.
+The writer buffers records and flushes them as a single multi-row insert as soon
+as ``NOTIFICATION_FLUSH_MAX_ROWS`` are waiting or ``NOTIFICATION_FLUSH_INTERVAL_MS``
+has passed since the first buffered record, whichever comes first.
+
+Buffer size, written and failed counts, batch sizes and flush times are exported
+on /metrics.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from ..core.config import get_settings
+from ..core.metrics import CallbackMetric, notification_writer_batch_size, notification_writer_flush_duration_seconds, registry
+from ..repositories import notifications as notifications_repo
+from .realtime import publish_notifications
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Queued by stop() to make the flush loop write what is left and exit
+_STOP = object()
+
+
+class NotificationWriter:
+    """
+    Buffers notification records and writes them in batches from a background task
+
+    The buffer is bounded: when it is full, submit() waits for the next flush,
+    which slows producers down instead of letting memory grow without limit.
+    Records are only dropped when their bulk insert fails; they are counted in
+    ``notifications_failed``.
+    """
+
+    def __init__(self, flush_interval_ms: int = 200, max_batch_size: int = 500, max_buffer_size: int = 10000):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.max_buffer_size = max_buffer_size
+        self._queue: Optional[asyncio.Queue] = None
+        # Set whenever something is queued, so the flush loop can wait for the
+        # next record with a timeout without cancelling a Queue.get()
+        self._added: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.notifications_written = 0
+        self.notifications_failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the background flush task on the running event loop"""
+        if self.running:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.max_buffer_size)
+        self._added = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything still buffered and stop the background task"""
+        if not self.running:
+            return
+
+        await self._put(_STOP)
+        await self._task
+        self._task = None
+
+    async def submit(self, notification: Dict[str, Any]) -> None:
+        """
+        Buffer a notification record for the next flush
+
+        Args:
+            notification: A record built with build_notification
+        """
+        await self._put(notification)
+
+    async def _put(self, item: Any) -> None:
+        await self._queue.put(item)
+        self._added.set()
+
+    @property
+    def buffered(self) -> int:
+        """Records waiting for the next flush"""
+        return self._queue.qsize() if self._queue else 0
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            first = await self._queue.get()
+            if first is _STOP:
+                break
+
+            batch = [first]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.max_batch_size:
+                # Take whatever is already buffered without waiting
+                if not self._queue.empty():
+                    item = self._queue.get_nowait()
+                else:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    # Wait on the event rather than the queue: a timed-out
+                    # Queue.get() can race with a put and drop the record
+                    self._added.clear()
+                    try:
+                        await asyncio.wait_for(self._added.wait(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    continue
+
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+        # Anything submitted after stop() was requested
+        leftover = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                leftover.append(item)
+        for start in range(0, len(leftover), self.max_batch_size):
+            await self._flush(leftover[start:start + self.max_batch_size])
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+
+        try:
+            await notifications_repo.create_many(batch)
+            self.notifications_written += len(batch)
+            publish_notifications(batch)
+        except Exception as e:
+            self.notifications_failed += len(batch)
+            logger.error(f"Error writing {len(batch)} buffered notifications: {str(e)}")
+
+        elapsed = time.perf_counter() - started
+        notification_writer_batch_size.observe(len(batch))
+        notification_writer_flush_duration_seconds.observe(elapsed)
+
+        logger.debug(f"Flushed {len(batch)} notifications in {elapsed * 1000:.1f}ms")
+
+
+settings = get_settings()
+
+notification_writer = NotificationWriter(
+    flush_interval_ms=settings.NOTIFICATION_FLUSH_INTERVAL_MS,
+    max_batch_size=settings.NOTIFICATION_FLUSH_MAX_ROWS,
+    max_buffer_size=settings.NOTIFICATION_BUFFER_MAX_SIZE
+)
+
+registry.register(CallbackMetric(
+    "notification_writer_buffered", "Notifications waiting for the next bulk insert", "gauge",
+    lambda: {(): notification_writer.buffered}
+))
+registry.register(CallbackMetric(
+    "notification_writer_notifications_total", "Notifications handed to the writer, by bulk insert outcome", "counter",
+    lambda: {
+        ("written",): notification_writer.notifications_written,
+        ("failed",): notification_writer.notifications_failed,
+    },
+    ("outcome",)
+))
@@ -1,9 +1,12 @@
 import logging
+import uuid
 from typing import List, Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 from ..core.config import get_settings
-from ..core.supabase import get_supabase_client
+from ..repositories import notifications as notifications_repo
+from .notification_writer import notification_writer
+from .realtime import publish_notifications, publish_unread_count
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -26,6 +29,49 @@ class NotificationType(str, Enum):
     NEW_MESSAGE = "new_message"
 
 
+def build_notification(
+    user_id: str,
+    notification_type: NotificationType,
+    title: str,
+    message: str,
+    related_entity_id: Optional[str] = None,
+    data: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Build a notification record without saving it
+    
+    Args:
+        user_id: The ID of the user to notify
+        notification_type: The type of notification
+        title: The notification title
+        message: The notification message
+        related_entity_id: Optional ID of related entity (partnership, goal, etc.)
+        data: Optional additional data related to the notification
+        
+    Returns:
+        The notification record, ready to insert
+    """
+    # IDs and timestamps are assigned here so buffered records can be pushed to
+    # notification streams with the same event ID they will have in the table
+    notification = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "type": notification_type,
+        "title": title,
+        "message": message,
+        "read": False,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    
+    if related_entity_id:
+        notification["related_entity_id"] = related_entity_id
+        
+    if data:
+        notification["data"] = data
+        
+    return notification
+
+
 async def create_notification(
     user_id: str,
     notification_type: NotificationType,
@@ -49,29 +95,22 @@ async def create_notification(
         The created notification record
     """
     try:
-        supabase = get_supabase_client()
+        notification = build_notification(
+            user_id,
+            notification_type,
+            title,
+            message,
+            related_entity_id=related_entity_id,
+            data=data
+        )
         
-        notification = {
-            "user_id": user_id,
-            "type": notification_type,
-            "title": title,
-            "message": message,
-            "read": False,
-            "created_at": datetime.now().isoformat()
-        }
-        
-        if related_entity_id:
-            notification["related_entity_id"] = related_entity_id
-            
-        if data:
-            notification["data"] = data
-            
         # Insert the notification
-        response = supabase.table("notifications").insert(notification).execute()
+        created = await notifications_repo.create(notification)
         
-        if response.data:
+        if created:
             logger.info(f"Notification created for user {user_id}: {title}")
-            return response.data[0]
+            publish_notifications([created])
+            return created
         else:
             logger.error(f"Failed to create notification for user {user_id}")
             return None
@@ -81,6 +120,78 @@ async def create_notification(
         return None
 
 
+async def queue_notification(
+    user_id: str,
+    notification_type: NotificationType,
+    title: str,
+    message: str,
+    related_entity_id: Optional[str] = None,
+    data: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Hand a notification to the buffered writer instead of inserting it right away
+    
+    Used for high-volume events. Falls back to a direct insert when the writer
+    is not running (e.g. in scripts).
+    
+    Args:
+        user_id: The ID of the user to notify
+        notification_type: The type of notification
+        title: The notification title
+        message: The notification message
+        related_entity_id: Optional ID of related entity (partnership, goal, etc.)
+        data: Optional additional data related to the notification
+        
+    Returns:
+        The notification record (without database-generated fields when buffered)
+    """
+    if not notification_writer.running:
+        return await create_notification(
+            user_id,
+            notification_type,
+            title,
+            message,
+            related_entity_id=related_entity_id,
+            data=data
+        )
+    
+    notification = build_notification(
+        user_id,
+        notification_type,
+        title,
+        message,
+        related_entity_id=related_entity_id,
+        data=data
+    )
+    
+    await notification_writer.submit(notification)
+    return notification
+
+
+async def create_notifications(notifications: List[Dict[str, Any]]) -> int:
+    """
+    Save many notification records with a single bulk insert
+    
+    Args:
+        notifications: Records built with build_notification
+        
+    Returns:
+        The number of notifications created
+    """
+    try:
+        created = await notifications_repo.create_many(notifications)
+        
+        if created:
+            logger.info(f"Created {created} notifications")
+            publish_notifications(notifications)
+            
+        return created
+        
+    except Exception as e:
+        logger.error(f"Error creating notifications: {str(e)}")
+        return 0
+
+
 async def send_partnership_request_notification(
     recipient_id: str,
     sender_name: str,
@@ -128,15 +239,45 @@ async def send_checkin_reminder_notification(
     Returns:
         The created notification record
     """
-    formatted_time = scheduled_time.strftime("%A, %B %d at %I:%M %p")
-    title = "Upcoming Check-in Reminder"
-    message = f"You have a check-in with {partner_name} scheduled for {formatted_time}."
+    reminder = build_checkin_reminder_notification(user_id, checkin_id, partner_name, scheduled_time)
     
     return await create_notification(
         user_id=user_id,
         notification_type=NotificationType.CHECKIN_REMINDER,
-        title=title,
-        message=message,
+        title=reminder["title"],
+        message=reminder["message"],
+        related_entity_id=checkin_id,
+        data=reminder["data"]
+    )
+
+
+def build_checkin_reminder_notification(
+    user_id: str,
+    checkin_id: str,
+    partner_name: str,
+    scheduled_time: datetime
+) -> Dict[str, Any]:
+    """
+    Build the reminder for an upcoming check-in without saving it
+    
+    Args:
+        user_id: The ID of the user to notify
+        checkin_id: The ID of the check-in
+        partner_name: The name of the accountability partner
+        scheduled_time: The scheduled time for the check-in, in the user's time zone
+        
+    Returns:
+        The notification record, ready to insert
+    """
+    formatted_time = scheduled_time.strftime("%A, %B %d at %I:%M %p")
+    title = "Upcoming Check-in Reminder"
+    message = f"You have a check-in with {partner_name} scheduled for {formatted_time}."
+    
+    return build_notification(
+        user_id,
+        NotificationType.CHECKIN_REMINDER,
+        title,
+        message,
         related_entity_id=checkin_id,
         data={"partner_name": partner_name, "scheduled_time": scheduled_time.isoformat()}
     )
@@ -179,7 +320,7 @@ async def send_goal_update_notification(
         title = "Goal Update"
         message = f"{user_name} made changes to their goal: {goal_title}"
     
-    return await create_notification(
+    return await queue_notification(
         user_id=recipient_id,
         notification_type=notification_type,
         title=title,
@@ -214,7 +355,7 @@ async def send_progress_update_notification(
     title = "New Progress Update"
     message = f"{user_name} added a progress update to their goal: {goal_title}"
     
-    return await create_notification(
+    return await queue_notification(
         user_id=recipient_id,
         notification_type=NotificationType.PROGRESS_UPDATE,
         title=title,
@@ -257,7 +398,7 @@ async def send_new_message_notification(
     
     message = f"{sender_name}: {message_preview}"
     
-    return await create_notification(
+    return await queue_notification(
         user_id=recipient_id,
         notification_type=NotificationType.NEW_MESSAGE,
         title=title,
@@ -267,6 +408,16 @@ async def send_new_message_notification(
     )
 
 
+async def refresh_unread_count(user_id: str) -> None:
+    """
+    Push a user's current unread count to their open notification streams
+    
+    Args:
+        user_id: The ID of the user
+    """
+    publish_unread_count(user_id, await get_unread_notification_count(user_id))
+
+
 async def mark_notification_read(notification_id: str) -> bool:
     """
     Mark a notification as read
@@ -278,13 +429,7 @@ async def mark_notification_read(notification_id: str) -> bool:
         True if successful, False otherwise
     """
     try:
-        supabase = get_supabase_client()
-        
-        response = supabase.table("notifications").update(
-            {"read": True}
-        ).eq("id", notification_id).execute()
-        
-        return bool(response.data)
+        return await notifications_repo.mark_read(notification_id)
         
     except Exception as e:
         logger.error(f"Error marking notification as read: {str(e)}")
@@ -302,11 +447,8 @@ async def mark_all_notifications_read(user_id: str) -> bool:
         True if successful, False otherwise
     """
     try:
-        supabase = get_supabase_client()
-        
-        response = supabase.table("notifications").update(
-            {"read": True}
-        ).eq("user_id", user_id).eq("read", False).execute()
+        await notifications_repo.mark_all_read(user_id)
+        publish_unread_count(user_id, 0)
         
         return True
         
@@ -328,19 +470,30 @@ async def get_user_notifications(user_id: str, limit: int = 20, unread_only: boo
         List of notification records
     """
     try:
-        supabase = get_supabase_client()
+        return await notifications_repo.list_for_user(
+            user_id,
+            limit=limit,
+            unread_only=unread_only
+        )
         
-        query = supabase.table("notifications").select("*").eq("user_id", user_id)
-        
-        if unread_only:
-            query = query.eq("read", False)
-            
-        query = query.order("created_at", desc=True).limit(limit)
-        
-        response = query.execute()
+    except Exception as e:
+        logger.error(f"Error getting user notifications: {str(e)}")
+        return []
+
+
+async def get_unread_notification_count(user_id: str) -> int:
+    """
+    Get the number of unread notifications for a user
+    
+    Args:
+        user_id: The ID of the user
         
-        return response.data if response.data else []
+    Returns:
+        The number of unread notifications
+    """
+    try:
+        return await notifications_repo.count_unread(user_id)
         
     except Exception as e:
-        logger.error(f"Error getting user notifications: {str(e)}")
-        return [] 
\ No newline at end of file
+        logger.error(f"Error getting unread notification count: {str(e)}")
+        return 0
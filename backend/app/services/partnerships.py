@@ -0,0 +1,184 @@
+import logging
+from typing import Any, Dict, Optional
+from fastapi import Depends, HTTPException, status
+from ..core.cache import TTLCache
+from ..core.config import get_settings
+from ..core.response_cache import response_cache
+from ..models.user import User
+from ..repositories import partnerships as partnerships_repo
+from .auth import get_current_user
+
+# Configure logging
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Partnership ID -> status for every partnership a user belongs to, keyed by user ID
+_membership_cache = TTLCache(
+    max_size=settings.MEMBERSHIP_CACHE_MAX_SIZE,
+    ttl=settings.MEMBERSHIP_CACHE_TTL_SECONDS
+)
+
+
+async def get_user_partnership_statuses(user_id: str) -> Dict[str, str]:
+    """
+    Get the IDs and statuses of all partnerships a user is a member of
+    
+    Args:
+        user_id: The ID of the user
+        
+    Returns:
+        Mapping of partnership ID to partnership status
+    """
+    user_id = str(user_id)
+    memberships = _membership_cache.get(user_id)
+    
+    if memberships is None:
+        memberships = await _load_memberships(user_id)
+        _membership_cache.set(user_id, memberships)
+    
+    return memberships
+
+
+async def _load_memberships(user_id: str) -> Dict[str, str]:
+    partnerships = await partnerships_repo.list_for_user(user_id, columns="id,status")
+    return {p["id"]: p["status"] for p in partnerships}
+
+
+async def is_partnership_member(user_id: str, partnership_id: str) -> bool:
+    """
+    Check whether a user belongs to a partnership without a database round trip
+    when their memberships are already cached
+    
+    Args:
+        user_id: The ID of the user
+        partnership_id: The ID of the partnership
+        
+    Returns:
+        True if the user is one of the partnership's members
+    """
+    user_id = str(user_id)
+    partnership_id = str(partnership_id)
+    
+    memberships = _membership_cache.get(user_id)
+    if memberships is None:
+        return partnership_id in await get_user_partnership_statuses(user_id)
+    if partnership_id in memberships:
+        return True
+    
+    # Possibly a partnership created by another worker that is not in our cached
+    # set yet: confirm against the database before rejecting. The cached entry is
+    # only replaced when the memberships actually changed, so requests for
+    # partnerships the user is not in do not keep resetting it
+    current = await _load_memberships(user_id)
+    if current != memberships:
+        _membership_cache.set(user_id, current)
+    return partnership_id in current
+
+
+def invalidate_partnership_membership(*user_ids: str) -> None:
+    """
+    Forget cached memberships for the given users
+    
+    Must be called whenever a partnership involving them is created or changes status.
+    """
+    for user_id in user_ids:
+        if user_id:
+            _membership_cache.delete(str(user_id))
+
+
+def invalidate_partnership(partnership: Dict) -> None:
+    """Forget cached memberships for both members of a partnership record"""
+    invalidate_partnership_membership(partnership.get("user1_id"), partnership.get("user2_id"))
+
+
+def _partnership_tag(partnership_id: str) -> str:
+    return f"partnership:{partnership_id}"
+
+
+async def get_partnership_details(partnership_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a partnership with both members' profiles, if the user is a member
+    
+    Served from the response cache; the result is shared and must not be modified.
+    
+    Args:
+        partnership_id: The ID of the partnership
+        user_id: The ID of the requesting user
+        
+    Returns:
+        The partnership record with embedded users, or None if not found
+    """
+    return await response_cache.get_or_load(
+        f"partnership:{partnership_id}:user:{user_id}",
+        [_partnership_tag(partnership_id)],
+        lambda: partnerships_repo.get_for_member(partnership_id, str(user_id), with_users=True)
+    )
+
+
+async def get_partner_id(partnership_id: str, user_id: str) -> Optional[str]:
+    """
+    Get the other member of a partnership, from the cached partnership details
+    
+    Args:
+        partnership_id: The ID of the partnership
+        user_id: The ID of the member asking
+        
+    Returns:
+        The partner's user ID, or None if there is none yet or the user is not a member
+    """
+    partnership = await get_partnership_details(partnership_id, user_id)
+    return partnerships_repo.partner_id(partnership, user_id)
+
+
+async def get_agreement(partnership_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a partnership's agreement; callers must check membership first
+    
+    Served from the response cache; the result is shared and must not be modified.
+    
+    Args:
+        partnership_id: The ID of the partnership
+        
+    Returns:
+        The agreement record, or None if there is none
+    """
+    return await response_cache.get_or_load(
+        f"agreement:{partnership_id}",
+        [_partnership_tag(partnership_id)],
+        lambda: partnerships_repo.get_agreement(partnership_id)
+    )
+
+
+async def invalidate_partnership_details(*partnership_ids: str) -> None:
+    """
+    Drop cached partnership details and agreements
+    
+    Must be called whenever a partnership, its agreement or a member's profile changes.
+    """
+    await response_cache.invalidate(*(_partnership_tag(pid) for pid in partnership_ids if pid))
+
+
+async def invalidate_user_partnership_details(user_id: str) -> None:
+    """Drop cached details of every partnership embedding the user's profile"""
+    memberships = await get_user_partnership_statuses(user_id)
+    await invalidate_partnership_details(*memberships)
+
+
+async def require_partnership_member(
+    partnership_id: str,
+    current_user: User = Depends(get_current_user)
+) -> str:
+    """
+    Dependency ensuring the current user is a member of the partnership
+    referenced by the `partnership_id` path or query parameter
+    
+    Returns:
+        The partnership ID
+    """
+    if not await is_partnership_member(str(current_user.id), partnership_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Partnership not found"
+        )
+    
+    return partnership_id
@@ -0,0 +1,210 @@
+"""
+In-process publish/subscribe hub for real-time pushes.
+
+Producers (e.g. the message routes) publish events to a topic such as
+``partnership:<id>``; every connection subscribed to that topic receives them.
+Events are serialized once per publish, not once per subscriber. Each
+subscriber has a bounded queue, and a subscriber that falls too far behind is
+dropped rather than slowing down publishers or growing memory.
+
+Events travel through a broker (see ``realtime_broker``) so that, with several
+workers, a subscriber connected to one process receives events published in
+another.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from ..core.config import get_settings
+from .realtime_broker import Broker, InProcessBroker, create_broker
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    A subscriber's queue of serialized events for one topic
+
+    Iterate with ``async for`` to receive events; iteration ends when the
+    subscription is closed (by unsubscribe or because it overflowed). To wait
+    with a timeout, use ``receive`` rather than ``wait_for`` on ``__anext__``,
+    whose cancellation can lose an event.
+    """
+
+    def __init__(self, hub: "PubSubHub", topic: str, max_queue_size: int):
+        self.hub = hub
+        self.topic = topic
+        self.overflowed = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size + 1)
+        self._max_queue_size = max_queue_size
+        self._closed = False
+        # Set whenever the queue gets an item, so receive() can wait without a cancellable get
+        self._ready = asyncio.Event()
+
+    def _deliver(self, payload: str) -> None:
+        if self._closed:
+            return
+        if self._queue.qsize() >= self._max_queue_size:
+            # Too slow to keep up: cut it off instead of buffering without limit
+            self.overflowed = True
+            self.close()
+            return
+        self._queue.put_nowait(payload)
+        self._ready.set()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        # The extra slot guarantees room for the end marker
+        self._queue.put_nowait(None)
+        self._ready.set()
+        self.hub._remove(self)
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> str:
+        payload = await self._queue.get()
+        if payload is None:
+            raise StopAsyncIteration
+        return payload
+
+    async def receive(self, timeout: float) -> Optional[str]:
+        """
+        Wait up to `timeout` seconds for the next event
+
+        Returns:
+            The event, or None if none arrived in time
+
+        Raises:
+            StopAsyncIteration: If the subscription was closed
+        """
+        if self._queue.empty():
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+        payload = self._queue.get_nowait()
+        if payload is None:
+            raise StopAsyncIteration
+        return payload
+
+    async def __aenter__(self) -> "Subscription":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+
+class PubSubHub:
+    """Fans events out to the subscribers of each topic, across workers via a broker"""
+
+    def __init__(self, max_queue_size: int = 100, broker: Optional[Broker] = None):
+        self.max_queue_size = max_queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self.broker = broker or InProcessBroker()
+        self.broker.bind(self._deliver_local)
+
+        # Metrics
+        self.events_published = 0
+        self.events_delivered = 0
+        self.subscribers_dropped = 0
+
+    async def start(self) -> None:
+        """Connect the broker to the other workers"""
+        await self.broker.start()
+
+    async def stop(self) -> None:
+        """Disconnect the broker"""
+        await self.broker.stop()
+
+    def subscribe(self, topic: str) -> Subscription:
+        """Start receiving the events published to a topic"""
+        subscription = Subscription(self, topic, self.max_queue_size)
+        self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def publish(self, topic: str, event: Dict[str, Any]) -> None:
+        """
+        Send an event to every current subscriber of a topic, in any worker
+
+        Args:
+            topic: The topic to publish to
+            event: A JSON-serializable event
+        """
+        self.events_published += 1
+
+        # Nobody to deliver to; skip serializing
+        if self.broker.local_only and topic not in self._subscribers:
+            return
+
+        self.broker.publish(topic, json.dumps(event, default=str))
+
+    def _deliver_local(self, topic: str, payload: str) -> int:
+        subscribers = self._subscribers.get(topic)
+        if not subscribers:
+            return 0
+
+        delivered = 0
+        for subscription in list(subscribers):
+            subscription._deliver(payload)
+            if subscription.overflowed:
+                self.subscribers_dropped += 1
+                logger.warning(f"Dropped slow subscriber on {topic}")
+            else:
+                delivered += 1
+
+        self.events_delivered += delivered
+        return delivered
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        """Number of subscribers to one topic, or to all topics"""
+        if topic is not None:
+            return len(self._subscribers.get(topic, ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _remove(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.topic)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.topic]
+
+
+def partnership_topic(partnership_id: str) -> str:
+    """Topic carrying real-time events for one partnership"""
+    return f"partnership:{partnership_id}"
+
+
+def notification_topic(user_id: str) -> str:
+    """Topic carrying a user's new notifications and unread count changes"""
+    return f"notifications:{user_id}"
+
+
+def publish_notifications(notifications: List[Dict[str, Any]]) -> None:
+    """Push stored notification records to their recipients' open streams"""
+    for notification in notifications:
+        hub.publish(notification_topic(notification["user_id"]), {
+            "type": "notification",
+            "notification": notification,
+        })
+
+
+def publish_unread_count(user_id: str, unread_count: int) -> None:
+    """Tell a user's open streams that their unread count changed"""
+    hub.publish(notification_topic(user_id), {
+        "type": "unread_count",
+        "unread_count": unread_count,
+    })
+
+
+hub = PubSubHub(
+    max_queue_size=get_settings().REALTIME_SUBSCRIBER_QUEUE_SIZE,
+    broker=create_broker()
+)
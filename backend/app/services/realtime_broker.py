@@ -0,0 +1,243 @@
+"""
+Brokers that carry real-time events between processes.
+
+The hub in ``realtime`` hands every published event to a broker, and the broker
+calls the hub back for each event that should reach local subscribers,
+including events published by other worker processes. ``REALTIME_BROKER``
+selects the implementation:
+
+- ``memory``: single process; events never leave the worker
+- ``unix``: the uvicorn workers on one machine share events over a Unix socket.
+  One worker, elected with an exclusive lock on ``<socket>.lock``, runs a small
+  relay on the socket; the others connect to it as clients. If the relay worker
+  exits, its lock is released and another worker takes over.
+
+Delivery is best effort. Events published while a worker is disconnected from
+the relay are not replayed; clients catch up over the regular endpoints
+(e.g. the notification stream's Last-Event-ID resume).
+"""
+import asyncio
+import fcntl
+import logging
+import os
+from typing import Callable, Optional, Set
+
+from ..core.config import get_settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Called with (topic, serialized event) for every event local subscribers should see
+DeliverCallback = Callable[[str, str], None]
+
+
+class Broker:
+    """Base class for real-time event brokers"""
+
+    # True when every event is delivered in this process only
+    local_only = True
+
+    def __init__(self):
+        self._deliver: Optional[DeliverCallback] = None
+
+    def bind(self, deliver: DeliverCallback) -> None:
+        """Set the callback that hands events to local subscribers"""
+        self._deliver = deliver
+
+    def publish(self, topic: str, payload: str) -> None:
+        """Deliver an event locally and to the other workers"""
+        raise NotImplementedError
+
+    async def start(self) -> None:
+        """Open any connections to other workers"""
+
+    async def stop(self) -> None:
+        """Close connections to other workers"""
+
+
+class InProcessBroker(Broker):
+    """Delivers events to subscribers in this process only"""
+
+    def publish(self, topic: str, payload: str) -> None:
+        if self._deliver is not None:
+            self._deliver(topic, payload)
+
+
+class UnixSocketBroker(Broker):
+    """
+    Shares events between the workers on one host through a relay on a Unix socket
+
+    Frames are ``<topic>\\t<payload>\\n``; topics never contain tabs and payloads
+    are compact JSON without raw newlines. A connection whose unsent data
+    exceeds `max_buffer_bytes` is dropped so one stalled worker cannot make the
+    relay buffer without limit; it reconnects on its own.
+    """
+
+    local_only = False
+
+    def __init__(self, path: str, reconnect_delay: float = 0.5, max_buffer_bytes: int = 4 * 1024 * 1024):
+        super().__init__()
+        self.path = path
+        self.reconnect_delay = reconnect_delay
+        self.max_buffer_bytes = max_buffer_bytes
+        self._task: Optional[asyncio.Task] = None
+        self._lock_fd: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Set[asyncio.StreamWriter] = set()
+        self._relay_writer: Optional[asyncio.StreamWriter] = None
+
+        # Metrics
+        self.frames_sent = 0
+        self.frames_received = 0
+        self.frames_dropped = 0
+
+    @property
+    def is_relay(self) -> bool:
+        return self._server is not None
+
+    def publish(self, topic: str, payload: str) -> None:
+        if self._deliver is not None:
+            self._deliver(topic, payload)
+
+        frame = f"{topic}\t{payload}\n".encode()
+        if self.is_relay:
+            self._broadcast(frame)
+        elif self._relay_writer is not None:
+            self._write(self._relay_writer, frame)
+        else:
+            # Between relays; other workers miss this event
+            self.frames_dropped += 1
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                try:
+                    if self._acquire_relay_lock():
+                        await self._serve()
+                    else:
+                        await self._follow()
+                except OSError as e:
+                    logger.debug(f"Real-time broker connection failed: {e}")
+                await asyncio.sleep(self.reconnect_delay)
+        finally:
+            await self._shutdown()
+
+    def _acquire_relay_lock(self) -> bool:
+        if self._lock_fd is not None:
+            return True
+
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    async def _serve(self) -> None:
+        """Run the relay until cancelled"""
+        # Holding the lock means any existing socket file belongs to a dead relay
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        self._server = await asyncio.start_unix_server(self._handle_worker, path=self.path, limit=self.max_buffer_bytes)
+        logger.info(f"Real-time relay listening on {self.path}")
+        await self._server.serve_forever()
+
+    async def _handle_worker(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._clients.add(writer)
+        try:
+            while True:
+                frame = await reader.readline()
+                if not frame:
+                    break
+                self._receive(frame)
+                self._broadcast(frame, exclude=writer)
+        except (OSError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def _follow(self) -> None:
+        """Connect to the relay and deliver its events until the connection drops"""
+        reader, writer = await asyncio.open_unix_connection(self.path, limit=self.max_buffer_bytes)
+        self._relay_writer = writer
+        try:
+            while True:
+                frame = await reader.readline()
+                if not frame:
+                    break
+                self._receive(frame)
+        except (OSError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self._relay_writer = None
+            writer.close()
+
+    def _receive(self, frame: bytes) -> None:
+        self.frames_received += 1
+        topic, _, payload = frame.decode().rstrip("\n").partition("\t")
+        if self._deliver is not None and payload:
+            self._deliver(topic, payload)
+
+    def _broadcast(self, frame: bytes, exclude: Optional[asyncio.StreamWriter] = None) -> None:
+        for writer in list(self._clients):
+            if writer is not exclude:
+                self._write(writer, frame)
+
+    def _write(self, writer: asyncio.StreamWriter, frame: bytes) -> None:
+        if writer.is_closing():
+            return
+        if writer.transport.get_write_buffer_size() > self.max_buffer_bytes:
+            logger.warning("Dropping real-time broker connection that stopped reading")
+            self._clients.discard(writer)
+            writer.close()
+            return
+        writer.write(frame)
+        self.frames_sent += 1
+
+    async def _shutdown(self) -> None:
+        if self._relay_writer is not None:
+            self._relay_writer.close()
+            self._relay_writer = None
+
+        for writer in list(self._clients):
+            writer.close()
+        self._clients.clear()
+
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+
+def create_broker() -> Broker:
+    """Build the broker selected by REALTIME_BROKER"""
+    settings = get_settings()
+
+    if settings.REALTIME_BROKER == "memory":
+        return InProcessBroker()
+    if settings.REALTIME_BROKER == "unix":
+        return UnixSocketBroker(settings.REALTIME_BROKER_SOCKET)
+
+    raise ValueError(f"Unknown REALTIME_BROKER: {settings.REALTIME_BROKER}")
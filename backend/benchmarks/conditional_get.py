@@ -0,0 +1,108 @@
+"""
+Repeated polling of GET /api/goals with and without If-None-Match.
+
+The app runs in-process behind httpx's ASGI transport with Supabase answered
+by a mock that returns `--rows` goals, so the numbers isolate the API's own
+work: validating and serializing the payload for a 200 versus hashing row
+versions for a 304. Real polls also pay the database round trip either way.
+
+Run from the backend directory (settings are read from the environment / .env):
+
+    python -m benchmarks.conditional_get [--rows 100] [--polls 500]
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+
+from app.core import database
+from app.main import app
+from app.models.user import User
+from app.services.auth import get_current_user
+
+USER_ID = str(uuid.uuid4())
+
+
+def make_goals(count: int):
+    now = datetime.now(timezone.utc).isoformat()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": USER_ID,
+            "partnership_id": str(uuid.uuid4()),
+            "title": f"Goal {i}",
+            "description": "Run three times a week and log every session " * 3,
+            "status": "active",
+            "start_date": now,
+            "target_date": None,
+            "progress_update_count": i,
+            "latest_progress_value": 42.5,
+            "progress_value_sum": 100,
+            "max_progress_value": 50,
+            "last_update_at": now,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+async def poll(client: httpx.AsyncClient, polls: int, conditional: bool):
+    headers = {}
+    if conditional:
+        first = await client.get("/api/goals")
+        headers["If-None-Match"] = first.headers["etag"]
+
+    statuses = set()
+    received = 0
+    started = time.perf_counter()
+    for _ in range(polls):
+        response = await client.get("/api/goals", headers=headers)
+        statuses.add(response.status_code)
+        received += len(response.content)
+    elapsed = time.perf_counter() - started
+
+    return elapsed, received, statuses
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--polls", type=int, default=500)
+    args = parser.parse_args()
+
+    # Serialized once so the mock itself costs next to nothing per poll
+    body = json.dumps(make_goals(args.rows)).encode()
+    database._http_client = httpx.AsyncClient(
+        base_url="http://supabase.test",
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, content=body, headers={"Content-Type": "application/json"})
+        )
+    )
+
+    now = datetime.now(timezone.utc)
+    user = User(
+        id=USER_ID, email="bench@example.com", first_name="Bench", last_name="User",
+        time_zone="UTC", created_at=now, updated_at=now
+    )
+    app.dependency_overrides[get_current_user] = lambda: user
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api.test") as client:
+        # Warm up
+        await poll(client, 20, conditional=False)
+
+        for label, conditional in (("full 200 responses", False), ("If-None-Match (304)", True)):
+            elapsed, received, statuses = await poll(client, args.polls, conditional)
+            print(
+                f"{label:<22} {elapsed * 1000 / args.polls:7.3f} ms/poll  "
+                f"{received / args.polls:9.0f} bytes/poll  status {sorted(statuses)}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+"""
+Per-email render cost of the precompiled templates against the f-string they replaced.
+
+Run from the backend directory (settings are read from the environment / .env):
+
+    python -m benchmarks.email_templates [--emails 10000]
+"""
+import argparse
+import html
+import time
+
+from app.core.config import get_settings
+from app.services.email_templates import PARTNERSHIP_INVITATION, compile_templates
+
+
+def legacy_invitation(to_email: str, inviter_name: str, invitation_token: str, message: str = ""):
+    """The HTML-only f-string previously built in send_partnership_invitation_email"""
+    settings = get_settings()
+    invitation_link = f"{settings.FRONTEND_URL}/register?invitation={invitation_token}"
+    
+    subject = f"{inviter_name} wants to be your accountability partner on {settings.APP_NAME}"
+    
+    html_content = f"""
+    <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+        <h2 style="color: #333;">You've been invited to {settings.APP_NAME}!</h2>
+        <p>{inviter_name} wants you to be their accountability partner to help them achieve their goals.</p>
+        
+        {f'<div style="padding: 15px; border-left: 3px solid #ddd; margin: 20px 0;"><p><em>"{message}"</em></p></div>' if message else ''}
+        
+        <p>What is {settings.APP_NAME}?</p>
+        <p>{settings.APP_NAME} helps people achieve their goals by pairing them with accountability partners who can provide support, motivation, and regular check-ins.</p>
+        
+        <div style="text-align: center; margin: 30px 0;">
+            <a href="{invitation_link}" style="background-color: #4f46e5; color: white; padding: 12px 20px; text-decoration: none; border-radius: 4px; font-weight: bold;">
+                Join {settings.APP_NAME}
+            </a>
+        </div>
+        
+        <p style="font-size: 0.9em; color: #666;">If you don't want to join, you can ignore this email. The invitation will expire in 7 days.</p>
+    </div>
+    """
+    return to_email, subject, html_content
+
+
+def legacy_invitation_multipart(to_email: str, inviter_name: str, invitation_token: str, message: str = ""):
+    """The same f-string with the escaping and plain-text part the templates add"""
+    settings = get_settings()
+    to_email, subject, html_content = legacy_invitation(
+        to_email, html.escape(inviter_name), html.escape(invitation_token), html.escape(message)
+    )
+    quote = f'\n"{message}"\n' if message else ""
+    text_content = f"""You've been invited to {settings.APP_NAME}!
+
+{inviter_name} wants you to be their accountability partner to help them achieve their goals.
+{quote}
+{settings.APP_NAME} helps people achieve their goals by pairing them with accountability partners who can provide support, motivation, and regular check-ins.
+
+Join {settings.APP_NAME}: {settings.FRONTEND_URL}/register?invitation={invitation_token}
+
+If you don't want to join, you can ignore this email. The invitation will expire in 7 days.
+"""
+    return to_email, subject, html_content, text_content
+
+
+def report(label: str, seconds: float, count: int) -> None:
+    print(f"{label:<40} {seconds * 1e6 / count:8.2f} us/email  ({count} emails in {seconds * 1000:.1f} ms)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--emails", type=int, default=10000)
+    args = parser.parse_args()
+
+    recipients = [
+        (f"user{i}@example.com", {
+            "inviter_name": f"Inviter {i}",
+            "invitation_token": f"token-{i:08d}",
+            "message": "Let's keep each other on track!" if i % 2 else "",
+        })
+        for i in range(args.emails)
+    ]
+
+    started = time.perf_counter()
+    compile_templates()
+    print(f"compile_templates: {(time.perf_counter() - started) * 1000:.2f} ms (once per process)")
+
+    # Every variant keeps its results so they pay the same allocation / GC cost
+    started = time.perf_counter()
+    rendered = [legacy_invitation(to_email, **context) for to_email, context in recipients]
+    report("legacy f-string (HTML only, unescaped)", time.perf_counter() - started, args.emails)
+
+    started = time.perf_counter()
+    rendered = [legacy_invitation_multipart(to_email, **context) for to_email, context in recipients]
+    report("legacy f-string (escaped HTML + text)", time.perf_counter() - started, args.emails)
+
+    started = time.perf_counter()
+    rendered = [PARTNERSHIP_INVITATION.render(to_email, context) for to_email, context in recipients]
+    report("compiled template, render", time.perf_counter() - started, args.emails)
+
+    del rendered
+    started = time.perf_counter()
+    rendered = PARTNERSHIP_INVITATION.render_many(recipients)
+    report("compiled template, render_many", time.perf_counter() - started, args.emails)
+
+
+if __name__ == "__main__":
+    main()
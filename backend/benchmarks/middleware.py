@@ -0,0 +1,107 @@
+"""
+Requests per second on GET /health through the app's middleware stack.
+
+Compares the previous pair of BaseHTTPMiddleware classes (error handling and
+request logging, reproduced below) with the single pure ASGI RequestMiddleware.
+Both variants run the real app, including CORS, behind httpx's ASGI transport,
+with `--concurrency` clients issuing requests back to back. Request logging is
+silenced unless `--log` is given so the numbers measure the middleware rather
+than the log handler.
+
+Run from the backend directory (settings are read from the environment / .env):
+
+    python -m benchmarks.middleware [--requests 5000] [--concurrency 10] [--log]
+"""
+import argparse
+import asyncio
+import logging
+import time
+import traceback
+from typing import Callable
+
+import httpx
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.middleware import RequestMiddleware
+from app.main import app
+
+logger = logging.getLogger("app.core.middleware")
+
+
+class LegacyErrorHandlerMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: Callable):
+        try:
+            return await call_next(request)
+        except Exception as e:
+            logger.error(f"Unhandled exception: {str(e)}")
+            logger.error(traceback.format_exc())
+            return JSONResponse(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                content={"error": "Internal Server Error", "detail": str(e), "path": request.url.path}
+            )
+
+
+class LegacyRequestLoggingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: Callable):
+        start_time = time.time()
+        logger.info(f"Request started: {request.method} {request.url.path}")
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        response.headers["X-Process-Time"] = str(process_time)
+        logger.info(f"Request completed: {request.method} {request.url.path} - Status: {response.status_code} - Time: {process_time:.3f}s")
+        return response
+
+
+def use_middleware(*classes) -> None:
+    """Swap the app's own middleware for `classes`, keeping CORS outermost"""
+    others = [m for m in app.user_middleware if m.cls is not RequestMiddleware and m.cls.__module__ != __name__]
+    # user_middleware lists the outermost middleware first
+    app.user_middleware = others + [Middleware(cls) for cls in reversed(classes)]
+    app.middleware_stack = None
+
+
+async def run(requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api.test") as client:
+        async def worker(count: int) -> None:
+            for _ in range(count):
+                response = await client.get("/health")
+                assert response.status_code == 200 and "x-process-time" in response.headers
+
+        # Warm up
+        await worker(50)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+        return (requests // concurrency) * concurrency / (time.perf_counter() - started)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--log", action="store_true", help="keep per-request INFO logging")
+    args = parser.parse_args()
+
+    if not args.log:
+        logger.setLevel(logging.WARNING)
+
+    variants = (
+        ("BaseHTTPMiddleware x2", (LegacyErrorHandlerMiddleware, LegacyRequestLoggingMiddleware)),
+        ("pure ASGI", (RequestMiddleware,)),
+    )
+    results = {}
+    for label, classes in variants:
+        use_middleware(*classes)
+        results[label] = await run(args.requests, args.concurrency)
+        print(f"{label:<22} {results[label]:8.0f} req/s")
+
+    before, after = (results[label] for label, _ in variants)
+    print(f"{'speedup':<22} {after / before:8.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
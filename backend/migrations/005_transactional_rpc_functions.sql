@@ -0,0 +1,145 @@
+-- Multi-step write flows as single transactional functions, called through PostgREST rpc()
+-- Each call is one round trip and either fully applies or fully rolls back
+
+-- Create a user profile and, when registering through an invitation, accept it,
+-- attach the new user to the inviter's pending partnership and store the invited agreement
+CREATE OR REPLACE FUNCTION register_user_profile(
+  p_user_id UUID,
+  p_email TEXT,
+  p_first_name TEXT,
+  p_last_name TEXT,
+  p_time_zone TEXT,
+  p_avatar_url TEXT DEFAULT NULL,
+  p_invitation_token TEXT DEFAULT NULL
+)
+RETURNS users
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  new_user users;
+  invitation pending_invitations;
+  pending_partnership_id UUID;
+BEGIN
+  INSERT INTO users (id, email, first_name, last_name, time_zone, avatar_url)
+  VALUES (p_user_id, p_email, p_first_name, p_last_name, p_time_zone, p_avatar_url)
+  RETURNING * INTO new_user;
+
+  IF p_invitation_token IS NULL THEN
+    RETURN new_user;
+  END IF;
+
+  -- Claim the invitation; the status filter makes concurrent registrations with the same token safe
+  UPDATE pending_invitations
+  SET status = 'accepted', updated_at = NOW()
+  WHERE invitation_token = p_invitation_token
+    AND status = 'pending'
+  RETURNING * INTO invitation;
+
+  IF NOT FOUND THEN
+    RETURN new_user;
+  END IF;
+
+  UPDATE partnerships
+  SET user2_id = new_user.id, is_user_exists = TRUE, updated_at = NOW()
+  WHERE id = (
+    SELECT id FROM partnerships
+    WHERE user1_id = invitation.inviter_id
+      AND is_user_exists = FALSE
+    LIMIT 1
+    FOR UPDATE
+  )
+  RETURNING id INTO pending_partnership_id;
+
+  IF pending_partnership_id IS NOT NULL AND invitation.agreement IS NOT NULL THEN
+    INSERT INTO partnership_agreements (
+      partnership_id,
+      communication_frequency,
+      check_in_days,
+      expectations,
+      commitment_level,
+      feedback_style,
+      created_by,
+      updated_by
+    )
+    VALUES (
+      pending_partnership_id,
+      invitation.agreement->>'communication_frequency',
+      ARRAY(SELECT jsonb_array_elements_text(COALESCE(invitation.agreement->'check_in_days', '[]'::jsonb))),
+      invitation.agreement->>'expectations',
+      invitation.agreement->>'commitment_level',
+      invitation.agreement->>'feedback_style',
+      invitation.inviter_id,
+      new_user.id
+    );
+  END IF;
+
+  RETURN new_user;
+END;
+$$;
+
+-- Create a pending partnership with an existing user, plus the optional agreement and invitation message
+-- Raises P0002 if no user has the partner email and 23505 if the two users are already partnered
+CREATE OR REPLACE FUNCTION create_partnership_request(
+  p_user_id UUID,
+  p_partner_email TEXT,
+  p_agreement JSONB DEFAULT NULL,
+  p_message TEXT DEFAULT NULL,
+  p_trial_end_date TIMESTAMP WITH TIME ZONE DEFAULT NOW() + INTERVAL '14 days'
+)
+RETURNS partnerships
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  partner_id UUID;
+  new_partnership partnerships;
+BEGIN
+  SELECT id INTO partner_id FROM users WHERE email = p_partner_email;
+
+  IF partner_id IS NULL THEN
+    RAISE EXCEPTION 'User with that email not found' USING ERRCODE = 'P0002';
+  END IF;
+
+  -- Serialize requests between the same pair of users so the duplicate check below cannot race
+  PERFORM pg_advisory_xact_lock(hashtext(LEAST(p_user_id, partner_id)::TEXT || GREATEST(p_user_id, partner_id)::TEXT));
+
+  IF EXISTS (
+    SELECT 1 FROM partnerships
+    WHERE (user1_id = p_user_id AND user2_id = partner_id)
+       OR (user1_id = partner_id AND user2_id = p_user_id)
+  ) THEN
+    RAISE EXCEPTION 'A partnership already exists between these users' USING ERRCODE = '23505';
+  END IF;
+
+  INSERT INTO partnerships (user1_id, user2_id, status, is_user_exists, trial_end_date)
+  VALUES (p_user_id, partner_id, 'pending', TRUE, p_trial_end_date)
+  RETURNING * INTO new_partnership;
+
+  IF p_agreement IS NOT NULL THEN
+    INSERT INTO partnership_agreements (
+      partnership_id,
+      communication_frequency,
+      check_in_days,
+      expectations,
+      commitment_level,
+      feedback_style,
+      created_by
+    )
+    VALUES (
+      new_partnership.id,
+      p_agreement->>'communication_frequency',
+      ARRAY(SELECT jsonb_array_elements_text(COALESCE(p_agreement->'check_in_days', '[]'::jsonb))),
+      p_agreement->>'expectations',
+      p_agreement->>'commitment_level',
+      p_agreement->>'feedback_style',
+      p_user_id
+    );
+  END IF;
+
+  IF p_message IS NOT NULL AND p_message <> '' THEN
+    INSERT INTO messages (partnership_id, sender_id, content, is_invitation_message)
+    VALUES (new_partnership.id, p_user_id, p_message, TRUE);
+  END IF;
+
+  RETURN new_partnership;
+END;
+$$;
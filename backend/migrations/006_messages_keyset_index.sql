@@ -0,0 +1,7 @@
+-- Composite index backing keyset pagination of messages on (created_at, id)
+-- Pages in either direction are a range scan of this index (forwards for older, backwards for newer)
+CREATE INDEX IF NOT EXISTS idx_messages_partnership_created_at
+  ON messages(partnership_id, created_at DESC, id DESC);
+
+-- Superseded by the composite index above, whose leading column serves the same lookups
+DROP INDEX IF EXISTS idx_messages_partnership;
@@ -0,0 +1,177 @@
+-- Unread counters maintained by triggers so badge lookups are a single primary-key read
+
+-- Read markers per (user, partnership), now carrying the user's unread message count
+CREATE TABLE IF NOT EXISTS message_reads (
+  user_id UUID REFERENCES users(id) NOT NULL,
+  partnership_id UUID REFERENCES partnerships(id) NOT NULL,
+  last_read_at TIMESTAMP WITH TIME ZONE,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE message_reads ALTER COLUMN last_read_at DROP NOT NULL;
+ALTER TABLE message_reads ADD COLUMN IF NOT EXISTS unread_count INTEGER NOT NULL DEFAULT 0;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_message_reads_user_partnership ON message_reads(user_id, partnership_id);
+
+ALTER TABLE message_reads ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS message_reads_select_policy ON message_reads;
+CREATE POLICY message_reads_select_policy ON message_reads
+    FOR SELECT
+    USING (auth.uid() = user_id);
+
+-- Per-user unread notification count
+CREATE TABLE IF NOT EXISTS notification_counters (
+  user_id UUID PRIMARY KEY REFERENCES users(id),
+  unread_count INTEGER NOT NULL DEFAULT 0
+);
+
+ALTER TABLE notification_counters ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS notification_counters_select_policy ON notification_counters;
+CREATE POLICY notification_counters_select_policy ON notification_counters
+    FOR SELECT
+    USING (auth.uid() = user_id);
+
+-- Notifications: statement-level triggers so "mark all read" adjusts each counter once
+CREATE OR REPLACE FUNCTION apply_notification_unread_delta()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    INSERT INTO notification_counters (user_id, unread_count)
+    SELECT user_id, COUNT(*) FROM new_rows WHERE NOT COALESCE(read, FALSE) GROUP BY user_id
+    ON CONFLICT (user_id) DO UPDATE
+    SET unread_count = notification_counters.unread_count + EXCLUDED.unread_count;
+  ELSIF TG_OP = 'UPDATE' THEN
+    UPDATE notification_counters c
+    SET unread_count = GREATEST(0, c.unread_count + d.delta)
+    FROM (
+      SELECT user_id, SUM(delta) AS delta FROM (
+        SELECT user_id, CASE WHEN COALESCE(read, FALSE) THEN 0 ELSE 1 END AS delta FROM new_rows
+        UNION ALL
+        SELECT user_id, CASE WHEN COALESCE(read, FALSE) THEN 0 ELSE -1 END FROM old_rows
+      ) changes
+      GROUP BY user_id
+      HAVING SUM(delta) <> 0
+    ) d
+    WHERE c.user_id = d.user_id;
+  ELSIF TG_OP = 'DELETE' THEN
+    UPDATE notification_counters c
+    SET unread_count = GREATEST(0, c.unread_count - d.removed)
+    FROM (
+      SELECT user_id, COUNT(*) AS removed FROM old_rows WHERE NOT COALESCE(read, FALSE) GROUP BY user_id
+    ) d
+    WHERE c.user_id = d.user_id;
+  END IF;
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS notifications_unread_insert ON notifications;
+CREATE TRIGGER notifications_unread_insert
+  AFTER INSERT ON notifications
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION apply_notification_unread_delta();
+
+DROP TRIGGER IF EXISTS notifications_unread_update ON notifications;
+CREATE TRIGGER notifications_unread_update
+  AFTER UPDATE ON notifications
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION apply_notification_unread_delta();
+
+DROP TRIGGER IF EXISTS notifications_unread_delete ON notifications;
+CREATE TRIGGER notifications_unread_delete
+  AFTER DELETE ON notifications
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION apply_notification_unread_delta();
+
+-- Messages: a new message is unread for the partner of its sender
+CREATE OR REPLACE FUNCTION increment_message_unread()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  recipient_id UUID;
+BEGIN
+  SELECT CASE WHEN user1_id = NEW.sender_id THEN user2_id ELSE user1_id END
+  INTO recipient_id
+  FROM partnerships
+  WHERE id = NEW.partnership_id;
+
+  IF recipient_id IS NOT NULL THEN
+    INSERT INTO message_reads (user_id, partnership_id, unread_count)
+    VALUES (recipient_id, NEW.partnership_id, 1)
+    ON CONFLICT (user_id, partnership_id) DO UPDATE
+    SET unread_count = message_reads.unread_count + 1;
+  END IF;
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS messages_unread_insert ON messages;
+CREATE TRIGGER messages_unread_insert
+  AFTER INSERT ON messages
+  FOR EACH ROW EXECUTE FUNCTION increment_message_unread();
+
+-- Moving a read marker recounts only the partner's messages after it,
+-- a short range scan of idx_messages_partnership_created_at.
+-- Markers created by increment_message_unread already hold the right count
+CREATE OR REPLACE FUNCTION recount_message_unread()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP = 'INSERT' AND NEW.last_read_at IS NULL THEN
+    RETURN NEW;
+  END IF;
+
+  IF TG_OP = 'UPDATE' AND NEW.last_read_at IS NOT DISTINCT FROM OLD.last_read_at THEN
+    RETURN NEW;
+  END IF;
+
+  SELECT COUNT(*) INTO NEW.unread_count
+  FROM messages
+  WHERE partnership_id = NEW.partnership_id
+    AND sender_id <> NEW.user_id
+    AND (NEW.last_read_at IS NULL OR created_at > NEW.last_read_at);
+
+  NEW.updated_at := NOW();
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS message_reads_recount ON message_reads;
+CREATE TRIGGER message_reads_recount
+  BEFORE INSERT OR UPDATE OF last_read_at ON message_reads
+  FOR EACH ROW EXECUTE FUNCTION recount_message_unread();
+
+-- Backfill counters for existing data
+INSERT INTO notification_counters (user_id, unread_count)
+SELECT user_id, COUNT(*) FILTER (WHERE NOT COALESCE(read, FALSE)) FROM notifications GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET unread_count = EXCLUDED.unread_count;
+
+INSERT INTO message_reads (user_id, partnership_id)
+SELECT m.member_id, m.partnership_id
+FROM (
+  SELECT id AS partnership_id, user1_id AS member_id FROM partnerships
+  UNION
+  SELECT id, user2_id FROM partnerships WHERE user2_id IS NOT NULL
+) m
+WHERE EXISTS (
+  SELECT 1 FROM messages
+  WHERE messages.partnership_id = m.partnership_id
+    AND messages.sender_id <> m.member_id
+)
+ON CONFLICT (user_id, partnership_id) DO NOTHING;
+
+UPDATE message_reads r
+SET unread_count = (
+  SELECT COUNT(*) FROM messages
+  WHERE messages.partnership_id = r.partnership_id
+    AND messages.sender_id <> r.user_id
+    AND (r.last_read_at IS NULL OR messages.created_at > r.last_read_at)
+);
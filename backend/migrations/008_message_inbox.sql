@@ -0,0 +1,50 @@
+-- Inbox summary: every partnership of a user with its last message and unread count, in one call
+-- The lateral subquery reads a single row from idx_messages_partnership_created_at per partnership,
+-- and the unread count comes from the trigger-maintained message_reads counter
+CREATE OR REPLACE FUNCTION get_message_inbox(p_user_id UUID, p_preview_length INTEGER DEFAULT 140)
+RETURNS TABLE (
+  partnership_id UUID,
+  status TEXT,
+  partner_id UUID,
+  partner_first_name TEXT,
+  partner_last_name TEXT,
+  partner_avatar_url TEXT,
+  last_message_id UUID,
+  last_message_sender_id UUID,
+  last_message_preview TEXT,
+  last_message_at TIMESTAMP WITH TIME ZONE,
+  unread_count INTEGER
+)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT
+    p.id,
+    p.status,
+    partner.id,
+    partner.first_name,
+    partner.last_name,
+    partner.avatar_url,
+    last_message.id,
+    last_message.sender_id,
+    LEFT(last_message.content, p_preview_length),
+    last_message.created_at,
+    COALESCE(reads.unread_count, 0)
+  FROM partnerships p
+  LEFT JOIN users partner
+    ON partner.id = CASE WHEN p.user1_id = p_user_id THEN p.user2_id ELSE p.user1_id END
+  LEFT JOIN LATERAL (
+    SELECT m.id, m.sender_id, m.content, m.created_at
+    FROM messages m
+    WHERE m.partnership_id = p.id
+    ORDER BY m.created_at DESC, m.id DESC
+    LIMIT 1
+  ) last_message ON TRUE
+  LEFT JOIN message_reads reads
+    ON reads.partnership_id = p.id AND reads.user_id = p_user_id
+  WHERE p.user1_id = p_user_id OR p.user2_id = p_user_id
+  ORDER BY last_message.created_at DESC NULLS LAST, p.created_at DESC;
+$$;
+
+-- Lets the membership filter above combine two index scans instead of scanning partnerships
+CREATE INDEX IF NOT EXISTS idx_partnerships_user2 ON partnerships(user2_id);
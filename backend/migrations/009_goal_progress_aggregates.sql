@@ -0,0 +1,77 @@
+-- Progress aggregates stored on each goal and kept current by triggers on progress_updates,
+-- so reading a goal's completion never requires loading its progress history
+ALTER TABLE goals ADD COLUMN IF NOT EXISTS progress_update_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE goals ADD COLUMN IF NOT EXISTS latest_progress_value NUMERIC;
+ALTER TABLE goals ADD COLUMN IF NOT EXISTS progress_value_sum NUMERIC NOT NULL DEFAULT 0;
+ALTER TABLE goals ADD COLUMN IF NOT EXISTS max_progress_value NUMERIC;
+ALTER TABLE goals ADD COLUMN IF NOT EXISTS last_update_at TIMESTAMP WITH TIME ZONE;
+
+-- Serves the recent-updates slice embedded in a goal and the recount below
+CREATE INDEX IF NOT EXISTS idx_progress_updates_goal_created_at ON progress_updates(goal_id, created_at DESC);
+
+-- Full recount for one goal, used when an update is removed or changed
+CREATE OR REPLACE FUNCTION recompute_goal_progress(p_goal_id UUID)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+  UPDATE goals g
+  SET
+    progress_update_count = stats.update_count,
+    progress_value_sum = stats.value_sum,
+    max_progress_value = stats.max_value,
+    last_update_at = stats.last_at,
+    latest_progress_value = (
+      SELECT progress_value FROM progress_updates
+      WHERE goal_id = p_goal_id AND progress_value IS NOT NULL
+      ORDER BY created_at DESC
+      LIMIT 1
+    )
+  FROM (
+    SELECT
+      COUNT(*) AS update_count,
+      COALESCE(SUM(progress_value), 0) AS value_sum,
+      MAX(progress_value) AS max_value,
+      MAX(created_at) AS last_at
+    FROM progress_updates
+    WHERE goal_id = p_goal_id
+  ) stats
+  WHERE g.id = p_goal_id;
+$$;
+
+CREATE OR REPLACE FUNCTION maintain_goal_progress()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    -- New updates are appended at the end of the history, so the aggregates advance in place
+    UPDATE goals
+    SET
+      progress_update_count = progress_update_count + 1,
+      progress_value_sum = progress_value_sum + COALESCE(NEW.progress_value, 0),
+      max_progress_value = GREATEST(max_progress_value, NEW.progress_value),
+      latest_progress_value = COALESCE(NEW.progress_value, latest_progress_value),
+      last_update_at = GREATEST(last_update_at, NEW.created_at)
+    WHERE id = NEW.goal_id;
+  ELSIF TG_OP = 'DELETE' THEN
+    PERFORM recompute_goal_progress(OLD.goal_id);
+  ELSE
+    PERFORM recompute_goal_progress(NEW.goal_id);
+    IF OLD.goal_id IS DISTINCT FROM NEW.goal_id THEN
+      PERFORM recompute_goal_progress(OLD.goal_id);
+    END IF;
+  END IF;
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS progress_updates_aggregate ON progress_updates;
+CREATE TRIGGER progress_updates_aggregate
+  AFTER INSERT OR DELETE OR UPDATE OF goal_id, progress_value, created_at ON progress_updates
+  FOR EACH ROW EXECUTE FUNCTION maintain_goal_progress();
+
+-- Backfill existing goals
+SELECT recompute_goal_progress(id) FROM goals WHERE EXISTS (
+  SELECT 1 FROM progress_updates WHERE progress_updates.goal_id = goals.id
+);
@@ -0,0 +1,5 @@
+-- Lets the recurring check-in scheduler find already scheduled check-ins per partnership with a range scan
+CREATE INDEX IF NOT EXISTS idx_check_ins_partnership_scheduled_at ON check_ins(partnership_id, scheduled_at);
+
+-- Superseded by the composite index above
+DROP INDEX IF EXISTS idx_checkins_partnership;
@@ -0,0 +1,8 @@
+-- Reminder bookkeeping for the check-in reminder dispatcher
+-- Claiming a check-in sets reminder_sent_at, so each check-in is reminded once even with several workers
+ALTER TABLE check_ins ADD COLUMN IF NOT EXISTS reminder_sent_at TIMESTAMP WITH TIME ZONE;
+
+-- Upcoming incomplete check-ins, scanned by scheduled_at every dispatcher tick
+CREATE INDEX IF NOT EXISTS idx_check_ins_pending_scheduled_at
+  ON check_ins(scheduled_at)
+  WHERE completed_at IS NULL;
@@ -0,0 +1,48 @@
+-- Outgoing email queue, drained by the in-process email outbox workers
+CREATE TABLE IF NOT EXISTS email_outbox (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  to_email TEXT NOT NULL,
+  subject TEXT NOT NULL,
+  html_content TEXT NOT NULL,
+  text_content TEXT,
+  status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sending', 'sent', 'failed')),
+  attempts INTEGER NOT NULL DEFAULT 0,
+  last_error TEXT,
+  next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+  locked_until TIMESTAMP WITH TIME ZONE,
+  sent_at TIMESTAMP WITH TIME ZONE,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Only unsent mail is ever scanned
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due
+  ON email_outbox(next_attempt_at)
+  WHERE status IN ('pending', 'sending');
+
+-- Server-side only; no client access
+ALTER TABLE email_outbox ENABLE ROW LEVEL SECURITY;
+
+-- Claim up to p_limit due emails for sending. SKIP LOCKED lets several workers claim
+-- concurrently without blocking each other, and the lease returns emails whose worker
+-- died mid-send to the queue once it expires
+CREATE OR REPLACE FUNCTION claim_email_outbox(p_limit INTEGER, p_lease_seconds INTEGER DEFAULT 300)
+RETURNS SETOF email_outbox
+LANGUAGE sql
+AS $$
+  UPDATE email_outbox
+  SET
+    status = 'sending',
+    attempts = attempts + 1,
+    locked_until = NOW() + make_interval(secs => p_lease_seconds),
+    updated_at = NOW()
+  WHERE id IN (
+    SELECT id FROM email_outbox
+    WHERE (status = 'pending' AND next_attempt_at <= NOW())
+       OR (status = 'sending' AND locked_until < NOW())
+    ORDER BY next_attempt_at
+    LIMIT p_limit
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING *;
+$$;
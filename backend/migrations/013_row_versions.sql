@@ -0,0 +1,33 @@
+-- Keep updated_at current on every update so it can serve as a row version
+-- (conditional GETs derive their ETags from it). Most updates do not set it
+-- themselves, and trigger-maintained columns such as the goal progress
+-- aggregates never did.
+CREATE OR REPLACE FUNCTION touch_updated_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.updated_at := clock_timestamp();
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS touch_users_updated_at ON users;
+CREATE TRIGGER touch_users_updated_at
+  BEFORE UPDATE ON users
+  FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+DROP TRIGGER IF EXISTS touch_partnerships_updated_at ON partnerships;
+CREATE TRIGGER touch_partnerships_updated_at
+  BEFORE UPDATE ON partnerships
+  FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+DROP TRIGGER IF EXISTS touch_goals_updated_at ON goals;
+CREATE TRIGGER touch_goals_updated_at
+  BEFORE UPDATE ON goals
+  FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+DROP TRIGGER IF EXISTS touch_check_ins_updated_at ON check_ins;
+CREATE TRIGGER touch_check_ins_updated_at
+  BEFORE UPDATE ON check_ins
+  FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
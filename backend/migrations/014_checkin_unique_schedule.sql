@@ -0,0 +1,70 @@
+-- At most one check-in per partnership and time, so the recurring scheduler
+-- can insert with ON CONFLICT DO NOTHING and re-runs never duplicate rows.
+
+BEGIN;
+
+-- Rows merged away below, kept so nothing written by users is lost
+CREATE TABLE IF NOT EXISTS check_ins_merged_duplicates (
+  id UUID PRIMARY KEY,
+  merged_into UUID NOT NULL,
+  partnership_id UUID NOT NULL,
+  scheduled_at TIMESTAMP WITH TIME ZONE NOT NULL,
+  completed_at TIMESTAMP WITH TIME ZONE,
+  notes TEXT,
+  reminder_sent_at TIMESTAMP WITH TIME ZONE,
+  created_at TIMESTAMP WITH TIME ZONE,
+  updated_at TIMESTAMP WITH TIME ZONE,
+  merged_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE check_ins_merged_duplicates ENABLE ROW LEVEL SECURITY;
+
+-- Duplicates left by earlier runs are merged into one row per slot: a completed
+-- check-in if there is one, else the most recently updated
+CREATE TEMP TABLE check_in_slots AS
+SELECT
+  id,
+  first_value(id) OVER slot AS keep_id,
+  row_number() OVER slot AS position
+FROM check_ins
+WINDOW slot AS (
+  PARTITION BY partnership_id, scheduled_at
+  ORDER BY completed_at IS NULL, updated_at DESC NULLS LAST, id
+);
+
+-- The kept row gets the notes of the whole slot (its own first) and its earliest reminder
+UPDATE check_ins kept
+SET
+  notes = merged.notes,
+  reminder_sent_at = COALESCE(kept.reminder_sent_at, merged.reminder_sent_at)
+FROM (
+  SELECT
+    s.keep_id,
+    string_agg(c.notes, E'\n\n' ORDER BY s.position) FILTER (WHERE c.notes <> '') AS notes,
+    min(c.reminder_sent_at) AS reminder_sent_at
+  FROM check_in_slots s
+  JOIN check_ins c ON c.id = s.id
+  GROUP BY s.keep_id
+  HAVING count(*) > 1
+) merged
+WHERE kept.id = merged.keep_id;
+
+INSERT INTO check_ins_merged_duplicates (
+  id, merged_into, partnership_id, scheduled_at, completed_at, notes, reminder_sent_at, created_at, updated_at
+)
+SELECT c.id, s.keep_id, c.partnership_id, c.scheduled_at, c.completed_at, c.notes, c.reminder_sent_at, c.created_at, c.updated_at
+FROM check_in_slots s
+JOIN check_ins c ON c.id = s.id
+WHERE s.position > 1;
+
+DELETE FROM check_ins
+WHERE id IN (SELECT id FROM check_in_slots WHERE position > 1);
+
+DROP TABLE check_in_slots;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_check_ins_partnership_scheduled_at ON check_ins(partnership_id, scheduled_at);
+
+-- Superseded by the unique index above, which serves the same range scans
+DROP INDEX IF EXISTS idx_check_ins_partnership_scheduled_at;
+
+COMMIT;
@@ -0,0 +1,42 @@
+-- Cap reclaims of expired leases. An email whose worker crashed or hung on its
+-- last allowed attempt is marked failed instead of being leased again forever.
+DROP FUNCTION IF EXISTS claim_email_outbox(INTEGER, INTEGER);
+
+CREATE OR REPLACE FUNCTION claim_email_outbox(
+  p_limit INTEGER,
+  p_lease_seconds INTEGER DEFAULT 300,
+  p_max_attempts INTEGER DEFAULT 5
+)
+RETURNS SETOF email_outbox
+LANGUAGE sql
+AS $$
+  WITH abandoned AS (
+    UPDATE email_outbox
+    SET
+      status = 'failed',
+      last_error = 'Lease expired on the last attempt',
+      locked_until = NULL,
+      updated_at = NOW()
+    WHERE id IN (
+      SELECT id FROM email_outbox
+      WHERE status = 'sending' AND locked_until < NOW() AND attempts >= p_max_attempts
+      FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id
+  )
+  UPDATE email_outbox
+  SET
+    status = 'sending',
+    attempts = attempts + 1,
+    locked_until = NOW() + make_interval(secs => p_lease_seconds),
+    updated_at = NOW()
+  WHERE id IN (
+    SELECT id FROM email_outbox
+    WHERE (status = 'pending' AND next_attempt_at <= NOW())
+       OR (status = 'sending' AND locked_until < NOW() AND attempts < p_max_attempts)
+    ORDER BY next_attempt_at
+    LIMIT p_limit
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING *;
+$$;
@@ -0,0 +1,10 @@
+-- The schedule slot a check-in was generated for by the recurring scheduler.
+-- It stays put when members reschedule the check-in, so the scheduler can tell
+-- a slot it already filled from a free one and does not recreate moved check-ins.
+-- NULL for check-ins scheduled by members (and for those generated before this migration).
+ALTER TABLE check_ins ADD COLUMN IF NOT EXISTS generated_for TIMESTAMP WITH TIME ZONE;
+
+-- Lets the scheduler find the slots it filled per partnership with a range scan
+CREATE INDEX IF NOT EXISTS idx_check_ins_partnership_generated_for
+  ON check_ins(partnership_id, generated_for)
+  WHERE generated_for IS NOT NULL;
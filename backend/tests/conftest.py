@@ -0,0 +1,64 @@
+"""
+Shared test fixtures.
+
+Settings are read when the app modules are imported, so the required ones get
+placeholder values here before any test imports ``app``. PostgREST is replaced
+by ``FakePostgrest``, an in-process transport that serves canned rows.
+"""
+import os
+
+for name, value in {
+    "SUPABASE_URL": "http://supabase.test",
+    "SUPABASE_SERVICE_KEY": "test-service-key",
+    "SUPABASE_JWT_SECRET": "test-jwt-secret",
+    "SMTP_SERVER": "smtp.test",
+    "SMTP_PORT": "25",
+    "SMTP_USERNAME": "test",
+    "SMTP_PASSWORD": "test",
+    "SENDER_EMAIL": "noreply@example.com",
+}.items():
+    os.environ.setdefault(name, value)
+
+from typing import Any, Dict, List, Tuple
+
+import httpx
+import pytest
+
+from app.core import database
+
+
+class FakePostgrest:
+    """
+    Answers PostgREST requests with the rows (or error) set for their method and
+    table, and records them
+    """
+
+    def __init__(self):
+        self.rows: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self.errors: Dict[Tuple[str, str], Tuple[int, Dict[str, Any]]] = {}
+        self.requests: List[httpx.Request] = []
+
+    def respond(self, method: str, table: str, rows: List[Dict[str, Any]]) -> None:
+        self.rows[(method, table)] = rows
+
+    def fail(self, method: str, table: str, status_code: int, code: str, message: str = "error") -> None:
+        self.errors[(method, table)] = (status_code, {"code": code, "message": message})
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        key = (request.method, request.url.path.rsplit("/", 1)[-1])
+        if key in self.errors:
+            status_code, error = self.errors[key]
+            return httpx.Response(status_code, json=error)
+        return httpx.Response(200, json=self.rows.get(key, []))
+
+
+@pytest.fixture
+async def postgrest():
+    fake = FakePostgrest()
+    database._http_client = httpx.AsyncClient(
+        base_url="http://supabase.test",
+        transport=httpx.MockTransport(fake.handle)
+    )
+    yield fake
+    await database.close_http_client()
@@ -0,0 +1,63 @@
+"""Supabase access token verification: JWKS caching and refetching"""
+import httpx
+import pytest
+from jose import JWTError
+
+from app.services import auth
+
+OLD_KEY = {"kid": "old", "kty": "EC"}
+NEW_KEY = {"kid": "new", "kty": "EC"}
+
+
+@pytest.fixture
+def jwks(postgrest, monkeypatch):
+    auth._jwks_cache.clear()
+    monkeypatch.setattr(auth, "_jwks_fetched_at", 0.0)
+    postgrest.respond("GET", "jwks.json", {"keys": [OLD_KEY]})
+    yield postgrest
+    auth._jwks_cache.clear()
+
+
+def jwks_fetches(postgrest):
+    return sum(request.url.path.endswith("/jwks.json") for request in postgrest.requests)
+
+
+async def test_known_key_is_served_from_the_cache(jwks):
+    assert await auth._get_signing_key("old") == OLD_KEY
+    assert await auth._get_signing_key("old") == OLD_KEY
+
+    assert jwks_fetches(jwks) == 1
+
+
+async def test_unknown_keys_refetch_at_most_once_per_interval(jwks):
+    await auth._get_signing_key("old")
+
+    for _ in range(5):
+        with pytest.raises(JWTError):
+            await auth._get_signing_key("made-up")
+
+    assert jwks_fetches(jwks) == 1
+    # The cached keys were kept
+    assert await auth._get_signing_key("old") == OLD_KEY
+    assert jwks_fetches(jwks) == 1
+
+
+async def test_rotated_key_is_found_once_the_interval_has_passed(jwks, monkeypatch):
+    await auth._get_signing_key("old")
+    jwks.respond("GET", "jwks.json", {"keys": [NEW_KEY, OLD_KEY]})
+    monkeypatch.setattr(auth, "_jwks_fetched_at", auth._jwks_fetched_at - auth.settings.JWKS_REFRESH_MIN_INTERVAL_SECONDS)
+
+    assert await auth._get_signing_key("new") == NEW_KEY
+    assert jwks_fetches(jwks) == 2
+
+
+async def test_failed_refetch_keeps_the_cached_keys(jwks, monkeypatch):
+    await auth._get_signing_key("old")
+    jwks.fail("GET", "jwks.json", 503, "PGRST000", "unavailable")
+    monkeypatch.setattr(auth, "_jwks_fetched_at", auth._jwks_fetched_at - auth.settings.JWKS_REFRESH_MIN_INTERVAL_SECONDS)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await auth._get_signing_key("new")
+
+    assert await auth._get_signing_key("old") == OLD_KEY
+    assert jwks_fetches(jwks) == 2
@@ -0,0 +1,43 @@
+"""Check-in reminder dispatch: claims and the reminder insert"""
+import json
+from datetime import datetime, timezone
+
+from app.services.checkin_reminders import dispatch_due_reminders
+
+NOW = datetime(2024, 5, 1, 17, 0, tzinfo=timezone.utc)
+
+
+def due_checkin(id):
+    member = {"first_name": "Ada", "last_name": "Lovelace", "time_zone": "Europe/London"}
+    return {
+        "id": id,
+        "scheduled_at": "2024-05-01T18:00:00.5+00:00",
+        "partnership": {"user1": {**member, "id": "u1"}, "user2": {**member, "id": "u2", "first_name": "Grace"}},
+    }
+
+
+async def test_claimed_check_ins_remind_both_members(postgrest):
+    postgrest.respond("GET", "check_ins", [due_checkin("c1"), due_checkin("c2")])
+    postgrest.respond("PATCH", "check_ins", [{"id": "c1"}])
+
+    # c2 was claimed by another dispatcher first
+    assert await dispatch_due_reminders(now=NOW) == 2
+
+    assert [request.method for request in postgrest.requests] == ["GET", "PATCH", "POST"]
+    insert = next(request for request in postgrest.requests if request.method == "POST")
+    reminders = json.loads(insert.content)
+    assert sorted(reminder["user_id"] for reminder in reminders) == ["u1", "u2"]
+    assert {reminder["related_entity_id"] for reminder in reminders} == {"c1"}
+
+
+async def test_failed_insert_releases_the_claims(postgrest):
+    postgrest.respond("GET", "check_ins", [due_checkin("c1")])
+    postgrest.respond("PATCH", "check_ins", [{"id": "c1"}])
+    postgrest.fail("POST", "notifications", 503, "PGRST000", "connection lost")
+
+    assert await dispatch_due_reminders(now=NOW) == 0
+
+    claim, release = [request for request in postgrest.requests if request.method == "PATCH"]
+    assert json.loads(claim.content) == {"reminder_sent_at": NOW.isoformat()}
+    assert json.loads(release.content) == {"reminder_sent_at": None}
+    assert release.url.params["id"] == "in.(c1)"
@@ -0,0 +1,135 @@
+"""Recurring check-in scheduling: per-agreement occurrences, the time-ordered merge and idempotent writes"""
+import json
+from datetime import datetime, timedelta, timezone
+
+from app.core.timestamps import parse_timestamp
+from app.services.checkin_scheduler import merge_until, occurrences, schedule_recurring_checkins
+
+# A Wednesday
+START = datetime(2024, 5, 1, tzinfo=timezone.utc)
+HORIZON = START + timedelta(days=14)
+
+
+def partnership(id, frequency, days=None, time_zone="UTC", created_at="2024-04-22T09:00:00+00:00"):
+    return {
+        "id": id,
+        "created_at": created_at,
+        "user1": {"time_zone": time_zone},
+        "partnership_agreements": [{"communication_frequency": frequency, "check_in_days": days}],
+    }
+
+
+def utc(day, hour):
+    return datetime(2024, 5, day, hour, tzinfo=timezone.utc)
+
+
+def test_timestamps_with_short_fractions_parse():
+    # PostgREST drops trailing zeros; Python 3.10's fromisoformat needs 3 or 6 digits
+    assert parse_timestamp("2024-04-22T09:00:05.12+00:00") == datetime(2024, 4, 22, 9, 0, 5, 120000, tzinfo=timezone.utc)
+    assert parse_timestamp("2024-04-22T09:00:05.1234Z") == datetime(2024, 4, 22, 9, 0, 5, 123400, tzinfo=timezone.utc)
+    assert parse_timestamp("2024-04-22T09:00:05+02:00") == datetime(2024, 4, 22, 7, 0, 5, tzinfo=timezone.utc)
+
+
+def test_partnership_created_at_with_a_short_fraction_anchors_occurrences():
+    bi_weekly = partnership("p1", "bi-weekly", created_at="2024-04-22T09:00:05.12+00:00")
+
+    assert list(occurrences(bi_weekly, START, HORIZON, 18)) == [utc(6, 18)]
+
+
+def test_weekly_check_ins_fall_on_agreed_days_in_the_members_time_zone():
+    weekly = partnership("p1", "weekly", ["Monday", "thursday"], time_zone="America/New_York")
+
+    # 18:00 EDT is 22:00 UTC
+    assert list(occurrences(weekly, START, HORIZON, 18)) == [utc(2, 22), utc(6, 22), utc(9, 22), utc(13, 22)]
+
+
+def test_daily_without_agreed_days_is_every_day():
+    daily = partnership("p1", "daily")
+
+    assert list(occurrences(daily, START, HORIZON, 18)) == [
+        START + timedelta(days=offset, hours=18) for offset in range(14)
+    ]
+
+
+def test_bi_weekly_skips_every_other_week_from_the_start_of_the_partnership():
+    # Started on Monday 22 April: 22 April, 6 May, 20 May...
+    bi_weekly = partnership("p1", "bi-weekly")
+
+    assert list(occurrences(bi_weekly, START, HORIZON, 18)) == [utc(6, 18)]
+
+
+def test_monthly_with_agreed_days_is_the_first_such_weekday():
+    monthly = partnership("p1", "monthly", ["friday"])
+
+    assert list(occurrences(monthly, START, HORIZON, 18)) == [utc(3, 18)]
+
+
+def test_unknown_time_zone_falls_back_to_utc():
+    weekly = partnership("p1", "weekly", ["monday"], time_zone="Mars/Olympus_Mons")
+
+    assert list(occurrences(weekly, START, HORIZON, 18)) == [utc(6, 18), utc(13, 18)]
+
+
+def test_merge_yields_every_occurrence_in_time_order():
+    partnerships = [
+        partnership("p1", "daily", time_zone="Asia/Tokyo"),
+        partnership("p2", "weekly", ["monday", "wednesday"]),
+        partnership("p3", "daily", ["monday"], time_zone="America/Los_Angeles"),
+        partnership("p4", "monthly"),
+    ]
+
+    merged = list(merge_until(partnerships, START, HORIZON, 18))
+
+    expected = sorted(
+        (scheduled_at, p["id"])
+        for p in partnerships
+        for scheduled_at in occurrences(p, START, HORIZON, 18)
+    )
+    assert merged == expected
+    assert all(START <= scheduled_at < HORIZON for scheduled_at, _ in merged)
+
+
+async def test_scheduling_skips_existing_check_ins_and_ignores_conflicts(postgrest):
+    postgrest.respond("GET", "partnerships", [
+        partnership("p1", "weekly", ["monday"]),
+        partnership("p2", "weekly", ["thursday"]),
+    ])
+    postgrest.respond("GET", "check_ins", [
+        {"partnership_id": "p1", "scheduled_at": "2024-05-06T18:00:00+00:00"},
+    ])
+    # One of the three rows was inserted by a concurrent run in the meantime
+    postgrest.respond("POST", "check_ins", [{"id": "c1"}, {"id": "c2"}])
+
+    created = await schedule_recurring_checkins(now=START)
+
+    insert = next(request for request in postgrest.requests if request.method == "POST")
+    assert insert.url.params["on_conflict"] == "partnership_id,scheduled_at"
+    assert "resolution=ignore-duplicates" in insert.headers["prefer"]
+    assert [(row["partnership_id"], row["scheduled_at"]) for row in json.loads(insert.content)] == [
+        ("p2", "2024-05-02T18:00:00+00:00"),
+        ("p2", "2024-05-09T18:00:00+00:00"),
+        ("p1", "2024-05-13T18:00:00+00:00"),
+    ]
+    # Skipped conflicts are not returned by PostgREST, so not counted
+    assert created == 2
+
+
+async def test_generated_check_ins_record_their_slot_and_moved_slots_stay_filled(postgrest):
+    postgrest.respond("GET", "partnerships", [partnership("p1", "weekly", ["monday"])])
+    # The check-in generated for 6 May was moved to 7 May by the members
+    postgrest.respond("GET", "check_ins", [
+        {"partnership_id": "p1", "scheduled_at": "2024-05-07T08:30:00.5+00:00", "generated_for": "2024-05-06T18:00:00+00:00"},
+    ])
+    postgrest.respond("POST", "check_ins", [{"id": "c1"}])
+
+    await schedule_recurring_checkins(now=START)
+
+    lookup, insert = postgrest.requests[1], postgrest.requests[2]
+    assert "generated_for.gte" in lookup.url.params["or"]
+    assert json.loads(insert.content) == [
+        {
+            "partnership_id": "p1",
+            "scheduled_at": "2024-05-13T18:00:00+00:00",
+            "generated_for": "2024-05-13T18:00:00+00:00",
+        },
+    ]
@@ -0,0 +1,171 @@
+"""Email outbox worker: claim, send, retry with backoff and give up at the attempt cap"""
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Dict
+
+import httpx
+import pytest
+
+from app.core import database
+from app.core.timestamps import parse_timestamp
+from app.services.email_outbox import EmailOutboxWorker
+from app.services.email_transport import (
+    EmailDeliveryError,
+    EmailTransport,
+    InMemoryTransport,
+    OutgoingEmail,
+    set_email_transport,
+)
+
+
+def outbox_row(id, attempts=1):
+    return {
+        "id": id,
+        "to_email": f"{id}@example.com",
+        "subject": "Check-in reminder",
+        "html_content": "<p>Hi</p>",
+        "text_content": "Hi",
+        "status": "sending",
+        "attempts": attempts,
+    }
+
+
+class FailingTransport(EmailTransport):
+    """Fails the recipients it has an error for and accepts the rest"""
+
+    def __init__(self, errors: Dict[str, Exception]):
+        self.errors = errors
+        self.sent = []
+
+    async def send(self, email: OutgoingEmail) -> None:
+        if email.to_email in self.errors:
+            raise self.errors[email.to_email]
+        self.sent.append(email)
+
+
+class OutboxPostgrest:
+    """Hands out the queued claims one call at a time and records the row updates"""
+
+    def __init__(self, *claims):
+        self.claims = list(claims)
+        self.claim_params = []
+        self.updates = {}
+        self.updated = asyncio.Event()
+        self.expected_updates = 0
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/rpc/claim_email_outbox"):
+            self.claim_params.append(json.loads(request.content))
+            return httpx.Response(200, json=self.claims.pop(0) if self.claims else [])
+
+        id = request.url.params["id"].removeprefix("eq.")
+        self.updates[id] = json.loads(request.content)
+        if len(self.updates) >= self.expected_updates:
+            self.updated.set()
+        return httpx.Response(200, json=[{"id": id}])
+
+
+@pytest.fixture
+async def outbox():
+    def serve(*claims):
+        fake = OutboxPostgrest(*claims)
+        database._http_client = httpx.AsyncClient(
+            base_url="http://supabase.test",
+            transport=httpx.MockTransport(fake.handle)
+        )
+        return fake
+
+    yield serve
+    set_email_transport(None)
+    await database.close_http_client()
+
+
+async def drain(worker, fake, updates):
+    """Run the worker until `updates` rows have been marked"""
+    fake.expected_updates = updates
+    worker.start()
+    await asyncio.wait_for(fake.updated.wait(), timeout=2)
+    await worker.stop()
+
+
+async def test_claimed_emails_are_sent_and_marked_sent(outbox):
+    fake = outbox([outbox_row("a"), outbox_row("b")])
+    transport = InMemoryTransport()
+    set_email_transport(transport)
+    worker = EmailOutboxWorker(concurrency=5, poll_interval=0.01, max_attempts=3)
+
+    await drain(worker, fake, 2)
+
+    assert fake.claim_params[0] == {"p_limit": 5, "p_lease_seconds": 300, "p_max_attempts": 3}
+    assert sorted(email.to_email for email in transport.sent) == ["a@example.com", "b@example.com"]
+    for update in fake.updates.values():
+        assert update["status"] == "sent"
+        assert update["updated_at"] == update["sent_at"]
+        assert update["locked_until"] is None
+    assert (worker.emails_sent, worker.emails_retried, worker.emails_failed) == (2, 0, 0)
+
+
+async def test_failed_sends_are_retried_with_backoff_until_the_attempt_cap(outbox):
+    fake = outbox([
+        outbox_row("first", attempts=1),
+        outbox_row("third", attempts=3),
+        outbox_row("last", attempts=4),
+        outbox_row("rejected", attempts=1),
+    ])
+    transport = FailingTransport({
+        "first@example.com": EmailDeliveryError("timed out"),
+        "third@example.com": EmailDeliveryError("timed out"),
+        "last@example.com": EmailDeliveryError("timed out"),
+        "rejected@example.com": EmailDeliveryError("no such user", permanent=True),
+    })
+    set_email_transport(transport)
+    worker = EmailOutboxWorker(poll_interval=0.01, max_attempts=4, retry_base_seconds=30, retry_max_seconds=100)
+    started = datetime.now(timezone.utc)
+
+    await drain(worker, fake, 4)
+
+    first, third = fake.updates["first"], fake.updates["third"]
+    assert first["status"] == third["status"] == "pending"
+    assert first["last_error"] == "timed out"
+    # 30s after the first attempt, doubled per attempt up to the 100s cap, +-10% jitter
+    first_delay = (parse_timestamp(first["next_attempt_at"]) - started).total_seconds()
+    third_delay = (parse_timestamp(third["next_attempt_at"]) - started).total_seconds()
+    assert 27 <= first_delay <= 34
+    assert 90 <= third_delay <= 111
+
+    assert fake.updates["last"]["status"] == "failed"
+    assert fake.updates["rejected"]["status"] == "failed"
+    assert fake.updates["rejected"]["last_error"] == "no such user"
+
+    for update in fake.updates.values():
+        assert parse_timestamp(update["updated_at"]) >= started
+        assert update["locked_until"] is None
+    assert (worker.emails_sent, worker.emails_retried, worker.emails_failed) == (0, 2, 2)
+
+
+async def test_transport_failure_on_the_last_attempt_fails_the_email(outbox):
+    fake = outbox([outbox_row("a", attempts=5)])
+    transport = InMemoryTransport()
+    transport.failures.append(EmailDeliveryError("connection refused"))
+    set_email_transport(transport)
+    worker = EmailOutboxWorker(poll_interval=0.01)
+
+    await drain(worker, fake, 1)
+
+    assert fake.updates["a"]["status"] == "failed"
+    assert fake.updates["a"]["last_error"] == "connection refused"
+    assert transport.sent == []
+
+
+async def test_stop_returns_while_the_worker_waits_for_the_next_poll(outbox):
+    fake = outbox()
+    set_email_transport(InMemoryTransport())
+    worker = EmailOutboxWorker(poll_interval=60)
+    worker.start()
+    await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(worker.stop(), timeout=1)
+
+    assert worker.running is False
+    assert len(fake.claim_params) == 1
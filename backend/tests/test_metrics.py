@@ -0,0 +1,91 @@
+"""Prometheus text rendering and the /metrics endpoint"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.core.metrics import CallbackMetric, Counter, Gauge, Histogram, Registry
+from app.main import app
+
+
+def test_counter_renders_labelled_samples():
+    counter = Counter("jobs_total", "Jobs run", ("queue", "outcome"))
+    counter.inc("email", "sent")
+    counter.inc("email", "sent", amount=2)
+    counter.inc('we"ird\\', "fa\niled")
+
+    assert counter.render() == (
+        "# HELP jobs_total Jobs run\n"
+        "# TYPE jobs_total counter\n"
+        'jobs_total{queue="email",outcome="sent"} 3\n'
+        'jobs_total{queue="we\\"ird\\\\",outcome="fa\\niled"} 1\n'
+    )
+
+
+def test_gauge_goes_both_ways():
+    gauge = Gauge("in_flight", "Requests in flight")
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+
+    assert gauge.render().splitlines()[-1] == "in_flight 1"
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 0.5, 1.0))
+    for value in (0.05, 0.1, 0.3, 2.0):
+        histogram.observe(value, "/goals")
+
+    assert histogram.render().splitlines()[2:] == [
+        'latency_seconds_bucket{route="/goals",le="0.1"} 2',
+        'latency_seconds_bucket{route="/goals",le="0.5"} 3',
+        'latency_seconds_bucket{route="/goals",le="1"} 3',
+        'latency_seconds_bucket{route="/goals",le="+Inf"} 4',
+        'latency_seconds_sum{route="/goals"} 2.45',
+        'latency_seconds_count{route="/goals"} 4',
+    ]
+    assert histogram.count("/goals") == 4
+
+
+def test_registry_renders_callback_metrics_at_scrape_time():
+    registry = Registry()
+    sizes = {("goals",): 1}
+    registry.register(CallbackMetric("cache_entries", "Cached entries", "gauge", lambda: sizes, ("kind",)))
+
+    sizes[("goals",)] = 5
+
+    assert registry.render() == (
+        "# HELP cache_entries Cached entries\n"
+        "# TYPE cache_entries gauge\n"
+        'cache_entries{kind="goals"} 5\n'
+    )
+
+
+def test_registry_rejects_duplicate_names():
+    registry = Registry()
+    registry.register(Counter("jobs_total", "Jobs run"))
+
+    with pytest.raises(ValueError):
+        registry.register(Counter("jobs_total", "Jobs run again"))
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_metrics_endpoint_is_off_by_default(client):
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_endpoint_requires_the_bearer_token(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "METRICS_ENABLED", True)
+    monkeypatch.setattr(get_settings(), "METRICS_BEARER_TOKEN", "scrape-token")
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-token"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_requests_total{method="GET",route="/metrics",status="401"} ' in response.text
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
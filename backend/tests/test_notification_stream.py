@@ -0,0 +1,63 @@
+"""Notification SSE stream and the hub subscriptions it reads from"""
+import asyncio
+import json
+
+from app.services import notification_stream
+from app.services.notification_stream import notification_events
+from app.services.realtime import PubSubHub, publish_notifications, publish_unread_count
+
+NOTIFICATION = {
+    "id": "9f1c4d9e-1b7a-4c3e-9a55-0d6a3c1f7e21",
+    "user_id": "u1",
+    "type": "new_message",
+    "created_at": "2024-05-01T12:00:00+00:00",
+}
+
+
+def frame_data(frame: str) -> dict:
+    return json.loads(frame.rsplit("data: ", 1)[1])
+
+
+async def test_receive_times_out_without_losing_events():
+    hub = PubSubHub()
+    subscription = hub.subscribe("topic")
+    received = []
+
+    async def publish():
+        for index in range(200):
+            hub.publish("topic", {"index": index})
+            await asyncio.sleep(0 if index % 3 else 0.001)
+        subscription.close()
+
+    publisher = asyncio.create_task(publish())
+    try:
+        while True:
+            payload = await subscription.receive(timeout=0.0005)
+            if payload is not None:
+                received.append(json.loads(payload)["index"])
+    except StopAsyncIteration:
+        pass
+    await publisher
+
+    assert received == list(range(200))
+
+
+async def test_unread_count_comes_from_the_counter_row(postgrest, monkeypatch):
+    monkeypatch.setattr(notification_stream.settings, "NOTIFICATION_STREAM_HEARTBEAT_SECONDS", 0.01)
+    # The notification is stored (counted) before the stream reads the counter,
+    # and published after it subscribed
+    postgrest.respond("GET", "notification_counters", [{"unread_count": 1}])
+    stream = notification_events("u1")
+
+    assert (await stream.__anext__()).startswith("retry:")
+    assert frame_data(await stream.__anext__()) == {"unread_count": 1}
+
+    publish_notifications([NOTIFICATION])
+    assert frame_data(await stream.__anext__())["id"] == NOTIFICATION["id"]
+    assert frame_data(await stream.__anext__()) == {"unread_count": 1}
+
+    assert await stream.__anext__() == ": heartbeat\n\n"
+    publish_unread_count("u1", 0)
+    assert frame_data(await stream.__anext__()) == {"unread_count": 0}
+
+    await stream.aclose()
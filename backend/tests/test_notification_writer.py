@@ -0,0 +1,83 @@
+"""Buffered notification writer: batching, backpressure and failed inserts"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.core import database
+from app.services.notification_writer import NotificationWriter
+
+
+def record(index):
+    return {"id": f"n{index}", "user_id": "u1", "type": "new_message", "title": "t", "message": str(index)}
+
+
+@pytest.fixture
+async def gated_postgrest():
+    """A PostgREST whose inserts wait until the test opens the gate; yields (gate, inserted batches)"""
+    gate = asyncio.Event()
+    batches = []
+
+    async def handle(request):
+        await gate.wait()
+        batches.append([row["id"] for row in json.loads(request.content)])
+        return httpx.Response(201)
+
+    database._http_client = httpx.AsyncClient(base_url="http://supabase.test", transport=httpx.MockTransport(handle))
+    yield gate, batches
+    await database.close_http_client()
+
+
+async def test_full_buffer_holds_producers_back_until_a_flush(gated_postgrest):
+    gate, batches = gated_postgrest
+    writer = NotificationWriter(flush_interval_ms=10000, max_batch_size=4, max_buffer_size=6)
+    writer.start()
+
+    # The first 4 records form a batch whose insert hangs; 6 more fill the buffer
+    for index in range(10):
+        await asyncio.wait_for(writer.submit(record(index)), timeout=1)
+    blocked = asyncio.create_task(writer.submit(record(10)))
+    await asyncio.sleep(0.05)
+    assert not blocked.done()
+    assert writer.buffered == 6
+
+    gate.set()
+    await asyncio.wait_for(blocked, timeout=1)
+    for index in range(11, 20):
+        await writer.submit(record(index))
+    await writer.stop()
+
+    assert all(len(batch) <= 4 for batch in batches)
+    assert [id for batch in batches for id in batch] == [f"n{index}" for index in range(20)]
+    assert (writer.notifications_written, writer.notifications_failed) == (20, 0)
+
+
+async def test_records_are_flushed_after_the_interval_without_filling_a_batch(gated_postgrest):
+    gate, batches = gated_postgrest
+    gate.set()
+    writer = NotificationWriter(flush_interval_ms=20, max_batch_size=100)
+    writer.start()
+
+    await writer.submit(record(1))
+    await writer.submit(record(2))
+    await asyncio.sleep(0.1)
+
+    assert batches == [["n1", "n2"]]
+    await writer.stop()
+
+
+async def test_failed_insert_drops_its_batch_and_the_writer_carries_on(postgrest):
+    postgrest.fail("POST", "notifications", 503, "PGRST000", "connection lost")
+    writer = NotificationWriter(flush_interval_ms=10, max_batch_size=3)
+    writer.start()
+
+    for index in range(3):
+        await writer.submit(record(index))
+    await asyncio.sleep(0.05)
+    postgrest.errors.clear()
+    await writer.submit(record(3))
+    await writer.stop()
+
+    assert (writer.notifications_written, writer.notifications_failed) == (1, 3)
+    assert writer.running is False
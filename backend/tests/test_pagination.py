@@ -0,0 +1,209 @@
+"""Keyset cursors: encoding, validation and the filters built from them"""
+import base64
+import json
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from fastapi import HTTPException, Request, Response
+
+from app.api.routes import messages
+from app.core import database
+from app.core.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter, row_cursor
+from app.models.user import User
+from app.repositories import messages as messages_repo
+
+ROW_ID = str(uuid.uuid4())
+PARTNERSHIP_ID = str(uuid.uuid4())
+USER = User(
+    id=uuid.uuid4(),
+    email="ada@example.com",
+    first_name="Ada",
+    last_name="Lovelace",
+    time_zone="UTC",
+    created_at=datetime(2024, 5, 1, tzinfo=timezone.utc),
+    updated_at=datetime(2024, 5, 1, tzinfo=timezone.utc)
+)
+
+
+NEWER = {"id": str(uuid.uuid4()), "partnership_id": PARTNERSHIP_ID, "sender_id": str(USER.id),
+         "content": "Second", "created_at": "2024-05-01T12:00:01.5+00:00"}
+OLDER = {"id": str(uuid.uuid4()), "partnership_id": PARTNERSHIP_ID, "sender_id": str(USER.id),
+         "content": "First", "created_at": "2024-05-01T12:00:00+00:00"}
+
+
+def get_request() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/messages", "headers": []})
+
+
+@pytest.fixture
+async def message_rows():
+    """Serves NEWER and OLDER: by ID, as the newest page, or OLDER alone past a cursor; yields the requests"""
+    requests = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        params = request.url.params
+        if "id" in params:
+            rows = [row for row in (NEWER, OLDER) if params["id"] == f"eq.{row['id']}"]
+        else:
+            rows = [OLDER] if "or" in params else [NEWER, OLDER]
+        return httpx.Response(200, json=rows)
+
+    database._http_client = httpx.AsyncClient(base_url="http://supabase.test", transport=httpx.MockTransport(handle))
+    yield requests
+    await database.close_http_client()
+
+
+def raw_cursor(value) -> str:
+    """A cursor with arbitrary content, as a client could forge it"""
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trips():
+    cursor = encode_cursor("2024-05-01T12:00:00.123456+00:00", ROW_ID)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ("2024-05-01T12:00:00.123456+00:00", ROW_ID)
+
+
+def test_row_cursor_uses_created_at_and_id():
+    row = {"id": ROW_ID, "created_at": "2024-05-01T12:00:00+00:00"}
+
+    assert decode_cursor(row_cursor(row)) == ("2024-05-01T12:00:00+00:00", ROW_ID)
+
+
+def test_cursor_with_a_short_fraction_decodes():
+    # PostgREST drops trailing zeros; Python 3.10's fromisoformat needs 3 or 6 digits
+    cursor = row_cursor({"id": ROW_ID, "created_at": "2024-05-01T12:00:00.12Z"})
+
+    assert decode_cursor(cursor) == ("2024-05-01T12:00:00.120000+00:00", ROW_ID)
+
+
+def test_decoded_values_are_canonical():
+    # fromisoformat accepts other separators; the filter only ever sees isoformat() output
+    cursor = raw_cursor(["2024-05-01 12:00:00+02:00", ROW_ID.upper()])
+
+    assert decode_cursor(cursor) == ("2024-05-01T12:00:00+02:00", ROW_ID)
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not base64!",
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+    raw_cursor("2024-05-01T12:00:00+00:00"),
+    raw_cursor(["2024-05-01T12:00:00+00:00"]),
+    raw_cursor([1714564800, ROW_ID]),
+    raw_cursor(["2024-05-01T12:00:00", ROW_ID]),
+    raw_cursor(["2024-05-01T12:00:00+00:00", "42"]),
+    raw_cursor(['2024-05-01T12:00:00+00:00",id.gt.0)', ROW_ID]),
+    raw_cursor(["2024-05-01T12:00:00+00:00", f"{ROW_ID}),or(id.neq.0"]),
+])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_keyset_filter_breaks_ties_on_id():
+    key = ("2024-05-01T12:00:00+00:00", ROW_ID)
+
+    assert keyset_filter("created_at", key, "lt") == (
+        'created_at.lt."2024-05-01T12:00:00+00:00",'
+        f'and(created_at.eq."2024-05-01T12:00:00+00:00",id.lt.{ROW_ID})'
+    )
+
+
+async def test_page_query_filters_past_the_cursor(postgrest):
+    key = ("2024-05-01T12:00:00+00:00", ROW_ID)
+
+    await messages_repo.list_for_partnership(PARTNERSHIP_ID, limit=10, before=key)
+
+    params = postgrest.requests[0].url.params
+    assert params["or"] == f"({keyset_filter('created_at', key, 'lt')})"
+
+
+async def test_invalid_cursor_is_a_bad_request(postgrest):
+    with pytest.raises(HTTPException) as error:
+        await messages.get_message_page(
+            request=None,
+            response=None,
+            partnership_id=PARTNERSHIP_ID,
+            current_user=USER,
+            limit=50,
+            before=raw_cursor(['x",id.gt.0)', ROW_ID]),
+            after=None,
+            around=None,
+            before_id=None
+        )
+
+    assert error.value.status_code == 400
+    assert postgrest.requests == []
+
+
+async def test_list_before_id_becomes_a_keyset_cursor(message_rows):
+    page = await messages.get_messages(
+        request=get_request(),
+        response=Response(),
+        partnership_id=PARTNERSHIP_ID,
+        current_user=USER,
+        limit=50,
+        before_id=NEWER["id"]
+    )
+
+    # The list response is unchanged: a plain list, oldest first
+    assert [message["id"] for message in page] == [OLDER["id"]]
+    anchor, listing = message_rows
+    assert anchor.url.params["id"] == f"eq.{NEWER['id']}"
+    key = (NEWER["created_at"], NEWER["id"])
+    assert listing.url.params["or"] == f"({keyset_filter('created_at', key, 'lt')})"
+
+
+async def test_list_without_before_id_is_the_newest_messages(message_rows):
+    page = await messages.get_messages(
+        request=get_request(),
+        response=Response(),
+        partnership_id=PARTNERSHIP_ID,
+        current_user=USER,
+        limit=50,
+        before_id=None
+    )
+
+    assert [message["id"] for message in page] == [OLDER["id"], NEWER["id"]]
+    assert len(message_rows) == 1
+
+
+async def test_page_accepts_before_id(message_rows):
+    page = await messages.get_message_page(
+        request=get_request(),
+        response=Response(),
+        partnership_id=PARTNERSHIP_ID,
+        current_user=USER,
+        limit=1,
+        before=None,
+        after=None,
+        around=None,
+        before_id=NEWER["id"]
+    )
+
+    assert [str(message.id) for message in page.messages] == [OLDER["id"]]
+    assert (page.has_older, page.has_newer) == (False, True)
+    key = (NEWER["created_at"], NEWER["id"])
+    assert message_rows[1].url.params["or"] == f"({keyset_filter('created_at', key, 'lt')})"
+
+
+async def test_page_before_an_unknown_message_is_not_found(message_rows):
+    with pytest.raises(HTTPException) as error:
+        await messages.get_message_page(
+            request=get_request(),
+            response=Response(),
+            partnership_id=PARTNERSHIP_ID,
+            current_user=USER,
+            limit=50,
+            before=None,
+            after=None,
+            around=None,
+            before_id=ROW_ID
+        )
+
+    assert error.value.status_code == 404
@@ -0,0 +1,46 @@
+"""Cached partnership memberships"""
+import pytest
+
+from app.core.database import count_round_trips
+from app.services import partnerships
+
+USER_ID = "u1"
+
+
+@pytest.fixture
+def memberships(postgrest):
+    partnerships._membership_cache.clear()
+    postgrest.respond("GET", "partnerships", [{"id": "p1", "status": "active"}])
+    yield postgrest
+    partnerships._membership_cache.clear()
+
+
+async def test_cached_member_needs_no_round_trip(memberships):
+    assert await partnerships.is_partnership_member(USER_ID, "p1")
+
+    with count_round_trips() as trips:
+        assert await partnerships.is_partnership_member(USER_ID, "p1")
+
+    assert trips.count == 0
+
+
+async def test_rejection_is_confirmed_without_dropping_the_cached_memberships(memberships):
+    await partnerships.is_partnership_member(USER_ID, "p1")
+    cached = partnerships._membership_cache.get(USER_ID)
+
+    with count_round_trips() as trips:
+        assert not await partnerships.is_partnership_member(USER_ID, "p2")
+        assert await partnerships.is_partnership_member(USER_ID, "p1")
+
+    assert trips.count == 1
+    # Unchanged memberships leave the entry as it was
+    assert partnerships._membership_cache.get(USER_ID) is cached
+
+
+async def test_partnership_created_elsewhere_replaces_the_cached_memberships(memberships):
+    await partnerships.is_partnership_member(USER_ID, "p1")
+    memberships.respond("GET", "partnerships", [{"id": "p1", "status": "active"}, {"id": "p2", "status": "pending"}])
+
+    assert await partnerships.is_partnership_member(USER_ID, "p2")
+
+    assert await partnerships.get_user_partnership_statuses(USER_ID) == {"p1": "active", "p2": "pending"}
@@ -0,0 +1,167 @@
+"""Tag-versioned response cache over the memory and memcached backends"""
+import asyncio
+
+import pytest
+
+from app.core.response_cache import (
+    CacheBackend,
+    CacheBackendError,
+    MemcachedBackend,
+    MemoryCacheBackend,
+    ResponseCache
+)
+
+
+class Loader:
+    """Counts how often the cache falls through to the database"""
+
+    def __init__(self, value="rows"):
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+class FailingBackend(CacheBackend):
+    async def get_many(self, keys):
+        raise CacheBackendError("down")
+
+    async def set(self, key, value, ttl):
+        raise CacheBackendError("down")
+
+    async def add(self, key, value, ttl):
+        raise CacheBackendError("down")
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache(MemoryCacheBackend())
+
+
+async def test_second_lookup_is_a_hit(cache):
+    load = Loader()
+
+    assert await cache.get_or_load("goals:user:u1", ["goals:user:u1"], load) == "rows"
+    assert await cache.get_or_load("goals:user:u1", ["goals:user:u1"], load) == "rows"
+
+    assert load.calls == 1
+    assert cache.stats()["hits"] == {"goals": 1}
+    assert cache.stats()["misses"] == {"goals": 1}
+
+
+async def test_invalidating_a_tag_reloads_only_its_entries(cache):
+    mine, theirs = Loader(), Loader()
+    await cache.get_or_load("goals:user:u1", ["goals:user:u1"], mine)
+    await cache.get_or_load("goals:user:u2", ["goals:user:u2"], theirs)
+
+    await cache.invalidate("goals:user:u1")
+    await cache.get_or_load("goals:user:u1", ["goals:user:u1"], mine)
+    await cache.get_or_load("goals:user:u2", ["goals:user:u2"], theirs)
+
+    assert (mine.calls, theirs.calls) == (2, 1)
+
+
+async def test_entry_is_dropped_by_any_of_its_tags(cache):
+    load = Loader()
+    tags = ["partnership:p1", "user:u1"]
+    await cache.get_or_load("partnership:p1:user:u1", tags, load)
+
+    await cache.invalidate("user:u1")
+    await cache.get_or_load("partnership:p1:user:u1", tags, load)
+    await cache.invalidate("partnership:p1")
+    await cache.get_or_load("partnership:p1:user:u1", tags, load)
+
+    assert load.calls == 3
+
+
+async def test_evicted_tag_token_never_revives_old_entries():
+    backend = MemoryCacheBackend()
+    cache = ResponseCache(backend)
+    load = Loader()
+    await cache.get_or_load("goals:user:u1", ["goals:user:u1"], load)
+
+    backend._entries.delete("resp:tag:goals:user:u1")
+    await cache.get_or_load("goals:user:u1", ["goals:user:u1"], load)
+
+    assert load.calls == 2
+
+
+async def test_none_is_not_cached(cache):
+    load = Loader(value=None)
+
+    await cache.get_or_load("partnership:p1", ["partnership:p1"], load)
+    await cache.get_or_load("partnership:p1", ["partnership:p1"], load)
+
+    assert load.calls == 2
+
+
+async def test_invalidation_reaches_caches_sharing_a_backend_only():
+    shared = MemoryCacheBackend()
+    writer, reader, separate = ResponseCache(shared), ResponseCache(shared), ResponseCache(MemoryCacheBackend())
+    load = Loader()
+    for worker in (reader, separate):
+        await worker.get_or_load("goals:user:u1", ["goals:user:u1"], load)
+
+    await writer.invalidate("goals:user:u1")
+    for worker in (reader, separate):
+        await worker.get_or_load("goals:user:u1", ["goals:user:u1"], load)
+
+    # The reader reloaded; the worker with its own memory backend still serves its stale copy
+    assert load.calls == 3
+
+
+async def test_backend_failures_fall_back_to_the_loader():
+    cache = ResponseCache(FailingBackend())
+    load = Loader()
+
+    assert await cache.get_or_load("goals:user:u1", ["goals:user:u1"], load) == "rows"
+    await cache.invalidate("goals:user:u1")
+
+    assert load.calls == 1
+    assert cache.errors == 2
+
+
+@pytest.fixture
+async def memcached():
+    """A memcached speaking just enough of the text protocol; records the keys it receives"""
+    store, keys = {}, []
+
+    async def serve(reader, writer):
+        while line := await reader.readline():
+            command, *args = line.decode().split()
+            keys.extend(args[:1] if command != "get" else args)
+            if command == "get":
+                for key in args:
+                    if key in store:
+                        writer.write(f"VALUE {key} 0 {len(store[key])}\r\n".encode() + store[key] + b"\r\n")
+                writer.write(b"END\r\n")
+            else:
+                data = (await reader.readexactly(int(args[3]) + 2))[:-2]
+                stored = command == "set" or args[0] not in store
+                if stored:
+                    store[args[0]] = data
+                writer.write(b"STORED\r\n" if stored else b"NOT_STORED\r\n")
+            await writer.drain()
+
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    backend = MemcachedBackend(f"127.0.0.1:{port}")
+    yield backend, keys
+    await backend.close()
+    server.close()
+    await server.wait_closed()
+
+
+async def test_memcached_keys_are_hashed(memcached):
+    backend, keys = memcached
+    cache = ResponseCache(backend)
+    load = Loader(value=[{"id": "g1"}])
+    hostile = "goals:user:u1 0 0 1\r\nflush_all"
+
+    await cache.get_or_load(hostile, [hostile], load)
+    assert await cache.get_or_load(hostile, [hostile], load) == [{"id": "g1"}]
+
+    assert load.calls == 1
+    assert keys and all(len(key) == 40 and key.isalnum() for key in keys)
@@ -0,0 +1,209 @@
+"""PostgREST round trips made by the goal, progress and check-in endpoints"""
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes import checkins, goals, progress
+from app.core.database import count_round_trips
+from app.models.checkin import CheckInComplete, CheckInCreate, CheckInUpdate
+from app.models.progress import ProgressUpdateCreate
+from app.models.user import User
+from app.services.notification_writer import notification_writer
+
+NOW = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc).isoformat()
+
+USER = User(
+    id=uuid.uuid4(),
+    email="ada@example.com",
+    first_name="Ada",
+    last_name="Lovelace",
+    time_zone="UTC",
+    created_at=NOW,
+    updated_at=NOW
+)
+PARTNER_ID = str(uuid.uuid4())
+PARTNERSHIP_ID = str(uuid.uuid4())
+GOAL_ID = str(uuid.uuid4())
+UPDATE_ID = str(uuid.uuid4())
+CHECKIN_ID = str(uuid.uuid4())
+
+MEMBERS = {"user1_id": str(USER.id), "user2_id": PARTNER_ID}
+STRANGERS = {"user1_id": str(uuid.uuid4()), "user2_id": PARTNER_ID}
+
+
+def goal_row(**fields):
+    return {
+        "id": GOAL_ID,
+        "user_id": str(USER.id),
+        "partnership_id": PARTNERSHIP_ID,
+        "title": "Run a marathon",
+        "status": "active",
+        "progress_update_count": 1,
+        "latest_progress_value": 40,
+        "partnership": MEMBERS,
+        **fields
+    }
+
+
+def update_row(**fields):
+    return {
+        "id": UPDATE_ID,
+        "goal_id": GOAL_ID,
+        "user_id": str(USER.id),
+        "description": "Ran 10k",
+        "progress_value": 40,
+        "created_at": NOW,
+        **fields
+    }
+
+
+def checkin_row(**fields):
+    return {
+        "id": CHECKIN_ID,
+        "partnership_id": PARTNERSHIP_ID,
+        "scheduled_at": NOW,
+        "completed_at": None,
+        "partnership": MEMBERS,
+        **fields
+    }
+
+
+@pytest.fixture
+async def running_writer():
+    # As in the app, notifications are buffered rather than inserted by the request
+    notification_writer.start()
+    yield notification_writer
+    await notification_writer.stop()
+
+
+async def test_get_goal_is_one_round_trip(postgrest):
+    postgrest.respond("GET", "goals", [goal_row(progress_updates=[update_row()])])
+
+    with count_round_trips() as trips:
+        goal = await goals.get_goal(GOAL_ID, current_user=USER)
+
+    assert trips.count == 1
+    assert [update["id"] for update in goal["progress_updates"]] == [UPDATE_ID]
+    assert goal["completion_percentage"] == 40.0
+
+
+async def test_get_goal_of_another_partnership_is_forbidden_in_one_round_trip(postgrest):
+    postgrest.respond("GET", "goals", [goal_row(partnership=STRANGERS, progress_updates=[])])
+
+    with count_round_trips() as trips:
+        with pytest.raises(HTTPException) as error:
+            await goals.get_goal(GOAL_ID, current_user=USER)
+
+    assert error.value.status_code == 403
+    assert trips.count == 1
+
+
+async def test_missing_goal_is_not_found_in_one_round_trip(postgrest):
+    with count_round_trips() as trips:
+        with pytest.raises(HTTPException) as error:
+            await goals.get_goal(GOAL_ID, current_user=USER)
+
+    assert error.value.status_code == 404
+    assert trips.count == 1
+
+
+async def test_add_progress_update_is_read_plus_write(postgrest, running_writer):
+    postgrest.respond("GET", "goals", [goal_row()])
+    postgrest.respond("POST", "progress_updates", [update_row()])
+    data = ProgressUpdateCreate(goal_id=GOAL_ID, user_id=USER.id, description="Ran 10k", progress_value=40)
+
+    with count_round_trips() as trips:
+        await goals.add_progress_update(GOAL_ID, data, current_user=USER)
+
+    assert [(call.table, call.operation) for call in trips.calls] == [
+        ("goals", "select"),
+        ("progress_updates", "insert"),
+    ]
+
+
+async def test_create_progress_update_is_read_plus_write(postgrest):
+    postgrest.respond("GET", "goals", [goal_row()])
+    postgrest.respond("POST", "progress_updates", [update_row()])
+    data = ProgressUpdateCreate(goal_id=GOAL_ID, user_id=USER.id, description="Ran 10k", progress_value=40)
+
+    with count_round_trips() as trips:
+        await progress.create_progress_update(data, current_user=USER)
+
+    assert trips.count == 2
+
+
+async def test_get_progress_updates_is_one_round_trip(postgrest):
+    postgrest.respond("GET", "goals", [goal_row(progress_updates=[update_row()])])
+
+    with count_round_trips() as trips:
+        updates = await progress.get_progress_updates(GOAL_ID, current_user=USER)
+
+    assert trips.count == 1
+    assert len(updates) == 1
+
+
+async def test_get_progress_update_is_one_round_trip(postgrest):
+    postgrest.respond("GET", "progress_updates", [
+        update_row(goal={"partnership_id": PARTNERSHIP_ID, "partnership": MEMBERS})
+    ])
+
+    with count_round_trips() as trips:
+        update = await progress.get_progress_update(UPDATE_ID, current_user=USER)
+
+    assert trips.count == 1
+    assert "goal" not in update
+
+
+async def test_get_checkin_is_one_round_trip(postgrest):
+    postgrest.respond("GET", "check_ins", [checkin_row()])
+
+    with count_round_trips() as trips:
+        checkin = await checkins.get_checkin(CHECKIN_ID, current_user=USER)
+
+    assert trips.count == 1
+    assert "partnership" not in checkin
+
+
+async def test_update_checkin_is_read_plus_write(postgrest):
+    postgrest.respond("GET", "check_ins", [checkin_row()])
+    postgrest.respond("PATCH", "check_ins", [checkin_row(notes="Moved")])
+
+    with count_round_trips() as trips:
+        await checkins.update_checkin(CHECKIN_ID, CheckInUpdate(notes="Moved"), current_user=USER)
+
+    assert trips.count == 2
+
+
+async def test_complete_checkin_is_read_plus_write(postgrest):
+    postgrest.respond("GET", "check_ins", [checkin_row()])
+    postgrest.respond("PATCH", "check_ins", [checkin_row(completed_at=NOW)])
+
+    with count_round_trips() as trips:
+        await checkins.complete_checkin(CHECKIN_ID, CheckInComplete(notes="Good week"), current_user=USER)
+
+    assert trips.count == 2
+
+
+async def test_creating_a_check_in_in_a_taken_slot_is_a_conflict(postgrest):
+    postgrest.respond("GET", "partnerships", [{"id": PARTNERSHIP_ID, "status": "active"}])
+    postgrest.fail("POST", "check_ins", 409, "23505", "duplicate key value violates unique constraint")
+    data = CheckInCreate(partnership_id=PARTNERSHIP_ID, scheduled_at=NOW)
+
+    with pytest.raises(HTTPException) as error:
+        await checkins.create_checkin(data, current_user=USER)
+
+    assert error.value.status_code == 409
+
+
+async def test_moving_a_check_in_onto_a_taken_slot_is_a_conflict(postgrest):
+    postgrest.respond("GET", "check_ins", [checkin_row()])
+    postgrest.fail("PATCH", "check_ins", 409, "23505", "duplicate key value violates unique constraint")
+
+    with count_round_trips() as trips:
+        with pytest.raises(HTTPException) as error:
+            await checkins.update_checkin(CHECKIN_ID, CheckInUpdate(scheduled_at=NOW), current_user=USER)
+
+    assert error.value.status_code == 409
+    assert trips.count == 2
@@ -0,0 +1,178 @@
+"""SMTP transport against a real (aiosmtpd) server: pooled sessions, batches and reconnects"""
+import asyncio
+import socket
+
+import pytest
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import SMTP as SMTPServer
+
+from app.services.email_transport import EmailTransport, OutgoingEmail, SMTPTransport
+
+
+class RecordingHandler:
+    """Records each delivered message with the client address of the session it came in on"""
+
+    def __init__(self):
+        self.messages = []
+        self.refuse = set()
+        self.hang_up_on_mail = 0
+
+    async def handle_MAIL(self, server, session, envelope, address, mail_options):
+        if self.hang_up_on_mail:
+            self.hang_up_on_mail -= 1
+            server.transport.close()
+        envelope.mail_from = address
+        return "250 OK"
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refuse:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        for address in envelope.rcpt_tos:
+            self.messages.append((session.peer, address))
+        return "250 Message accepted"
+
+
+class TrackingController(Controller):
+    """Keeps the server side of every session so a test can drop them"""
+
+    def __init__(self, handler, **kwargs):
+        super().__init__(handler, **kwargs)
+        self.servers = []
+
+    def factory(self):
+        server = SMTPServer(self.handler)
+        self.servers.append(server)
+        return server
+
+    def drop_connections(self):
+        for server in self.servers:
+            if server.transport is not None:
+                self.loop.call_soon_threadsafe(server.transport.close)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def email(index):
+    return OutgoingEmail(f"user{index}@example.com", f"Subject {index}", f"<p>{index}</p>", str(index))
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = TrackingController(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller
+    controller.stop()
+
+
+@pytest.fixture
+async def transport(smtp_server):
+    transport = SMTPTransport(
+        hostname=smtp_server.hostname,
+        port=smtp_server.port,
+        sender_email="noreply@example.com",
+        start_tls=False,
+        pool_size=2,
+        max_messages_per_connection=3,
+        timeout=5
+    )
+    yield transport
+    await transport.close()
+
+
+def sessions_used(smtp_server):
+    return {peer for peer, _ in smtp_server.handler.messages}
+
+
+def test_incomplete_transport_cannot_be_created():
+    class NoSend(EmailTransport):
+        pass
+
+    with pytest.raises(TypeError):
+        NoSend()
+
+
+async def test_sequential_sends_reuse_one_session(smtp_server, transport):
+    for index in range(3):
+        await transport.send(email(index))
+
+    assert [address for _, address in smtp_server.handler.messages] == [
+        "user0@example.com", "user1@example.com", "user2@example.com"
+    ]
+    assert transport.connections_opened == 1
+    assert len(sessions_used(smtp_server)) == 1
+
+
+async def test_session_is_recycled_after_the_message_limit(smtp_server, transport):
+    results = await transport.send_many([email(index) for index in range(7)])
+
+    assert results == [None] * 7
+    assert len(smtp_server.handler.messages) == 7
+    # 3 + 3 + 1 messages with max_messages_per_connection=3
+    assert transport.connections_opened == 3
+
+
+async def test_concurrent_batches_are_spread_over_the_pool(smtp_server, transport):
+    results = await asyncio.gather(*(transport.send_many([email(index)]) for index in range(4)))
+
+    assert results == [[None]] * 4
+    assert len(smtp_server.handler.messages) == 4
+    # Never more sessions than the pool allows, each reused by a later batch
+    assert transport.connections_opened == 2
+    assert len(sessions_used(smtp_server)) == 2
+    assert transport.batch_size(8) == 3
+
+
+async def test_refused_recipient_fails_alone_and_permanently(smtp_server, transport):
+    smtp_server.handler.refuse.add("user1@example.com")
+
+    results = await transport.send_many([email(index) for index in range(3)])
+
+    assert results[0] is None and results[2] is None
+    assert results[1].permanent is True
+    assert [address for _, address in smtp_server.handler.messages] == ["user0@example.com", "user2@example.com"]
+    assert transport.connections_opened == 1
+
+
+async def test_reconnects_after_the_server_closes_an_idle_session(smtp_server, transport):
+    await transport.send(email(0))
+    smtp_server.drop_connections()
+    await asyncio.sleep(0.1)
+
+    await transport.send(email(1))
+
+    assert [address for _, address in smtp_server.handler.messages] == ["user0@example.com", "user1@example.com"]
+    assert transport.connections_opened == 2
+    assert len(sessions_used(smtp_server)) == 2
+
+
+async def test_resends_on_a_new_session_when_the_server_hangs_up_mid_send(smtp_server, transport):
+    await transport.send(email(0))
+    smtp_server.handler.hang_up_on_mail = 1
+
+    results = await transport.send_many([email(1), email(2)])
+
+    assert results == [None, None]
+    assert [address for _, address in smtp_server.handler.messages] == [
+        "user0@example.com", "user1@example.com", "user2@example.com"
+    ]
+    assert transport.connections_opened == 2
+
+
+async def test_gives_up_when_the_new_session_is_dropped_too(smtp_server, transport):
+    await transport.send(email(0))
+    smtp_server.handler.hang_up_on_mail = 2
+
+    results = await transport.send_many([email(1), email(2)])
+
+    assert results[0].permanent is False
+    assert results[1] is None
+    assert [address for _, address in smtp_server.handler.messages] == ["user0@example.com", "user2@example.com"]